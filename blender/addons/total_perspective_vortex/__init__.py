@@ -1,5 +1,12 @@
 import importlib
 import bpy
+from . import columns
+from . import compression
+from . import profiles
+from . import incremental
+from . import parallel
+from . import timelines
+from . import writer
 from . import tpv
 
 # Reload modules when reloading add-ons in Blender with F8.
@@ -19,17 +26,97 @@ bl_info = {
 # Registration
 
 def register():
+    importlib.reload(columns)
+    importlib.reload(compression)
+    importlib.reload(profiles)
+    importlib.reload(incremental)
+    importlib.reload(parallel)
+    importlib.reload(timelines)
+    importlib.reload(writer)
     importlib.reload(tpv)
     print("tpv register")
 
     bpy.utils.register_class(tpv.TPVExportLayout)
     bpy.utils.register_class(tpv.OBJECT_OT_TPVExport)
+    bpy.utils.register_class(tpv.OBJECT_OT_TPVDryRun)
     bpy.utils.register_class(tpv.OBJECT_OT_GPBakeLighting)
     bpy.types.Scene.export_pathStatic = bpy.props.StringProperty(
         name="Folder",
         default="",
         description="Define the path of the project folder you want to export in",
         subtype='DIR_PATH')
+    bpy.types.Scene.export_format = bpy.props.EnumProperty(
+        name="Format",
+        items=tpv.OUTPUT_FORMATS,
+        default="JSON",
+        description="How each frame is written")
+    bpy.types.Scene.export_layout = bpy.props.EnumProperty(
+        name="Layout",
+        items=tpv.OUTPUT_LAYOUTS,
+        default="OBJECT",
+        description="How the exported files are laid out")
+    bpy.types.Scene.export_workers = bpy.props.IntProperty(
+        name="Workers",
+        default=1,
+        min=1,
+        description="Number of headless Blender processes to split the frame range between, 1 exports in this session")
+    bpy.types.Scene.export_retries = bpy.props.IntProperty(
+        name="Retries",
+        default=2,
+        min=0,
+        description="How many times a failed worker's frames are retried")
+    bpy.types.Scene.export_writer_threads = bpy.props.IntProperty(
+        name="Writer Threads",
+        default=2,
+        min=0,
+        description="Threads writing finished frames while the next one evaluates, 0 writes each file immediately")
+    bpy.types.Scene.export_quantize_step = bpy.props.FloatProperty(
+        name="Quantize Step",
+        default=0.0,
+        min=0.0,
+        precision=3,
+        description="Store binary positions as whole multiples of this many millimeters and colors as 8 bits, 0 keeps floats")
+    bpy.types.Scene.export_quantize_bounds = bpy.props.EnumProperty(
+        name="Bounds",
+        items=columns.QUANTIZE_BOUNDS,
+        default="FRAME",
+        description="What quantized positions are offset from")
+    bpy.types.Scene.export_keyframe_interval = bpy.props.IntProperty(
+        name="Keyframe Interval",
+        default=1,
+        min=1,
+        description="Write each object in full every this many frames, and as changes from the frame before in between")
+    bpy.types.Scene.export_profile = bpy.props.EnumProperty(
+        name="Profile",
+        items=profiles.EXPORT_PROFILES,
+        default="FULL",
+        description="How precisely the export is written and which attributes are left out")
+    bpy.types.Scene.export_id_mode = bpy.props.EnumProperty(
+        name="IDs",
+        items=tpv.ID_MODES,
+        default="STRING",
+        description="Whether every element carries an ID string, or is identified by its position")
+    bpy.types.Scene.export_compression = bpy.props.EnumProperty(
+        name="Compression",
+        items=compression.OUTPUT_COMPRESSIONS,
+        default="NONE",
+        description="Codec each file is compressed with")
+    bpy.types.Scene.export_compression_level = bpy.props.IntProperty(
+        name="Level",
+        default=6,
+        min=0,
+        max=9,
+        description="Compression level, higher is smaller and slower")
+    bpy.types.Scene.export_timelines = bpy.props.BoolProperty(
+        name="Timelines",
+        default=False,
+        description="Write cameras, lights, effectors and empties as one file per object holding every frame, "
+                    "instead of a file per frame")
+    bpy.types.Scene.export_incremental = bpy.props.BoolProperty(
+        name="Incremental",
+        default=False,
+        description="Record what each object was exported from, and on later incremental exports only write the "
+                    "frames and objects that changed since")
 
 
 
@@ -38,8 +125,23 @@ def unregister():
     print("tpv unregister")
     bpy.utils.unregister_class(tpv.TPVExportLayout)
     bpy.utils.unregister_class(tpv.OBJECT_OT_TPVExport)
+    bpy.utils.unregister_class(tpv.OBJECT_OT_TPVDryRun)
     bpy.utils.unregister_class(tpv.OBJECT_OT_GPBakeLighting)
     del bpy.types.Scene.export_pathStatic
+    del bpy.types.Scene.export_format
+    del bpy.types.Scene.export_layout
+    del bpy.types.Scene.export_workers
+    del bpy.types.Scene.export_retries
+    del bpy.types.Scene.export_writer_threads
+    del bpy.types.Scene.export_quantize_step
+    del bpy.types.Scene.export_quantize_bounds
+    del bpy.types.Scene.export_keyframe_interval
+    del bpy.types.Scene.export_profile
+    del bpy.types.Scene.export_id_mode
+    del bpy.types.Scene.export_compression
+    del bpy.types.Scene.export_compression_level
+    del bpy.types.Scene.export_timelines
+    del bpy.types.Scene.export_incremental
 
 
 
@@ -0,0 +1,255 @@
+"""
+Benchmark of writing exports as JSON, comparing the original per float rounding and the vectorized to_list
+rounding, both written with json.dump, with the streamed fixed precision encoder
+
+Exports are read back from a folder, such as the interface's test fixtures, and turned into column tables the way
+the exporters build them. Runs with any Python 3 that has numpy:
+
+python benchmark.py <export folder> [--repeat 5] [--tile 10]
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import columns
+from columns import ColumnTable
+
+# The column kind of each exported attribute, the rest are stored as they're read
+ATTRIBUTE_KINDS = dict({
+    "co": "position",
+    "location": "position",
+    "pressure": "float",
+    "strength": "float",
+    "quaternion": "float",
+    "rotation": "float",
+    "velocity": "float",
+    "vertexColor": "color",
+    "color": "color",
+    "lifecycle": "value",
+    "useCyclic": "flag",
+    "occluded": "flag",
+})
+
+
+# The decimals the original exporters rounded each kind of value to
+ROUNDED_DECIMALS = dict({
+    "position": 6,
+    "float": 6,
+    "color": 3,
+})
+
+
+def is_element_list(value) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(element, dict) for element in value)
+
+
+def to_table(elements: list[dict]) -> ColumnTable:
+    """
+    Rebuild the column table a list of exported elements was written from
+    """
+    table = ColumnTable(len(elements))
+
+    for name in elements[0].keys():
+        values = [element.get(name) for element in elements]
+
+        if all(is_element_list(value) or value == [] for value in values):
+            offsets = np.zeros(len(values) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in values], out=offsets[1:])
+            children = [child for value in values for child in value]
+            table.nested(name, offsets, to_table(children) if len(children) > 0 else ColumnTable(0))
+        elif name in ATTRIBUTE_KINDS:
+            kind = ATTRIBUTE_KINDS[name]
+            table.column(name, np.array(values, dtype=bool if kind == "flag" else np.float32), kind)
+        else:
+            table.field(name, values)
+
+    return table
+
+
+def tile_table(table: ColumnTable, count: int) -> ColumnTable:
+    """
+    A table holding the rows of table repeated count times, standing in for a denser frame
+    """
+    tiled = ColumnTable(table.length * count)
+
+    for name, value in table.attributes.items():
+        kind = table.kinds[name]
+
+        if kind == "field":
+            tiled.field(name, value * count)
+        elif kind == "nested":
+            children = value.table.length
+            offsets = np.concatenate([value.offsets[:-1] + children * index for index in range(count)]
+                                     + [[children * count]])
+            tiled.nested(name, offsets, tile_table(value.table, count))
+        else:
+            tiled.column(name, np.concatenate([value] * count), kind)
+
+    return tiled
+
+
+def tile_tables(value, count: int):
+    if isinstance(value, ColumnTable):
+        return tile_table(value, count)
+
+    if isinstance(value, list):
+        return [tile_tables(child, count) for child in value]
+
+    if isinstance(value, dict):
+        return dict({key: tile_tables(child, count) for key, child in value.items()})
+
+    return value
+
+
+def to_tables(value):
+    """
+    Replace every list of elements in a payload with a column table
+    """
+    if is_element_list(value) and not any(is_element_list(child) for child in value[0].values()) \
+            or is_element_list(value) and "points" in value[0]:
+        return to_table(value)
+
+    if isinstance(value, list):
+        return [to_tables(child) for child in value]
+
+    if isinstance(value, dict):
+        return dict({key: to_tables(child) for key, child in value.items()})
+
+    return value
+
+
+def read_exports(folder: str) -> list[dict]:
+    payloads = []
+
+    for parent, _, files in os.walk(folder):
+        for file in sorted(files):
+            if file.endswith(".json"):
+                with open(os.path.join(parent, file)) as infile:
+                    payloads.append(to_tables(json.load(infile)))
+
+    return payloads
+
+
+def round_value(value, decimals: int):
+    if isinstance(value, list):
+        return [round(component, decimals) for component in value]
+
+    return round(value, decimals)
+
+
+def to_elements(table: ColumnTable) -> list[dict]:
+    """
+    The dict per element the original exporters built, rounding every float on its own with round()
+    """
+    values = dict({})
+
+    for name, value in table.attributes.items():
+        kind = table.kinds[name]
+
+        if kind == "nested":
+            children = to_elements(value.table)
+            offsets = value.offsets.tolist()
+            values[name] = [children[offsets[row]:offsets[row + 1]] for row in range(table.length)]
+        elif kind == "field":
+            values[name] = value
+        else:
+            values[name] = value.tolist()
+
+    elements = []
+
+    for row in range(table.length):
+        element = dict({})
+
+        for name, column in values.items():
+            decimals = ROUNDED_DECIMALS.get(table.kinds[name])
+            element[name] = column[row] if decimals is None else round_value(column[row], decimals)
+
+        elements.append(element)
+
+    return elements
+
+
+def dump_json_per_float(payload: dict) -> str:
+    """
+    The way exports were originally written, a dict per element with every float rounded on its own, for json.dump
+    """
+    return json.dumps(payload, default=to_elements)
+
+
+def dump_json(payload: dict) -> str:
+    """
+    Every table rounded a column at a time and expanded with to_list, for json.dump
+    """
+    return json.dumps(payload, default=columns.encode_json_default)
+
+
+def stream_json(payload: dict) -> str:
+    pieces = []
+    columns.write_json(payload, pieces.append)
+    return "".join(pieces)
+
+
+def time_encoder(encoder, payloads: list[dict], repeat: int):
+    best = None
+    size = 0
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = sum(len(encoder(payload)) for payload in payloads)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, size
+
+
+def same_values(a, b, tolerance: float = 1e-6) -> bool:
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(same_values(a[key], b[key]) for key in a)
+
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(same_values(x, y) for x, y in zip(a, b))
+
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(a - b) <= tolerance * max(1.0, abs(a))
+
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON encoders on an export")
+    parser.add_argument("folder", help="A folder of JSON exports, such as interface/test/fixtures")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each encoder, the fastest is reported")
+    parser.add_argument("--tile", type=int, default=1,
+                        help="Repeat the elements of every export this many times, to measure denser frames")
+    args = parser.parse_args()
+
+    payloads = [tile_tables(payload, args.tile) for payload in read_exports(args.folder)]
+
+    if len(payloads) == 0:
+        raise SystemExit("No JSON exports in {folder}".format(folder=args.folder))
+
+    for payload in payloads:
+        expected = json.loads(dump_json_per_float(payload))
+
+        if not same_values(expected, json.loads(dump_json(payload))) \
+                or not same_values(expected, json.loads(stream_json(payload))):
+            raise SystemExit("The encoders disagree on {name}".format(name=payload.get("name")))
+
+    print("{count} exports read from {folder}".format(count=len(payloads), folder=args.folder))
+    print("{:<10} {:>10} {:>12} {:>8}".format("encoder", "seconds", "bytes", "MB/s"))
+
+    baseline = None
+
+    for name, encoder in [("per float", dump_json_per_float), ("to_list", dump_json), ("streamed", stream_json)]:
+        elapsed, size = time_encoder(encoder, payloads, args.repeat)
+        baseline = elapsed if baseline is None else baseline
+
+        print("{name:<10} {elapsed:>10.3f} {size:>12} {speed:>8.1f}  {speedup:.2f}x".format(
+            name=name, elapsed=elapsed, size=size, speed=size / elapsed / 1e6, speedup=baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main()
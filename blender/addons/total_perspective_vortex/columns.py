@@ -0,0 +1,750 @@
+import json
+from json.encoder import encode_basestring_ascii
+import struct
+import numpy as np
+
+# Decimal places each kind of column is rounded to when it's written as text
+COLUMN_PRECISION = {
+    "position": 6,
+    "float": 6,
+    "color": 3,
+}
+
+# The little-endian type each kind of column is stored as in the binary format
+COLUMN_TYPES = {
+    "position": "float32",
+    "float": "float32",
+    "color": "float32",
+    "value": "float32",
+    "index": "int32",
+    "flag": "uint8",
+}
+
+BINARY_MAGIC = b"TPVB"
+BINARY_VERSION = 1
+
+# Buffers start on multiples of this many bytes so every typed array can view them in place
+BINARY_ALIGNMENT = 8
+
+# Quantized colors are stored as 0-255
+COLOR_LEVELS = 255
+
+# When JSON is streamed, tables are expanded this many rows at a time
+STREAM_CHUNK_ROWS = 4096
+
+# Below this many rows, counting child rows, formatting columns in bulk costs more than it saves
+BULK_FORMAT_ROWS = 256
+
+# Streamed JSON is handed to the file in pieces of at least this many characters
+STREAM_WRITE_SIZE = 1 << 16
+
+
+# The bounds quantized positions are offset from, as (identifier, name, description) enum items
+# Frames are written as they're exported, before the bounds of the whole export are known, so EXPORT offsets every
+# frame from the robot's origin instead, which is fixed for the whole export
+QUANTIZE_BOUNDS = [
+    ("FRAME", "Per Frame", "Offsets from the bounding box of each column in each frame, the smallest files"),
+    ("EXPORT", "Robot Origin", "Offsets from the robot's origin rather than a bounding box, so values are comparable "
+                               "across every frame"),
+]
+
+
+class Quantization:
+    """
+    Stores positions as integer multiples of step, offset from the bounds, and colors as 8 bit integers
+
+    The largest error in any position component is half of step.
+    """
+
+    def __init__(self, step: float, bounds: str = "FRAME"):
+        self.step = step
+        self.bounds = bounds
+
+    def header(self) -> dict:
+        return dict({
+            "step": self.step,
+            "bounds": self.bounds,
+            "maxError": self.step / 2,
+            "colorLevels": COLOR_LEVELS,
+        })
+
+    def positions(self, values: np.ndarray):
+        """
+        The quantized positions, and the origin they are offset from
+        """
+        values = np.asarray(values, dtype=np.float64)
+        components = 1 if values.ndim == 1 else values.shape[-1]
+
+        if self.bounds == "FRAME" and len(values) > 0:
+            origin = values.reshape(-1, components).min(axis=0)
+        else:
+            origin = np.zeros(components)
+
+        steps = np.rint((values - origin) / self.step)
+
+        # Use the smaller type whenever every offset fits in it
+        return steps.astype(smallest_int_type(steps)), origin.tolist()
+
+    def colors(self, values: np.ndarray) -> np.ndarray:
+        return np.rint(np.clip(values, 0, 1) * COLOR_LEVELS).astype(np.uint8)
+
+    def scale(self, kind: str):
+        """
+        The size of one integer step of a column kind, or None if the kind isn't quantized
+        """
+        if kind == "position":
+            return self.step
+
+        if kind == "color":
+            return 1 / COLOR_LEVELS
+
+        return None
+
+
+def smallest_int_type(values: np.ndarray):
+    int16 = np.iinfo(np.int16)
+
+    if len(values) == 0 or (values.min() >= int16.min and values.max() <= int16.max):
+        return np.int16
+
+    return np.int32
+
+
+class Nested:
+    """
+    A child table split between the rows of its parent, row i owns child rows offsets[i]:offsets[i + 1]
+    """
+
+    def __init__(self, offsets: np.ndarray, table):
+        self.offsets = offsets
+        self.table: ColumnTable = table
+
+
+class DeltaColumn:
+    """
+    A column stored against the same column of the reference frame
+
+    With mode "same" the column is unchanged. With mode "delta" the values are differences from the reference's
+    values, in steps of scale when quantized.
+    """
+
+    def __init__(self, mode: str, values: np.ndarray = None, scale: float = None):
+        self.mode = mode
+        self.values = values
+        self.scale = scale
+
+
+class ColumnTable:
+    """
+    A list of elements stored with one column per attribute, instead of a dict per element
+
+    Columns are numpy arrays with a row per element, plain lists of JSON values, or Nested child tables. A column's
+    kind says how it's encoded: "position", "float" and "color" are rounded when written as text, "value" is written
+    as is, "index" holds integers and "flag" holds booleans.
+
+    In JSON a table is written as the usual list of dicts, in the binary format every column is a raw buffer.
+
+    Tables encoded by a DeltaEncoder can also hold DeltaColumns. When their rows don't line up with the reference
+    frame's, source holds the reference row of each row, or -1 for new rows.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.attributes = dict({})
+        self.kinds = dict({})
+        self.source: np.ndarray = None
+        self._subtree_offsets: np.ndarray = None
+
+        # Decimal places each kind of column is written to as text, export profiles can lower them
+        self.precision = COLUMN_PRECISION
+
+    def delta(self, name: str, column: DeltaColumn, kind: str):
+        self.attributes[name] = column
+        self.kinds[name] = kind
+        return self
+
+    def column(self, name: str, values: np.ndarray, kind: str):
+        self.attributes[name] = values
+        self.kinds[name] = kind
+        return self
+
+    def field(self, name: str, values: list):
+        self.attributes[name] = values
+        self.kinds[name] = "field"
+        return self
+
+    def nested(self, name: str, offsets: np.ndarray, table):
+        self.attributes[name] = Nested(offsets, table)
+        self.kinds[name] = "nested"
+        return self
+
+    def expand(self, name: str, start: int = 0, end: int = None) -> list:
+        """
+        The values of one attribute as a list of JSON values, one per row from start to end
+        """
+        value = self.attributes[name]
+        kind = self.kinds[name]
+        end = self.length if end is None else end
+
+        if kind == "field":
+            return value[start:end]
+
+        if kind == "nested":
+            offsets = value.offsets[start:end + 1].tolist()
+            children = value.table.to_list(offsets[0], offsets[-1]) if len(offsets) > 0 else []
+            return [children[child_start - offsets[0]:child_end - offsets[0]]
+                    for child_start, child_end in zip(offsets[:-1], offsets[1:])]
+
+        if kind in self.precision:
+            # Float32 columns are widened first so the rounded values print cleanly
+            return value[start:end].astype(np.float64).round(decimals=self.precision[kind]).tolist()
+
+        return value[start:end].tolist()
+
+    def to_list(self, start: int = 0, end: int = None) -> list[dict]:
+        end = self.length if end is None else end
+
+        if len(self.attributes) == 0:
+            return [dict({}) for _ in range(start, end)]
+
+        names = list(self.attributes.keys())
+        expanded = [self.expand(name, start, end) for name in names]
+
+        return [dict(zip(names, row)) for row in zip(*expanded)]
+
+    def format_column(self, name: str, start: int, end: int) -> list[str]:
+        """
+        The JSON text of one column's values from start to end, one string per row
+
+        Numeric columns are formatted in bulk with a single % operation, so there are no Python calls per float.
+        """
+        value = self.attributes[name]
+        kind = self.kinds[name]
+        count = end - start
+
+        if kind == "field":
+            elements = value[start:end]
+
+            # IDs are the common case, and are escaped exactly like json.dumps does without its per call overhead
+            if all(isinstance(element, str) for element in elements):
+                return [encode_basestring_ascii(element) for element in elements]
+
+            return [json.dumps(element, default=encode_json_default) for element in elements]
+
+        column = value[start:end]
+        components = 1 if column.ndim == 1 else int(np.prod(column.shape[1:]))
+
+        # NaN and infinity have no fixed precision text, json.dumps writes them as NaN and Infinity
+        if column.dtype.kind == "f" and not np.isfinite(column).all():
+            return [json.dumps(element) for element in self.expand(name, start, end)]
+
+        if kind == "flag":
+            return np.where(column, "true", "false").tolist() if column.ndim == 1 \
+                else ["[" + ", ".join(row) + "]" for row in np.where(column, "true", "false").reshape(count, components).tolist()]
+
+        values = column.ravel()
+
+        if kind in self.precision:
+            # Rounded the same way as expand, then written as the shortest text that reads back as the rounded value,
+            # which is what json.dumps writes, so 1.5 rather than 1.500000 and 5.2e-05 rather than 0.000052
+            specifier = "%r"
+            values = values.astype(np.float64).round(decimals=self.precision[kind])
+        elif kind == "index":
+            specifier = "%d"
+        else:
+            # Written as is, the same way json.dumps writes a float
+            specifier = "%r"
+
+        row_format = specifier if column.ndim == 1 else "[" + ", ".join([specifier] * components) + "]"
+        text = ((row_format + "\n") * count) % tuple(values.tolist())
+
+        return text.split("\n")[:-1]
+
+    def format_rows(self, start: int, end: int) -> list[str]:
+        """
+        The JSON text of each row from start to end
+
+        Each column is formatted in bulk, child tables included, then the cells are spliced into every row with one %
+        operation. JSON text never holds a raw newline, so rows are split on it.
+        """
+        count = end - start
+
+        if count <= 0:
+            return []
+
+        names = list(self.attributes.keys())
+        row_format = "{" + ", ".join("{key}: %s".format(key=json.dumps(name).replace("%", "%%")) for name in names) + "}"
+
+        cells = np.empty((count, len(names)), dtype=object)
+
+        for index, name in enumerate(names):
+            if self.kinds[name] == "nested":
+                offsets = self.attributes[name].offsets[start:end + 1].tolist()
+                children = self.attributes[name].table.format_rows(offsets[0], offsets[-1])
+                cells[:, index] = ["[" + ", ".join(children[child_start - offsets[0]:child_end - offsets[0]]) + "]"
+                                   for child_start, child_end in zip(offsets[:-1], offsets[1:])]
+            else:
+                cells[:, index] = self.format_column(name, start, end)
+
+        return (((row_format + "\n") * count) % tuple(cells.ravel().tolist())).split("\n")[:-1]
+
+    def subtree_offsets(self) -> np.ndarray:
+        """
+        For each row, how many rows of this table and its child tables come before it
+        """
+        if self._subtree_offsets is None:
+            offsets = np.arange(self.length + 1)
+
+            for name, kind in self.kinds.items():
+                if kind == "nested":
+                    nested = self.attributes[name]
+                    offsets = offsets + nested.table.subtree_offsets()[nested.offsets]
+
+            self._subtree_offsets = offsets
+
+        return self._subtree_offsets
+
+    def iter_json(self, start: int = 0, end: int = None):
+        """
+        Yield the JSON text of rows start to end in pieces
+
+        Rows are formatted in chunks of about STREAM_CHUNK_ROWS rows, counting the rows of their child tables. A
+        single row with more than that under it, like one huge stroke, is streamed on its own.
+        """
+        end = self.length if end is None else end
+        subtree_offsets = self.subtree_offsets()
+        row = start
+
+        yield "["
+
+        while row < end:
+            if row > start:
+                yield ", "
+
+            chunk_end = int(np.searchsorted(subtree_offsets, subtree_offsets[row] + STREAM_CHUNK_ROWS, side="right")) - 1
+            chunk_end = min(max(chunk_end, row), row + STREAM_CHUNK_ROWS, end)
+
+            if chunk_end > row:
+                if subtree_offsets[chunk_end] - subtree_offsets[row] < BULK_FORMAT_ROWS:
+                    yield json.dumps(self.to_list(row, chunk_end), default=encode_json_default)[1:-1]
+                else:
+                    yield ", ".join(self.format_rows(row, chunk_end))
+
+                row = chunk_end
+                continue
+
+            yield "{"
+
+            for index, name in enumerate(self.attributes):
+                yield "{separator}{key}: ".format(separator=", " if index > 0 else "", key=json.dumps(name))
+
+                if self.kinds[name] == "nested":
+                    offsets = self.attributes[name].offsets
+                    yield from self.attributes[name].table.iter_json(int(offsets[row]), int(offsets[row + 1]))
+                else:
+                    yield self.format_column(name, row, row + 1)[0]
+
+            yield "}"
+            row += 1
+
+        yield "]"
+
+
+def encode_json_default(value):
+    """
+    Hook for json.dump, writes column tables as lists of dicts
+    """
+    if isinstance(value, ColumnTable):
+        return value.to_list()
+
+    raise TypeError("Object of type {name} is not JSON serializable".format(name=type(value).__name__))
+
+
+def table_rows(value) -> int:
+    """
+    How many rows the tables in a payload hold, counting child rows
+    """
+    if isinstance(value, ColumnTable):
+        return int(value.subtree_offsets()[-1])
+
+    if isinstance(value, dict):
+        return sum(table_rows(child) for child in value.values())
+
+    if isinstance(value, (list, tuple)):
+        return sum(table_rows(child) for child in value)
+
+    return 0
+
+
+def iter_json(value):
+    """
+    Yield the same JSON text json.dumps writes for a payload, in pieces, without expanding its tables whole
+    """
+    if isinstance(value, ColumnTable):
+        yield from value.iter_json()
+    elif table_rows(value) < BULK_FORMAT_ROWS:
+        # Small payloads are quickest in one go
+        yield json.dumps(value, default=encode_json_default)
+    elif isinstance(value, dict):
+        yield "{"
+        for index, (key, child) in enumerate(value.items()):
+            yield "{separator}{key}: ".format(separator=", " if index > 0 else "", key=json.dumps(key))
+            yield from iter_json(child)
+        yield "}"
+    elif isinstance(value, (list, tuple)):
+        yield "["
+        for index, child in enumerate(value):
+            if index > 0:
+                yield ", "
+            yield from iter_json(child)
+        yield "]"
+    else:
+        yield json.dumps(value, default=encode_json_default)
+
+
+def write_json(value, write):
+    """
+    Stream a payload's JSON text into write, in pieces of at least STREAM_WRITE_SIZE characters
+
+    Only the rows currently being written are expanded into Python objects and text. The tables themselves are still
+    held whole, numpy columns along with field columns like IDs that hold a string per row, so memory still grows with
+    the frame's geometry, just far more slowly than with a dict per element.
+    """
+    pieces = []
+    size = 0
+
+    for piece in iter_json(value):
+        pieces.append(piece)
+        size += len(piece)
+
+        if size >= STREAM_WRITE_SIZE:
+            write("".join(pieces))
+            pieces = []
+            size = 0
+
+    if len(pieces) > 0:
+        write("".join(pieces))
+
+
+class BinaryEncoder:
+    """
+    Splits a payload into a JSON header and a list of raw little-endian column buffers
+    """
+
+    def __init__(self, quantization: Quantization = None):
+        self.buffers: list[bytes] = []
+        self.quantization = quantization
+
+    def add_buffer(self, values: np.ndarray, type_name: str) -> dict:
+        data = np.ascontiguousarray(values, dtype=np.dtype(type_name).newbyteorder("<"))
+        self.buffers.append(data.tobytes())
+
+        return dict({
+            "buffer": len(self.buffers) - 1,
+            "type": type_name,
+            "components": 1 if data.ndim == 1 else int(np.prod(data.shape[1:])),
+        })
+
+    def encode_table(self, table: ColumnTable) -> dict:
+        attributes = dict({})
+
+        for name, value in table.attributes.items():
+            kind = table.kinds[name]
+
+            if isinstance(value, DeltaColumn):
+                attributes[name] = self.encode_delta(value, kind)
+            elif kind == "field":
+                attributes[name] = dict({"values": value})
+            elif kind == "nested":
+                attributes[name] = dict({
+                    "offsets": self.encode_delta(value.offsets, "index") if isinstance(value.offsets, DeltaColumn)
+                    else self.add_buffer(value.offsets, "uint32"),
+                    "table": self.encode_table(value.table),
+                })
+            elif self.quantization and kind == "position":
+                steps, origin = self.quantization.positions(value)
+                attributes[name] = self.add_buffer(steps, steps.dtype.name)
+                attributes[name]["kind"] = kind
+                attributes[name]["quantized"] = dict({"origin": origin, "step": self.quantization.step})
+            elif self.quantization and kind == "color":
+                attributes[name] = self.add_buffer(self.quantization.colors(value), "uint8")
+                attributes[name]["kind"] = kind
+                attributes[name]["quantized"] = dict({"scale": 1 / COLOR_LEVELS})
+            else:
+                attributes[name] = self.add_buffer(value, COLUMN_TYPES[kind])
+                attributes[name]["kind"] = kind
+
+        encoded = dict({"length": table.length, "attributes": attributes})
+
+        if table.source is not None:
+            encoded["source"] = self.add_buffer(table.source, "int32")
+
+        return dict({"$table": encoded})
+
+    def encode_delta(self, column: DeltaColumn, kind: str) -> dict:
+        if column.mode == "same":
+            return dict({"same": True})
+
+        type_name = np.dtype(smallest_int_type(column.values)).name if column.scale else "float32"
+        encoded = self.add_buffer(column.values, type_name)
+        encoded["kind"] = kind
+        encoded["delta"] = True
+
+        if column.scale:
+            encoded["quantized"] = dict({"scale": column.scale})
+
+        return encoded
+
+    def encode(self, value):
+        """
+        A copy of the payload with every column table replaced by a description of its buffers
+        """
+        if isinstance(value, ColumnTable):
+            return self.encode_table(value)
+
+        if isinstance(value, dict):
+            return dict({key: self.encode(child) for key, child in value.items()})
+
+        if isinstance(value, list):
+            return [self.encode(child) for child in value]
+
+        return value
+
+
+def encode_binary(contents: dict, quantization: Quantization = None) -> bytes:
+    """
+    Encode a payload in the binary format
+
+    The file is the magic bytes, the format version and the header length as little-endian uint32s, then the JSON
+    header, then each buffer. The header and every buffer are padded to BINARY_ALIGNMENT bytes, and the header lists
+    each buffer's offset from the start of the file and its length in bytes.
+
+    With a quantization, position and color columns are stored as integers and the header records the error bound.
+    """
+    encoder = BinaryEncoder(quantization)
+    payload = encoder.encode(contents)
+    quantization_header = quantization.header() if quantization else None
+
+    def padding(length: int) -> int:
+        return -length % BINARY_ALIGNMENT
+
+    # The header holds the buffer offsets, which depend on the header's length, so guess and grow until it fits
+    prefix_length = len(BINARY_MAGIC) + 8
+    header_length = 0
+
+    while True:
+        offset = prefix_length + header_length
+        buffer_table = []
+
+        for buffer in encoder.buffers:
+            buffer_table.append([offset, len(buffer)])
+            offset += len(buffer) + padding(len(buffer))
+
+        header_struct = dict({"buffers": buffer_table, "payload": payload})
+
+        if quantization_header:
+            header_struct["quantization"] = quantization_header
+
+        header = json.dumps(header_struct, separators=(",", ":")).encode("utf-8")
+        needed_length = len(header) + padding(prefix_length + len(header))
+
+        if needed_length <= header_length:
+            break
+
+        header_length = needed_length
+
+    chunks = [
+        BINARY_MAGIC,
+        struct.pack("<II", BINARY_VERSION, header_length),
+        header + b" " * (header_length - len(header)),
+    ]
+
+    for buffer in encoder.buffers:
+        chunks.append(buffer)
+        chunks.append(b"\0" * padding(len(buffer)))
+
+    return b"".join(chunks)
+
+
+class DeltaEncoder:
+    """
+    Encodes each object's frames as a keyframe followed by deltas against the frame before, like a video's group of
+    pictures
+
+    Every keyframe_interval frames an object is written in full. In between, unchanged columns are left out, and
+    position, float and color columns are stored as differences from the previous frame. Rows are matched to the
+    previous frame by their ids, or by position when the table has no ids.
+
+    Differences are taken against what a decoder will have rebuilt, not the original values, so quantization error
+    doesn't build up over a run of deltas. Frames must be encoded in order, and decoded in the same order.
+    """
+
+    def __init__(self, keyframe_interval: int, quantization: Quantization = None):
+        self.keyframe_interval = keyframe_interval
+        self.quantization = quantization
+
+        # "type:name" -> (frames since the keyframe, frame number, the payload as a decoder rebuilds it)
+        self.references = dict({})
+
+    def encode(self, contents: dict) -> dict:
+        key = "{type}:{name}".format(type=contents.get("type"), name=contents.get("name"))
+        reference = self.references.get(key)
+
+        if reference is None or reference[0] + 1 >= self.keyframe_interval:
+            encoded, rebuilt = self.encode_value(contents, None)
+            self.references[key] = (0, contents["frame"], rebuilt)
+            return encoded
+
+        frames_since_keyframe, reference_frame, reference_contents = reference
+
+        encoded, rebuilt = self.encode_value(contents, reference_contents)
+        encoded["deltaFrom"] = reference_frame
+
+        self.references[key] = (frames_since_keyframe + 1, contents["frame"], rebuilt)
+
+        return encoded
+
+    def encode_value(self, value, reference):
+        """
+        The value encoded against the reference, and the value as a decoder will rebuild it
+        """
+        if isinstance(value, ColumnTable):
+            return self.encode_table(value, reference if isinstance(reference, ColumnTable) else None)
+
+        if isinstance(value, dict):
+            encoded = dict({})
+            rebuilt = dict({})
+
+            for key, child in value.items():
+                child_reference = reference.get(key) if isinstance(reference, dict) else None
+                encoded[key], rebuilt[key] = self.encode_value(child, child_reference)
+
+            return encoded, rebuilt
+
+        if isinstance(value, list):
+            pairs = [
+                self.encode_value(child, reference[index] if isinstance(reference, list) and index < len(reference) else None)
+                for index, child in enumerate(value)
+            ]
+
+            return [encoded for encoded, _ in pairs], [rebuilt for _, rebuilt in pairs]
+
+        return value, value
+
+    def rebuild(self, values: np.ndarray, kind: str) -> np.ndarray:
+        """
+        The values of a column written in full, as a decoder will read them
+        """
+        scale = self.quantization.scale(kind) if self.quantization else None
+
+        if scale and kind == "position":
+            steps, origin = self.quantization.positions(values)
+            return (steps.astype(np.float64) * scale + np.array(origin)).astype(np.float32)
+
+        if scale:
+            return (self.quantization.colors(values).astype(np.float64) * scale).astype(np.float32)
+
+        return np.asarray(values, dtype=COLUMN_TYPES[kind])
+
+    def match_rows(self, table: ColumnTable, reference: ColumnTable):
+        """
+        Whether the rows line up with the reference's, and if not, the reference row of each row or -1
+        """
+        if reference is None:
+            return False, None
+
+        ids = table.attributes.get("id") if table.kinds.get("id") == "field" else None
+        reference_ids = reference.attributes.get("id") if reference.kinds.get("id") == "field" else None
+
+        if ids is not None and reference_ids is not None:
+            if ids == reference_ids:
+                return True, None
+
+            reference_rows = dict({element_id: row for row, element_id in enumerate(reference_ids)})
+            return False, np.array([reference_rows.get(element_id, -1) for element_id in ids], dtype=np.int32)
+
+        # With implicit IDs, elements that can disappear keep their original index instead
+        indices = table.attributes.get("index") if table.kinds.get("index") == "index" else None
+        reference_indices = reference.attributes.get("index") if reference.kinds.get("index") == "index" else None
+
+        if indices is not None and reference_indices is not None:
+            if np.array_equal(indices, reference_indices):
+                return True, None
+
+            # Both are in ascending order, so each index is looked up in the reference's by binary search
+            rows = np.searchsorted(reference_indices, indices)
+            rows = np.minimum(rows, max(len(reference_indices) - 1, 0))
+            found = len(reference_indices) > 0 and reference_indices[rows] == indices
+            return False, np.where(found, rows, -1).astype(np.int32)
+
+        return table.length == reference.length, None
+
+    def encode_table(self, table: ColumnTable, reference: ColumnTable):
+        aligned, source = self.match_rows(table, reference)
+
+        encoded = ColumnTable(table.length)
+        rebuilt = ColumnTable(table.length)
+        encoded.source = source
+
+        for name, value in table.attributes.items():
+            kind = table.kinds[name]
+            reference_value = reference.attributes.get(name) if reference and reference.kinds.get(name) == kind else None
+
+            if kind == "field":
+                if aligned and reference_value == value:
+                    encoded.delta(name, DeltaColumn("same"), kind)
+                else:
+                    encoded.field(name, value)
+
+                rebuilt.field(name, value)
+                continue
+
+            if kind == "nested":
+                child_encoded, child_rebuilt = self.encode_table(value.table, reference_value.table if reference_value else None)
+
+                same_offsets = aligned and reference_value is not None \
+                    and np.array_equal(value.offsets, reference_value.offsets)
+                encoded.nested(name, DeltaColumn("same") if same_offsets else value.offsets, child_encoded)
+                rebuilt.nested(name, value.offsets, child_rebuilt)
+                continue
+
+            full = self.rebuild(value, kind)
+
+            # An empty reference column has no rows to predict from, even when the ids matched up (none of them did)
+            matched = (aligned or source is not None) and isinstance(reference_value, np.ndarray) \
+                and reference_value.shape[1:] == full.shape[1:] and len(reference_value) > 0
+
+            if not matched or kind not in COLUMN_PRECISION:
+                if aligned and isinstance(reference_value, np.ndarray) and np.array_equal(full, reference_value):
+                    encoded.delta(name, DeltaColumn("same"), kind)
+                    rebuilt.column(name, reference_value, kind)
+                else:
+                    encoded.column(name, value, kind)
+                    rebuilt.column(name, full, kind)
+                continue
+
+            if aligned and np.array_equal(full, reference_value):
+                encoded.delta(name, DeltaColumn("same"), kind)
+                rebuilt.column(name, reference_value, kind)
+                continue
+
+            # New rows are predicted as zero, so their delta is their whole value
+            if aligned:
+                predicted = reference_value
+            else:
+                predicted = reference_value[np.maximum(source, 0)]
+                predicted[source < 0] = 0
+
+            scale = self.quantization.scale(kind) if self.quantization else None
+
+            if scale:
+                target = np.clip(value, 0, 1) if kind == "color" else value
+                steps = np.rint((target - predicted.astype(np.float64)) / scale)
+                encoded.delta(name, DeltaColumn("delta", steps, scale), kind)
+                rebuilt.column(name, (predicted.astype(np.float64) + steps * scale).astype(np.float32), kind)
+            else:
+                differences = (value - predicted).astype(np.float32)
+                encoded.delta(name, DeltaColumn("delta", differences), kind)
+                rebuilt.column(name, predicted.astype(np.float32) + differences, kind)
+
+        return encoded, rebuilt
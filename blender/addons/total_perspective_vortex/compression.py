@@ -0,0 +1,185 @@
+"""
+Compression of exported files, and a report comparing the codecs on real exports
+
+The report can be run on a finished export with any Python 3:
+
+python compression.py <export folder> [--levels 1 6 9]
+"""
+import argparse
+import gzip
+import lzma
+import os
+import time
+import zlib
+
+# The codecs an export can be compressed with, as (identifier, name, description) enum items
+OUTPUT_COMPRESSIONS = [
+    ("NONE", "None", "Uncompressed"),
+    ("GZIP", "Gzip", "Gzip at the chosen level, readable by most tools"),
+    ("ZLIB", "Zlib", "A zlib stream at the chosen level"),
+]
+
+# The codecs the report compares. LZMA is smaller still, but the interface can't read it, so exports don't offer it
+REPORT_COMPRESSIONS = [identifier for identifier, _, _ in OUTPUT_COMPRESSIONS] + ["LZMA"]
+
+# The extension each codec adds after the format's
+COMPRESSION_EXTENSIONS = dict({
+    "NONE": "",
+    "GZIP": ".gz",
+    "ZLIB": ".zz",
+})
+
+
+def compress(data: bytes, compression: str, level: int) -> bytes:
+    """
+    Compress data with a codec at a level from 0 to 9
+
+    zlib and lzma release the GIL while they work, so writer threads compress in parallel.
+    """
+    if compression == "GZIP":
+        # A fixed timestamp keeps the output the same for the same input
+        return gzip.compress(data, compresslevel=level, mtime=0)
+
+    if compression == "ZLIB":
+        return zlib.compress(data, level)
+
+    if compression == "LZMA":
+        return lzma.compress(data, preset=level)
+
+    return data
+
+
+def compressor(compression: str, level: int):
+    """
+    An object that compresses a stream piece by piece with compress(data) and finishes it with flush()
+    """
+    if compression == "GZIP":
+        # wbits of 31 writes a gzip header and trailer, with no timestamp
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    if compression == "ZLIB":
+        return zlib.compressobj(level)
+
+    raise ValueError("Unknown compression {compression}".format(compression=compression))
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    if compression == "GZIP":
+        return gzip.decompress(data)
+
+    if compression == "ZLIB":
+        return zlib.decompress(data)
+
+    if compression == "LZMA":
+        return lzma.decompress(data)
+
+    return data
+
+
+def compression_of(file_path: str) -> str:
+    """
+    The codec a file was compressed with, going by its extension
+    """
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if extension and file_path.endswith(extension):
+            return compression
+
+    return "NONE"
+
+
+def codec_report(file_paths: list[str], levels: list[int]) -> list[dict]:
+    """
+    Compress and decompress the files with every codec at every level, timing each
+    """
+    samples = []
+
+    for file_path in file_paths:
+        with open(file_path, "rb") as infile:
+            samples.append(decompress(infile.read(), compression_of(file_path)))
+
+    original_size = sum(len(sample) for sample in samples)
+    rows = []
+
+    for compression in REPORT_COMPRESSIONS:
+        for level in levels if compression != "NONE" else [0]:
+            start = time.perf_counter()
+            compressed = [compress(sample, compression, level) for sample in samples]
+            compress_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for data in compressed:
+                decompress(data, compression)
+            decompress_time = time.perf_counter() - start
+
+            compressed_size = sum(len(data) for data in compressed)
+
+            rows.append(dict({
+                "compression": compression,
+                "level": level,
+                "size": compressed_size,
+                "ratio": original_size / max(compressed_size, 1),
+                "compress_speed": original_size / max(compress_time, 1e-9),
+                "decompress_speed": original_size / max(decompress_time, 1e-9),
+            }))
+
+    return rows
+
+
+def format_codec_report(rows: list[dict]) -> str:
+    lines = ["{:<6} {:>5} {:>12} {:>7} {:>14} {:>16}".format(
+        "codec", "level", "bytes", "ratio", "compress MB/s", "decompress MB/s")]
+
+    for row in rows:
+        lines.append("{compression:<6} {level:>5} {size:>12} {ratio:>7.2f} {compress:>14.1f} {decompress:>16.1f}".format(
+            compression=row["compression"],
+            level=row["level"],
+            size=row["size"],
+            ratio=row["ratio"],
+            compress=row["compress_speed"] / 1e6,
+            decompress=row["decompress_speed"] / 1e6,
+        ))
+
+    return "\n".join(lines)
+
+
+def export_files(folder: str, limit: int = 200) -> list[str]:
+    """
+    Up to limit exported files from a folder, spread evenly over it
+    """
+    file_paths = []
+
+    for parent, _, files in os.walk(folder):
+        for file in files:
+            name = file
+
+            for extension in COMPRESSION_EXTENSIONS.values():
+                if extension and name.endswith(extension):
+                    name = name[:-len(extension)]
+
+            if name.endswith(".json") or name.endswith(".tpvb"):
+                file_paths.append(os.path.join(parent, file))
+
+    file_paths.sort()
+    stride = max(1, len(file_paths) // limit)
+
+    return file_paths[::stride][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare compression codecs on an export")
+    parser.add_argument("folder", help="A folder exported by Total Perspective Vortex")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9], help="Levels to try each codec at")
+    parser.add_argument("--limit", type=int, default=200, help="The most files to sample")
+    args = parser.parse_args()
+
+    file_paths = export_files(args.folder, args.limit)
+
+    if len(file_paths) == 0:
+        raise SystemExit("No exported files in {folder}".format(folder=args.folder))
+
+    print("{count} files sampled from {folder}".format(count=len(file_paths), folder=args.folder))
+    print(format_codec_report(codec_report(file_paths, args.levels)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Incremental exports, which only rewrite the frames and objects whose inputs changed since the last export
+
+Each export records a fingerprint of every object's inputs in the output folder. A fingerprint is a plain dict:
+
+{
+    "inputs": hash of everything that holds for the whole range, settings, modifiers, materials, custom properties,
+    "channels": {
+        path: {"kind": "interpolated" or "held", "static": hash of the curve's settings, "keys": [[frame, key], ...]}
+    },
+    "always": whether the object has to be exported every time, such as when drivers feed it,
+    "cumulative": whether a change on one frame carries on to every frame after it, like a particle simulation,
+    "scene": whether it depends on the rest of the scene, through occlusion or line art,
+    "dependencies": names of the objects it follows, its parent and the targets of its constraints and modifiers,
+    "frames": [start frame, end frame] of the export that wrote it,
+}
+
+The manifest also lists the objects the last export's scene dependent objects depended on, its "scene".
+
+Interpolated channels are F-curves, a changed key changes the curve from the key before it to the key after it.
+Held channels are grease pencil drawings, a changed drawing shows from its frame until the next one.
+"""
+import json
+import os
+
+# The fingerprints of an export are written to this file in the output folder. It's hidden and has no export
+# extension, so the interface doesn't try to read it as an export.
+MANIFEST_FILE = ".fingerprints"
+
+
+def read_manifest(output_path: str) -> dict:
+    """
+    The fingerprints recorded by the last export into a folder, along with the settings it was written with
+    """
+    file_path = os.path.join(output_path, MANIFEST_FILE)
+
+    if not os.path.exists(file_path):
+        return dict({"settings": None, "objects": dict({}), "scene": []})
+
+    with open(file_path) as infile:
+        return json.load(infile)
+
+
+def write_manifest(output_path: str, settings: list, fingerprints: dict, scene: list[str]):
+    """
+    Record the fingerprints of an export and the camera and occluders it saw, objects from earlier exports into the
+    same folder are kept
+    """
+    manifest = read_manifest(output_path)
+
+    # Fingerprints of exports with other settings describe files that have been overwritten
+    if manifest["settings"] != settings:
+        manifest["objects"] = dict({})
+
+    manifest["settings"] = settings
+    manifest["objects"].update(fingerprints)
+    manifest["scene"] = scene
+
+    with open(os.path.join(output_path, MANIFEST_FILE), "w") as outfile:
+        json.dump(manifest, outfile)
+
+
+def discard_manifest(output_path: str):
+    """
+    Forget the fingerprints in a folder, once a full export has overwritten the files they describe
+    """
+    file_path = os.path.join(output_path, MANIFEST_FILE)
+
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def changed_key_spans(previous: list, current: list, interpolated: bool) -> list[tuple[float, float]]:
+    """
+    The spans of frames a change between two lists of [frame, key] pairs affects, inclusive at both ends
+
+    Keys only in one of the lists have changed. Spans without a key on one side run to the end of the range.
+    """
+    previous_keys = set(json.dumps(key) for key in previous)
+    current_keys = set(json.dumps(key) for key in current)
+    spans = []
+
+    for keys, other in ((previous, current_keys), (current, previous_keys)):
+        frames = [key[0] for key in keys]
+
+        for index, key in enumerate(keys):
+            if json.dumps(key) in other:
+                continue
+
+            before = frames[index - 1] if index > 0 else float("-inf")
+            after = frames[index + 1] if index + 1 < len(frames) else float("inf")
+
+            if interpolated:
+                spans.append((before, after))
+            else:
+                # A drawing shows up to the frame before the next one
+                spans.append((key[0], after - 1))
+
+    return spans
+
+
+def own_dirty_frames(previous: dict, current: dict, frames: range) -> set[int]:
+    """
+    The frames an object's own inputs changed on since its previous fingerprint
+    """
+    every_frame = set(frames)
+
+    if previous is None or current["always"] or previous["inputs"] != current["inputs"] \
+            or previous["channels"].keys() != current["channels"].keys():
+        return every_frame
+
+    # Frames the previous export didn't cover were never written
+    previous_start, previous_end = previous["frames"]
+    dirty = set(frame for frame in frames if frame < previous_start or frame >= previous_end)
+
+    for path, channel in current["channels"].items():
+        previous_channel = previous["channels"][path]
+
+        if channel["kind"] != previous_channel["kind"] or channel["static"] != previous_channel["static"]:
+            return every_frame
+
+        for start, end in changed_key_spans(previous_channel["keys"], channel["keys"],
+                                            channel["kind"] == "interpolated"):
+            dirty.update(frame for frame in frames if start <= frame <= end)
+
+    if current["cumulative"] and len(dirty) > 0:
+        first = min(dirty)
+        dirty.update(frame for frame in frames if frame >= first)
+
+    return dirty
+
+
+def dirty_frames(previous: dict, current: dict, exported: list[str], scene: list[str], previous_scene: list[str],
+                 frames: range) -> dict[str, set[int]]:
+    """
+    The frames each exported object has to be written on again
+
+    An object is dirty wherever its own inputs or those of an object it follows changed. Objects that depend on the
+    rest of the scene are also dirty wherever the camera or an occluder, the objects listed in scene, changed. An
+    object in the previous export's scene that's gone from this one, like a deleted occluder, changed on every frame.
+    """
+    own = dict({
+        name: own_dirty_frames(previous.get(name), fingerprint, frames) for name, fingerprint in current.items()
+    })
+
+    def followed(name: str, seen: set) -> set[int]:
+        dirty = set(own.get(name, ()))
+
+        for dependency in current[name]["dependencies"]:
+            if dependency in current and dependency not in seen:
+                seen.add(dependency)
+                dirty |= followed(dependency, seen)
+
+        return dirty
+
+    scene_dirty = set()
+
+    if any(name not in scene for name in previous_scene):
+        scene_dirty = set(frames)
+
+    for name in scene:
+        scene_dirty |= followed(name, set([name]))
+
+    result = dict({})
+
+    for name in exported:
+        dirty = followed(name, set([name]))
+
+        if current[name]["scene"]:
+            dirty |= scene_dirty
+
+        result[name] = dirty
+
+    return result
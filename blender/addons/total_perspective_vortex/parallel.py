@@ -0,0 +1,242 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import bpy
+
+# The script each headless Blender process runs
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tpv_cli.py")
+
+# Shards export into these folders inside the output folder, on the same drive so merging them is a rename
+STAGING_FOLDER = ".shards"
+
+# export_frames prints this at the start of every frame
+PROGRESS_PREFIX = "Processing frame "
+
+# Seconds between checks on the workers
+POLL_INTERVAL = 0.25
+
+
+def split_frame_range(start_frame: int, end_frame: int, shard_count: int) -> list[tuple[int, int]]:
+    """
+    Split the range start_frame:end_frame into at most shard_count contiguous ranges of near equal length
+    """
+    frame_count = end_frame - start_frame
+    shard_count = max(1, min(shard_count, frame_count))
+
+    bounds = [start_frame + (frame_count * index) // shard_count for index in range(shard_count + 1)]
+
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def merge_folder(source: str, destination: str):
+    """
+    Move every file under source into the same relative place under destination, replacing what's there
+    """
+    for folder, _, files in os.walk(source):
+        target_folder = os.path.join(destination, os.path.relpath(folder, source))
+        os.makedirs(target_folder, exist_ok=True)
+
+        for file in files:
+            os.replace(os.path.join(folder, file), os.path.join(target_folder, file))
+
+    shutil.rmtree(source, ignore_errors=True)
+
+
+class Shard:
+    """
+    A contiguous range of frames exported by one headless Blender process
+    """
+
+    def __init__(self, index: int, start_frame: int, end_frame: int, staging_path: str):
+        self.index = index
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.staging_path = staging_path
+
+        self.attempts = 0
+        self.frames_done = 0
+        self.process: subprocess.Popen = None
+        self.reader: threading.Thread = None
+        self.last_lines: list[str] = []
+
+    def start(self, blend_path: str, object_names: list[str], settings):
+        self.attempts += 1
+        self.frames_done = 0
+        self.last_lines = []
+
+        # Start from a clean folder so a retry can't mix with the failed attempt
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+        os.makedirs(self.staging_path)
+
+        args = [
+            bpy.app.binary_path,
+            "--background",
+            blend_path,
+            "--factory-startup",
+            "--python-exit-code", "1",
+        ]
+
+        # Drivers with Python expressions need the same trust the parent session has
+        if bpy.context.preferences.filepaths.use_scripts_auto_execute:
+            args.append("--enable-autoexec")
+
+        args += [
+            "--python", WORKER_SCRIPT,
+            "--",
+            *settings.to_arguments(self.staging_path),
+            "--frame-start", str(self.start_frame),
+            "--frame-end", str(self.end_frame),
+            "--objects", *object_names,
+        ]
+
+        self.process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        self.reader = threading.Thread(target=self.read_output, daemon=True)
+        self.reader.start()
+
+    def read_output(self):
+        for line in self.process.stdout:
+            if line.startswith(PROGRESS_PREFIX):
+                self.frames_done += 1
+
+            # Keep the tail of the log to explain failures
+            self.last_lines = (self.last_lines + [line.rstrip()])[-20:]
+
+    def finished(self):
+        """
+        The process exit code, or None while it is still running
+        """
+        code = self.process.poll()
+
+        if code is not None:
+            self.reader.join()
+
+        return code
+
+
+class ParallelExport:
+    """
+    An export of start_frame:end_frame across settings.workers headless Blender processes, one contiguous shard each
+
+    Every shard exports into its own staging folder and is merged into the output folder once it succeeds. Failed
+    shards are retried up to settings.retries times. Nothing here waits on the workers, poll() checks on them and
+    starts the next shards, so it can be driven from a modal operator's timer without holding up Blender's UI.
+    """
+
+    def __init__(self, context, object_names: list[str], start_frame: int, end_frame: int, settings):
+        self.object_names = object_names
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.settings = settings
+
+        # The workers load a copy of the current state, so unsaved changes are exported too
+        self.temp_folder = tempfile.mkdtemp(prefix="tpv_")
+        self.blend_path = os.path.join(self.temp_folder, "export.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=self.blend_path, copy=True)
+
+        self.staging_root = os.path.join(settings.output_path, STAGING_FOLDER)
+
+        self.shards = [
+            Shard(index, shard_start, shard_end, os.path.join(self.staging_root, str(index)))
+            for index, (shard_start, shard_end) in enumerate(
+                split_frame_range(start_frame, end_frame, settings.workers))
+        ]
+
+        self.pending = list(self.shards)
+        self.running: list[Shard] = []
+        self.failed: list[Shard] = []
+        self.merged_frames = 0
+        self.reported_frames = -1
+        self.total_frames = end_frame - start_frame
+
+        self.window_manager = context.window_manager
+        self.window_manager.progress_begin(0, max(self.total_frames, 1))
+
+    def frames_done(self) -> int:
+        return self.merged_frames + sum(shard.frames_done for shard in self.running)
+
+    def poll(self) -> bool:
+        """
+        Merge finished shards, retry failed ones and start pending ones, returns whether every shard is done
+        """
+        for shard in list(self.running):
+            code = shard.finished()
+
+            if code is None:
+                continue
+
+            self.running.remove(shard)
+
+            if code == 0:
+                merge_folder(shard.staging_path, self.settings.output_path)
+                self.merged_frames += shard.end_frame - shard.start_frame
+                continue
+
+            print("Shard {start}-{end} failed with exit code {code}:".format(start=shard.start_frame, end=shard.end_frame - 1, code=code))
+            print("\n".join(shard.last_lines))
+
+            if shard.attempts <= self.settings.retries:
+                self.pending.append(shard)
+            else:
+                self.failed.append(shard)
+
+        while len(self.pending) > 0 and len(self.running) < self.settings.workers:
+            shard = self.pending.pop(0)
+            shard.start(self.blend_path, self.object_names, self.settings)
+            self.running.append(shard)
+
+        # Update the progress bar
+        frames_done = self.frames_done()
+
+        if frames_done != self.reported_frames:
+            self.reported_frames = frames_done
+            self.window_manager.progress_update(frames_done)
+            print("Exported {frames_done} of {total_frames} frames across {running} workers".format(
+                frames_done=frames_done, total_frames=self.total_frames, running=len(self.running)))
+
+        return len(self.pending) == 0 and len(self.running) == 0
+
+    def cancel(self):
+        """
+        Stop every worker, their shards count as failed
+        """
+        for shard in self.running:
+            shard.process.kill()
+
+        self.failed += self.running + self.pending
+        self.running = []
+        self.pending = []
+
+    def finish(self) -> list[Shard]:
+        """
+        Clean up once the export is done or abandoned, returns the shards that never succeeded
+        """
+        if len(self.running) > 0 or len(self.pending) > 0:
+            self.cancel()
+
+        self.window_manager.progress_end()
+        shutil.rmtree(self.temp_folder, ignore_errors=True)
+
+        # Failed shards only leave partial frames behind, which the interface would otherwise pick up as exported
+        shutil.rmtree(self.staging_root, ignore_errors=True)
+
+        return self.failed
+
+
+def export_parallel(context, object_names: list[str], start_frame: int, end_frame: int, settings) -> list[Shard]:
+    """
+    Run a ParallelExport to the end, waiting on the workers here, for headless exports where nothing else runs
+
+    Returns the shards that never succeeded.
+    """
+    job = ParallelExport(context, object_names, start_frame, end_frame, settings)
+
+    try:
+        while not job.poll():
+            time.sleep(POLL_INTERVAL)
+    finally:
+        failed = job.finish()
+
+    return failed
@@ -0,0 +1,80 @@
+from .columns import COLUMN_PRECISION, ColumnTable
+
+
+class ExportProfile:
+    """
+    How precisely an export is written as text, and which attributes each type of export leaves out
+
+    Attributes are the columns of the export's tables, at any depth, and are listed per export type. With an include
+    list only the listed attributes are kept, so it has to name the child tables too, such as "points".
+    """
+
+    def __init__(self, precision: dict, include: dict = None, exclude: dict = None):
+        self.precision = precision
+        self.include = include or dict({})
+        self.exclude = exclude or dict({})
+
+    def keeps(self, export_type: str, name: str) -> bool:
+        if export_type in self.include and name not in self.include[export_type]:
+            return False
+
+        return name not in self.exclude.get(export_type, [])
+
+    def apply(self, contents: dict) -> dict:
+        """
+        A copy of an object's export with the profile's precision and without its left out attributes
+        """
+        if self.precision == COLUMN_PRECISION and len(self.include) == 0 and len(self.exclude) == 0:
+            return contents
+
+        return self.filter(contents, contents.get("type"))
+
+    def filter(self, value, export_type: str):
+        if isinstance(value, ColumnTable):
+            table = ColumnTable(value.length)
+            table.precision = self.precision
+
+            for name, column in value.attributes.items():
+                kind = value.kinds[name]
+
+                if not self.keeps(export_type, name):
+                    continue
+
+                if kind == "nested":
+                    table.nested(name, column.offsets, self.filter(column.table, export_type))
+                else:
+                    table.attributes[name] = column
+                    table.kinds[name] = kind
+
+            return table
+
+        if isinstance(value, dict):
+            return dict({key: self.filter(child, export_type) for key, child in value.items()})
+
+        if isinstance(value, list):
+            return [self.filter(child, export_type) for child in value]
+
+        return value
+
+
+# The profiles an export can be written with, as (identifier, name, description) enum items
+EXPORT_PROFILES = [
+    ("FULL", "Full", "Every attribute at full precision, for final exports"),
+    ("PREVIEW", "Preview", "Only the attributes the optimiser reads, at a hundredth of a millimeter, for quick looks"),
+]
+
+PROFILES = dict({
+    "FULL": ExportProfile(COLUMN_PRECISION),
+    "PREVIEW": ExportProfile(
+        dict({
+            "position": 2,
+            "float": 3,
+            "color": 2,
+        }),
+        exclude=dict({
+            "gpencil": ["pressure", "strength"],
+            "particles": ["quaternion", "lifecycle"],
+            "gn_curves": ["uv"],
+        }),
+    ),
+})
@@ -0,0 +1,123 @@
+"""
+Timelines gather every frame of an object that only exports a handful of values into a single file
+
+A timeline holds one channel per exported value, named by its path in the export such as "position" or
+"material.color". A channel that never changes is stored once as its value, the rest as a list of values with one
+per frame:
+
+{
+    "type": "timeline",
+    "objectType": "camera",
+    "name": "Camera",
+    "frames": [1, 2, 3],
+    "channels": {
+        "position": {"values": [[0, 0, 100], [0, 0, 110], [0, 0, 120]]},
+        "focal_length": {"value": 50.0}
+    }
+}
+
+A value missing from some frames, like a custom property added partway through, is null on those frames.
+"""
+
+# The export types written as timelines
+TIMELINE_TYPES = ("camera", "light", "effector", "empty")
+
+# Timelines are written to this folder inside the output folder
+TIMELINE_FOLDER = "timelines"
+
+# Keys every export has, the timeline holds them once or as its frames
+EXPORT_KEYS = ("type", "name", "frame")
+
+
+def flatten_channels(contents: dict, prefix: str = "") -> dict:
+    """
+    The values of an export by their dotted path, nested objects are flattened and lists are kept whole
+    """
+    channels = dict({})
+
+    for key, value in contents.items():
+        if prefix == "" and key in EXPORT_KEYS:
+            continue
+
+        if isinstance(value, dict):
+            channels.update(flatten_channels(value, prefix + key + "."))
+        else:
+            channels[prefix + key] = value
+
+    return channels
+
+
+class Timeline:
+    """
+    Every frame of one object's export, held channel by channel until the export is finished
+    """
+
+    def __init__(self, export_type: str, name: str):
+        self.export_type = export_type
+        self.name = name
+        self.frames: list[int] = []
+        self.channels: dict[str, list] = dict({})
+
+    def add(self, frame_number: int, contents: dict):
+        values = flatten_channels(contents)
+
+        # Channels first seen on this frame were missing from every frame before it
+        for path in values.keys():
+            if path not in self.channels:
+                self.channels[path] = [None] * len(self.frames)
+
+        for path, channel in self.channels.items():
+            channel.append(values.get(path))
+
+        self.frames.append(frame_number)
+
+    def to_json(self) -> dict:
+        channels = dict({})
+
+        for path, values in self.channels.items():
+            first = values[0]
+
+            if all(value == first for value in values):
+                channels[path] = dict({"value": first})
+            else:
+                channels[path] = dict({"values": values})
+
+        return dict({
+            "type": "timeline",
+            "objectType": self.export_type,
+            "name": self.name,
+            "frames": self.frames,
+            "channels": channels,
+        })
+
+
+class Timelines:
+    """
+    The timeline of every object in a run, exports of other types are left to be written per frame
+    """
+
+    def __init__(self):
+        self.timelines: dict[tuple[str, str], Timeline] = dict({})
+
+    def add(self, contents: dict) -> bool:
+        """
+        Add an export to its object's timeline, returns whether it was taken
+        """
+        export_type = contents.get("type")
+
+        if export_type not in TIMELINE_TYPES:
+            return False
+
+        key = (export_type, contents["name"])
+        timeline = self.timelines.get(key)
+
+        if timeline is None:
+            timeline = Timeline(export_type, contents["name"])
+            self.timelines[key] = timeline
+
+        timeline.add(contents["frame"], contents)
+
+        return True
+
+    def __iter__(self):
+        return iter(self.timelines.values())
@@ -1,7 +1,13 @@
+from __future__ import annotations
+
 import random
 
+import bisect
+import functools
+import hashlib
 import os
 import json
+import threading
 import bpy
 import bmesh
 import mathutils
@@ -9,6 +15,14 @@ import re
 import numpy as np
 
 from bpy.types import Operator
+from . import columns
+from . import compression
+from . import profiles
+from . import incremental
+from . import parallel
+from . import timelines
+from . import writer
+from .columns import ColumnTable
 from mathutils.bvhtree import BVHTree
 from typing import TypedDict
 from mathutils import Vector
@@ -30,27 +44,313 @@ class TPVExportLayout(bpy.types.Panel):
         row = layout.row(align=True)
         row.prop(context.scene, 'export_pathStatic', icon="MESH_CUBE")
         row = layout.row(align=True)
+        row.prop(context.scene, 'export_format')
+        row.prop(context.scene, 'export_layout')
+        row.prop(context.scene, 'export_writer_threads')
+        row = layout.row(align=True)
+        row.prop(context.scene, 'export_profile')
+        row.prop(context.scene, 'export_id_mode')
+        row.prop(context.scene, 'export_compression')
+        if context.scene.export_compression != "NONE":
+            row.prop(context.scene, 'export_compression_level')
+        row = layout.row(align=True)
+        row.prop(context.scene, 'export_timelines')
+        row.prop(context.scene, 'export_incremental')
+        if context.scene.export_format == "BINARY":
+            row = layout.row(align=True)
+            row.prop(context.scene, 'export_quantize_step')
+            row.prop(context.scene, 'export_quantize_bounds')
+            row = layout.row(align=True)
+            row.prop(context.scene, 'export_keyframe_interval')
+        row = layout.row(align=True)
+        row.prop(context.scene, 'export_workers')
+        row.prop(context.scene, 'export_retries')
+        row = layout.row(align=True)
         row.label(text='Export:')
         row = layout.row(align=True)
         row.operator("object.gptounityanimated", icon="EXPORT")
+        row.operator("object.tpvdryrun", icon="VIEWZOOM")
 
 
 # Given a frame number and object, calculate the output filepath
-def get_output_filepath(context, frame_number: int, obj_name: str):
-    base_path = os.path.abspath(context.scene.export_pathStatic)
+# The frame folders are created up front by create_output_folders
+def get_output_filepath(output_path: str, frame_number: int, obj_name: str, extension: str = "json"):
+    base_path = os.path.abspath(output_path)
     folder_path = os.path.join(base_path, str(frame_number))
-    file_path = os.path.join(folder_path, "obj_{name}.json".format(name=slugify(obj_name)))
-
-    if not os.path.exists(folder_path):
-        os.mkdir(folder_path)
+    file_path = os.path.join(folder_path, "obj_{name}.{extension}".format(name=slugify(obj_name), extension=extension))
 
     return file_path
 
 
+# Exports are stored in this folder inside the output folder with the deduplicated layout
+BLOB_FOLDER = "blobs"
+
+
+# Given a frame number, calculate the filepath of the frame's bundle
+def get_bundle_filepath(output_path: str, frame_number: int, extension: str = "json"):
+    return os.path.join(os.path.abspath(output_path), "frame_{frame_number}.{extension}".format(
+        frame_number=frame_number, extension=extension))
+
+
+# Given an object and the frames it was exported over, calculate the filepath of its timeline
+# Workers export separate frame ranges, so each range has its own timeline
+def get_timeline_filepath(output_path: str, obj_name: str, start_frame: int, end_frame: int, extension: str = "json"):
+    return os.path.join(os.path.abspath(output_path), timelines.TIMELINE_FOLDER,
+                        "obj_{name}_{start_frame}-{end_frame}.{extension}".format(
+                            name=slugify(obj_name), start_frame=start_frame, end_frame=end_frame - 1,
+                            extension=extension))
+
+
+# Remove every timeline an earlier export wrote for the object, whatever frames they covered, so a new frame range or
+# split between workers doesn't leave stale files with the same frames behind
+def remove_timelines(output_path: str, obj_name: str):
+    folder = os.path.join(os.path.abspath(output_path), timelines.TIMELINE_FOLDER)
+    pattern = re.compile(r"obj_{name}_-?\d+--?\d+\.json".format(name=re.escape(slugify(obj_name))))
+
+    if not os.path.isdir(folder):
+        return
+
+    for file in os.listdir(folder):
+        if pattern.match(file):
+            os.remove(os.path.join(folder, file))
+
+
+def create_output_folders(settings, start_frame: int, end_frame: int):
+    """
+    Create every folder the export writes into, once, before any frame is evaluated
+    """
+    os.makedirs(settings.output_path, exist_ok=True)
+
+    if settings.output_layout == "OBJECT":
+        for frame_number in range(start_frame, end_frame):
+            os.makedirs(os.path.join(settings.output_path, str(frame_number)), exist_ok=True)
+
+    if settings.output_layout == "BLOBS":
+        os.makedirs(os.path.join(settings.output_path, BLOB_FOLDER), exist_ok=True)
+
+    if settings.timelines:
+        os.makedirs(os.path.join(settings.output_path, timelines.TIMELINE_FOLDER), exist_ok=True)
+
+
 # Given a filepath and struct to save, save a json file
-def save_file(file_path: str, contents: dict):
+# Tables are streamed out a chunk of rows at a time, so huge objects are never expanded whole
+def save_file(file_path: str, contents: dict, settings=None):
     with open(file_path, "w") as outfile:
-        json.dump(contents, outfile) # indent=2
+        columns.write_json(contents, outfile.write) # indent=2
+
+
+# Given a filepath and struct to save, save it in the binary format, see columns.encode_binary
+def save_binary_file(file_path: str, contents: dict, settings=None):
+    with open(file_path, "wb") as outfile:
+        outfile.write(columns.encode_binary(contents, settings.quantization() if settings else None))
+
+
+# Encode a struct the way the settings' format saves it
+def encode_contents(contents: dict, settings) -> bytes:
+    if settings.output_format == "BINARY":
+        return columns.encode_binary(contents, settings.quantization())
+
+    return json.dumps(contents, default=columns.encode_json_default).encode("utf-8")
+
+
+# Given a filepath and struct to save, encode it in the settings' format and save it compressed
+def save_compressed_file(file_path: str, contents: dict, settings):
+    with open(file_path, "wb") as outfile:
+        if settings.output_format != "JSON":
+            outfile.write(settings.compress(encode_contents(contents, settings)))
+            return
+
+    save_compressed_json(file_path, contents, settings)
+
+
+# Given a filepath and struct to save, save it as JSON compressed with the settings' codec
+# JSON is compressed as it's streamed out
+def save_compressed_json(file_path: str, contents: dict, settings):
+    with open(file_path, "wb") as outfile:
+        compressor = compression.compressor(settings.compression, settings.compression_level)
+        columns.write_json(contents, lambda text: outfile.write(compressor.compress(text.encode("utf-8"))))
+        outfile.write(compressor.flush())
+
+
+# The formats an export can be written in, as (identifier, name, description) enum items
+OUTPUT_FORMATS = [
+    ("JSON", "JSON", "Plain JSON"),
+    ("BINARY", "Binary", "A JSON header followed by raw little-endian typed array columns"),
+]
+
+# The file extension and save function of each output format
+FORMAT_WRITERS = dict({
+    "JSON": ("json", save_file),
+    "BINARY": ("tpvb", save_binary_file),
+})
+
+
+def output_extension(settings) -> str:
+    """
+    The extension of the files an export writes, the compression's goes after the format's
+    """
+    extension, _ = FORMAT_WRITERS[settings.output_format]
+
+    if settings.compression != "NONE":
+        extension += compression.COMPRESSION_EXTENSIONS[settings.compression]
+
+    return extension
+
+# How the files of an export are laid out, as (identifier, name, description) enum items
+OUTPUT_LAYOUTS = [
+    ("OBJECT", "File per Object", "A folder per frame, with a file per object in it"),
+    ("FRAME", "File per Frame", "A single file per frame, bundling every object"),
+    ("BLOBS", "Deduplicated", "A manifest per frame, with every distinct object export stored once in a blobs folder"),
+]
+
+# How strokes, points and particles are identified between frames
+ID_MODES = [
+    ("STRING", "Strings", "Every element carries its own ID string"),
+    ("INDEX", "Implicit", "Elements are identified by their position, the file declares how to rebuild their IDs"),
+]
+
+# The value of "idScheme" in exports with implicit IDs
+ID_SCHEME_INDEX = "index"
+
+
+class ExportSettings:
+    """
+    Where and how an export is written
+
+    Read from the scene for the panel, and built from command line arguments for headless exports and workers.
+    """
+
+    def __init__(self, output_path: str, output_format: str = "JSON", output_layout: str = "OBJECT", workers: int = 1,
+                 retries: int = 2, writer_threads: int = 2, quantize_step: float = 0.0, quantize_bounds: str = "FRAME",
+                 keyframe_interval: int = 1, compression: str = "NONE", compression_level: int = 6,
+                 id_mode: str = "STRING", profile: str = "FULL", timelines: bool = False, incremental: bool = False):
+        self.output_path = os.path.abspath(output_path)
+        self.output_format = output_format
+        self.output_layout = output_layout
+        self.workers = workers
+        self.retries = retries
+        self.writer_threads = writer_threads
+        self.quantize_step = quantize_step
+        self.quantize_bounds = quantize_bounds
+        self.keyframe_interval = keyframe_interval
+        self.compression = compression
+        self.compression_level = compression_level
+        self.id_mode = id_mode
+        self.profile = profile
+        self.timelines = timelines
+        self.incremental = incremental
+
+    @staticmethod
+    def from_scene(scene: bpy.types.Scene):
+        return ExportSettings(
+            scene.export_pathStatic,
+            output_format=scene.export_format,
+            output_layout=scene.export_layout,
+            workers=scene.export_workers,
+            retries=scene.export_retries,
+            writer_threads=scene.export_writer_threads,
+            quantize_step=scene.export_quantize_step,
+            quantize_bounds=scene.export_quantize_bounds,
+            keyframe_interval=scene.export_keyframe_interval,
+            compression=scene.export_compression,
+            compression_level=scene.export_compression_level,
+            id_mode=scene.export_id_mode,
+            profile=scene.export_profile,
+            timelines=scene.export_timelines,
+            incremental=scene.export_incremental,
+        )
+
+    @staticmethod
+    def add_arguments(parser):
+        """
+        Add the command line arguments from_arguments reads to an argparse parser
+        """
+        parser.add_argument("--output", required=True, help="Folder to export into")
+        parser.add_argument("--format", type=str.upper, default="JSON",
+                            choices=[identifier for identifier, _, _ in OUTPUT_FORMATS], help="Output format")
+        parser.add_argument("--layout", type=str.upper, default="OBJECT",
+                            choices=[identifier for identifier, _, _ in OUTPUT_LAYOUTS],
+                            help="OBJECT writes a file per object per frame, FRAME bundles each frame into one file, "
+                                 "BLOBS writes a manifest per frame and stores identical exports once")
+        parser.add_argument("--workers", type=int, default=1, help="Headless Blender processes to split the frames between")
+        parser.add_argument("--retries", type=int, default=2, help="How many times a failed worker's frames are retried")
+        parser.add_argument("--writer-threads", type=int, default=2,
+                            help="Threads writing finished frames while the next one evaluates, 0 writes immediately")
+        parser.add_argument("--quantize-step", type=float, default=0.0,
+                            help="With the BINARY format, store positions as multiples of this many millimeters and "
+                                 "colors as 8 bits, 0 keeps floats")
+        parser.add_argument("--quantize-bounds", type=str.upper, default="FRAME",
+                            choices=[identifier for identifier, _, _ in columns.QUANTIZE_BOUNDS],
+                            help="Whether quantized positions are offset from each frame's bounds or the origin")
+        parser.add_argument("--keyframe-interval", type=int, default=1,
+                            help="With the BINARY format, write each object in full every this many frames and as "
+                                 "changes from the frame before in between, 1 writes every frame in full")
+        parser.add_argument("--compression", type=str.upper, default="NONE",
+                            choices=[identifier for identifier, _, _ in compression.OUTPUT_COMPRESSIONS],
+                            help="Codec each file is compressed with on the writer threads")
+        parser.add_argument("--compression-level", type=int, default=6, choices=range(10), metavar="0-9",
+                            help="Compression level, higher is smaller and slower")
+        parser.add_argument("--id-mode", type=str.upper, default="STRING",
+                            choices=[identifier for identifier, _, _ in ID_MODES],
+                            help="STRING writes an ID for every element, INDEX identifies elements by their position")
+        parser.add_argument("--profile", type=str.upper, default="FULL",
+                            choices=[identifier for identifier, _, _ in profiles.EXPORT_PROFILES],
+                            help="FULL writes every attribute at full precision, PREVIEW writes a lighter export")
+        parser.add_argument("--timelines", action="store_true",
+                            help="Write cameras, lights, effectors and empties as one timeline file per object")
+        parser.add_argument("--incremental", action="store_true",
+                            help="Only write the frames and objects whose inputs changed since the last incremental "
+                                 "export into the same folder")
+
+    @staticmethod
+    def from_arguments(args):
+        return ExportSettings(args.output, output_format=args.format, output_layout=args.layout, workers=args.workers,
+                              retries=args.retries, writer_threads=args.writer_threads,
+                              quantize_step=args.quantize_step, quantize_bounds=args.quantize_bounds,
+                              keyframe_interval=args.keyframe_interval, compression=args.compression,
+                              compression_level=args.compression_level, id_mode=args.id_mode, profile=args.profile,
+                              timelines=args.timelines, incremental=args.incremental)
+
+    def to_arguments(self, output_path: str) -> list[str]:
+        """
+        Command line arguments that make a worker write the same output into output_path
+
+        Workers always write their frames whole, the session that started them keeps track of incremental exports.
+        """
+        return ["--output", output_path, "--writer-threads", str(self.writer_threads)] + self.output_arguments()
+
+    def output_arguments(self) -> list[str]:
+        """
+        The arguments that decide what's written, leaving out where it goes and how many threads write it
+        """
+        arguments = [
+            "--format", self.output_format,
+            "--layout", self.output_layout,
+            "--quantize-step", repr(self.quantize_step),
+            "--quantize-bounds", self.quantize_bounds,
+            "--keyframe-interval", str(self.keyframe_interval),
+            "--compression", self.compression,
+            "--compression-level", str(self.compression_level),
+            "--id-mode", self.id_mode,
+            "--profile", self.profile,
+        ]
+
+        if self.timelines:
+            arguments.append("--timelines")
+
+        return arguments
+
+    def compress(self, data: bytes) -> bytes:
+        return compression.compress(data, self.compression, self.compression_level)
+
+    def quantization(self):
+        """
+        How the binary format quantizes positions and colors, or None to keep them as floats
+        """
+        if self.quantize_step <= 0:
+            return None
+
+        return columns.Quantization(self.quantize_step, self.quantize_bounds)
 
 
 # Don't transform from Blender coordinate system, the Delta shares the same coordinate system, three is different
@@ -123,26 +423,150 @@ def transform_position_numpy_array(positions: np.ndarray, transformation_matrix:
     return np.dot(rotation_and_scale, positions.T).T + location
 
 
+# Exporters slugify the same object names on every frame, so the results are remembered
+@functools.lru_cache(maxsize=None)
 def slugify(name: str):
     return re.sub(r'[\W_]+', '_', name.lower())
 
 
-def grease_pencil_export(self, context, frame_number: int, gp_obj: bpy.types.bpy_struct):
+class GPencilFramePoints(TypedDict):
+    stroke_offsets: np.ndarray
+    use_cyclic: np.ndarray
+    material_index: np.ndarray
+    co: np.ndarray
+    pressure: np.ndarray
+    strength: np.ndarray
+    vertex_color: np.ndarray
+
+
+def read_gpencil_frame_points(frame: bpy.types.GPencilFrame) -> GPencilFramePoints:
+    """
+    Read every point of every stroke in a frame into flat numpy arrays with foreach_get
+
+    Stroke i owns the points in the range stroke_offsets[i]:stroke_offsets[i + 1]
+    """
+    strokes: bpy.types.GPencilStrokes = frame.strokes
+    stroke_count = len(strokes)
+
+    use_cyclic: np.ndarray = np.empty(stroke_count, dtype=bool)
+    material_index: np.ndarray = np.empty(stroke_count, dtype=np.int32)
+    strokes.foreach_get("use_cyclic", use_cyclic)
+    strokes.foreach_get("material_index", material_index)
+
+    # Prefix sum of the point counts gives each stroke's slice of the flat arrays
+    stroke_offsets: np.ndarray = np.zeros(stroke_count + 1, dtype=int)
+    np.cumsum([len(stroke.points) for stroke in strokes], out=stroke_offsets[1:])
+    point_count = int(stroke_offsets[-1])
+
+    co: np.ndarray = np.empty(point_count * 3, dtype=np.float32)
+    pressure: np.ndarray = np.empty(point_count, dtype=np.float32)
+    strength: np.ndarray = np.empty(point_count, dtype=np.float32)
+    vertex_color: np.ndarray = np.empty(point_count * 4, dtype=np.float32)
+
+    for stroke, start, end in zip(strokes, stroke_offsets[:-1], stroke_offsets[1:]):
+        if start == end:
+            continue
+
+        # Slices of the flat arrays are contiguous, so foreach_get can write straight into them
+        points: bpy.types.GPencilStrokePoints = stroke.points
+        points.foreach_get("co", co[start * 3:end * 3])
+        points.foreach_get("pressure", pressure[start:end])
+        points.foreach_get("strength", strength[start:end])
+        points.foreach_get("vertex_color", vertex_color[start * 4:end * 4])
+
+    co.shape = (point_count, 3)
+    vertex_color.shape = (point_count, 4)
+
+    return GPencilFramePoints(
+        stroke_offsets=stroke_offsets,
+        use_cyclic=use_cyclic,
+        material_index=material_index,
+        co=co,
+        pressure=pressure,
+        strength=strength,
+        vertex_color=vertex_color,
+    )
+
 
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_obj = gp_obj.evaluated_get(deps_graph)
+class GPencilKeyframeIndex:
+    """
+    Sorted keyframe numbers of every grease pencil layer, built once per export run
+
+    Finding the frame a layer shows at a given frame number is then a bisection instead of a scan of layer.frames
+    """
+
+    def __init__(self):
+        # (object name, layer name) -> (frame count, sorted frame numbers, indices into layer.frames)
+        self.layers: dict[tuple[str, str], tuple[int, list[int], list[int]]] = {}
+
+    def layer_keyframes(self, gp_obj: bpy.types.bpy_struct, layer: bpy.types.GPencilLayer):
+        key = (gp_obj.name, layer.info)
+        frames: bpy.types.GPencilFrames = layer.frames
+        frame_count = len(frames)
+
+        cached = self.layers.get(key)
+
+        # Modifiers can add frames to the evaluated copy, so rebuild if the frame count changed
+        if cached is None or cached[0] != frame_count:
+            frame_numbers: np.ndarray = np.empty(frame_count, dtype=np.int32)
+            frames.foreach_get("frame_number", frame_numbers)
+            order: np.ndarray = np.argsort(frame_numbers, kind="stable")
+
+            cached = (frame_count, frame_numbers[order].tolist(), order.tolist())
+            self.layers[key] = cached
+
+        return cached
+
+    def active_frame(self, gp_obj: bpy.types.bpy_struct, layer: bpy.types.GPencilLayer, frame_number: int):
+        """
+        The last keyframe at or before frame_number, or None if the layer hasn't begun yet
+        """
+        _, frame_numbers, order = self.layer_keyframes(gp_obj, layer)
+
+        position = bisect.bisect_right(frame_numbers, frame_number) - 1
+        if position < 0:
+            return None
+
+        return layer.frames[order[position]]
+
+    def keyframe(self, gp_obj: bpy.types.bpy_struct, layer: bpy.types.GPencilLayer, frame_number: int):
+        """
+        The keyframe exactly at frame_number, or None if there isn't one
+        """
+        _, frame_numbers, order = self.layer_keyframes(gp_obj, layer)
+
+        position = bisect.bisect_left(frame_numbers, frame_number)
+        if position == len(frame_numbers) or frame_numbers[position] != frame_number:
+            return None
+
+        return layer.frames[order[position]]
+
+
+def grease_pencil_export(self, context, frame_context: FrameContext, gp_obj: bpy.types.bpy_struct):
+
+    frame_number = frame_context.frame_number
+    evaluated_obj = frame_context.evaluated(gp_obj)
     
     gp_layers = evaluated_obj.data.layers
 
+    # Strokes refer to their material by its index in the palette
+    palette = MaterialPalette()
+
     save_struct = dict({
         "type": "gpencil",
         "frame": frame_number,
         "name": evaluated_obj.name,
+        "materials": palette.materials,
         "layers": [],
     })
 
+    # Strokes are then identified as {idPrefix}-{stroke number} and points as {stroke id}-{point number}
+    if frame_context.implicit_ids:
+        save_struct["idScheme"] = ID_SCHEME_INDEX
+
     obj_name = slugify(evaluated_obj.name)
+    export_matrix = frame_context.export_matrix(gp_obj)
+    has_materials = len(evaluated_obj.data.materials) > 0
 
     # print("--- frame", frame_number)
 
@@ -163,64 +587,107 @@ def grease_pencil_export(self, context, frame_number: int, gp_obj: bpy.types.bpy
         layer_name = slugify(layer.info)
 
         # Find the last frame before or at the current frame_number
-        candidate_frames = [f for f in layer.frames if f.frame_number <= frame_number]
+        frame: bpy.types.GPencilFrame = frame_context.keyframe_index.active_frame(evaluated_obj, layer, frame_number)
 
         # If this layer hasn't begun yet
-        if len(candidate_frames) == 0:
+        if frame is None:
             continue
-        
-        # Otherwise select the latest frame
-        frame: bpy.types.GPencilFrame = candidate_frames[-1]
 
         # print("candidate frame:", frame.frame_number, "current frame", frame_number)
 
-        stroke_counter = 0
+        # Read the whole frame at once, the points are kept as columns and transformed in bulk
+        frame_points = read_gpencil_frame_points(frame)
+        stroke_offsets = frame_points["stroke_offsets"]
+        stroke_count = len(stroke_offsets) - 1
+        material_indices: np.ndarray = frame_points["material_index"]
+
+        stroke_prefix = "{obj_name}-{layer_name}".format(obj_name=obj_name, layer_name=layer_name)
+
+        if frame_context.implicit_ids:
+            layer_struct["idPrefix"] = stroke_prefix
+
+        # Each distinct material is serialised once, the strokes share its palette entry
+        if has_materials:
+            slots, stroke_slots = np.unique(material_indices, return_inverse=True)
+            palette_indices = np.array([
+                palette.index(("slot", slot),
+                              lambda slot=slot: serialise_gpencil_material(frame_context.overrides, evaluated_obj, col, slot))
+                for slot in slots.tolist()
+            ], dtype=np.int32)
+            materials = palette_indices[stroke_slots]
+        else:
+            layer_material = palette.index(("layer", layer.info),
+                                           lambda: serialise_gpencil_material(frame_context.overrides, evaluated_obj, col))
+            materials = np.full(stroke_count, layer_material, dtype=np.int32)
+
+        points = ColumnTable(int(stroke_offsets[-1])) \
+            .column("co", transform_position_numpy_array(frame_points["co"], export_matrix), "position") \
+            .column("pressure", frame_points["pressure"], "float") \
+            .column("strength", frame_points["strength"], "float") \
+            .column("vertexColor", frame_points["vertex_color"], "color")
+
+        strokes = ColumnTable(stroke_count) \
+            .column("material", materials, "index") \
+            .column("useCyclic", frame_points["use_cyclic"], "flag") \
+            .nested("points", stroke_offsets, points)
+
+        # A stroke is a collection of points, between which lines may be drawn
+        # They can have unique materials, or vertex colours
+        if not frame_context.implicit_ids:
+            stroke_ids = [
+                "{stroke_prefix}-{stroke_counter}".format(stroke_prefix=stroke_prefix, stroke_counter=stroke_counter)
+                for stroke_counter in range(1, stroke_count + 1)
+            ]
+
+            strokes.field("id", stroke_ids)
+            points.field("id", [
+                "{stroke_id}-{point_counter}".format(stroke_id=stroke_id, point_counter=point_counter)
+                for stroke_id, point_count in zip(stroke_ids, np.diff(stroke_offsets).tolist())
+                for point_counter in range(1, point_count + 1)
+            ])
+
+        layer_struct["strokes"] = strokes
 
-        for stroke in frame.strokes:
-            stroke_counter += 1
+    # Save the frame
+    frame_context.save(evaluated_obj.name, save_struct)
 
-            # A stroke is a collection of points, between which lines may be drawn
-            # They can have unique materials, or vertex colours
-            stroke: bpy.types.GPencilStroke
 
-            stroke_struct = dict({
-                "id": "{obj_name}-{layer_name}-{stroke_counter}".format(obj_name=obj_name, layer_name=layer_name, stroke_counter=stroke_counter),
-                "material": serialise_material_simple_emission(col),
-                "useCyclic": stroke.use_cyclic,
-                "points": []
-            })
+class MaterialPalette:
+    """
+    The distinct materials of one object's export, each serialised once and referred to by its index
+    """
 
-            # If there's a real material, use that
-            if len(evaluated_obj.data.materials) > 0:
-                stroke_struct["material"] = serialise_material(evaluated_obj.data.materials[stroke.material_index].name)
-                # print("real material found", stroke_struct["material"])
-            
-            # If there are fancy material settings, apply them
-            dict_assign(stroke_struct["material"], evaluated_obj.data, "material.")
+    def __init__(self):
+        self.materials: list[dict] = []
+        self.indices = dict({})
 
-            # add the stroke to the list
-            layer_struct["strokes"].append(stroke_struct)
+    def index(self, key, serialise) -> int:
+        """
+        The palette index of the material identified by key, calling serialise the first time it's seen
+        """
+        if key not in self.indices:
+            self.indices[key] = len(self.materials)
+            self.materials.append(serialise())
 
-            points: bpy.types.GPencilStrokePoints = stroke.points
+        return self.indices[key]
 
-            point_counter = 0
 
-            for point in points:
-                point_counter += 1
+def serialise_gpencil_material(overrides: OverridePlans, evaluated_obj: bpy.types.Object, layer_color: mathutils.Color,
+                               slot: int = None):
+    """
+    Serialise a grease pencil stroke's material, falling back to the layer's color when it has no material slot
+    """
+    material = serialise_material_simple_emission(layer_color)
 
-                point: bpy.types.GPencilStrokePoint
+    # If there's a real material, use that
+    if slot is not None:
+        material = serialise_material(evaluated_obj.data.materials[slot].name)
+        # print("real material found", material)
 
-                point_struct = dict({
-                    "id": "{obj_name}-{layer_name}-{stroke_counter}-{point_counter}".format(obj_name=obj_name, layer_name=layer_name, stroke_counter=stroke_counter, point_counter=point_counter),
-                    "co": serialise_position(evaluated_obj.matrix_world @ point.co, context),
-                    "pressure": serialise_float(point.pressure),
-                    "strength": serialise_float(point.strength),
-                    "vertexColor": serialise_vector_color(point.vertex_color),
-                })
-                stroke_struct["points"].append(point_struct)
+    # If there are fancy material settings, apply them
+    overrides.assign(material, evaluated_obj.data, "material.")
 
-    # Save the frame
-    save_file(get_output_filepath(context, frame_number, evaluated_obj.name), save_struct)
+    return material
 
 
 def serialise_material_simple_emission(color: mathutils.Color):
@@ -287,287 +754,772 @@ def serialise_material(material_slot: str):
     return None
 
 
-def particle_system_export(self, context, frame_number: int, pt_obj: bpy.types.bpy_struct):
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    particle_systems = pt_obj.evaluated_get(deps_graph).particle_systems
-
-    save_struct = dict({
-        "type": "particles",
-        "frame": frame_number,
-        "name": pt_obj.name,
-        "systems": [],
-    })
-
-    has_content = False
+# Object types whose evaluated geometry can block the camera's view
+OCCLUDER_TYPES = {"MESH", "CURVE", "SURFACE", "FONT", "META"}
 
-    obj_name = slugify(pt_obj.name)
-    
-    evaluated_ps = pt_obj.evaluated_get(deps_graph)
 
-    loc, rot, scale = evaluated_ps.matrix_world.decompose()
+def read_mesh_triangles(evaluated_obj: bpy.types.bpy_struct):
+    """
+    Read the local space vertex positions and triangle vertex indices of an evaluated object's mesh
 
-    material_slots = evaluated_ps.material_slots
+    Returns None if the object has no mesh
+    """
+    mesh: bpy.types.Mesh = evaluated_obj.to_mesh()
 
-    # Extract the camera details for occlusion culling
-    camera_location, camera_rot, camera_scale = context.scene.camera.matrix_world.decompose()
+    try:
+        if mesh is None:
+            return None
 
-    for index, _ in enumerate(particle_systems):
-        ps: bpy.types.ParticleSystem = particle_systems[index]
-        settings: bpy.types.ParticleSettings = ps.settings
+        mesh.calc_loop_triangles()
 
-        if ps.settings.type != "EMITTER":
-            print("Hair not supported yet")
-            return
+        vertex_count = len(mesh.vertices)
+        positions: np.ndarray = np.empty(vertex_count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", positions)
+        positions.shape = (vertex_count, 3)
 
-        system_struct = dict({
-            "name": ps.name,
-            "material": serialise_material(settings.material_slot),
-            "particles": [],
-        })
+        triangle_count = len(mesh.loop_triangles)
+        triangles: np.ndarray = np.empty(triangle_count * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+        triangles.shape = (triangle_count, 3)
 
-        save_struct["systems"].append(system_struct)
+        return positions, triangles
+    finally:
+        evaluated_obj.to_mesh_clear()
 
-        system_name = slugify(ps.name)
 
-        counter = 0
+def build_occluder_bvh(deps_graph):
+    """
+    Build a single world space BVH from every evaluated occluder in the scene, including instances
 
-        for particle in ps.particles:
-            counter += 1
+    Objects with an "occluder" custom property of 0 are left out. Returns None if there is nothing to hit.
+    """
+    mesh_cache = dict({})
+    vertex_chunks: list[np.ndarray] = []
+    triangle_chunks: list[np.ndarray] = []
+    vertex_total = 0
 
-            if particle.alive_state != "ALIVE": # enum in [‘DEAD’, ‘UNBORN’, ‘ALIVE’, ‘DYING’], default ‘DEAD’
-                continue
+    for instance in deps_graph.object_instances:
+        obj = instance.object
 
-            # Do a raycast at the camera to see if it's occluded
-            starting_point: Vector = camera_location # The camera
-            ending_point: Vector = particle.location # The particle in world space
-            direction = (ending_point - starting_point).normalized()
-            distance = (ending_point - starting_point).length
-
-            # Scene raycast
-            result, location, normal, index, object, matrix = context.scene.ray_cast(deps_graph, starting_point,
-                                                                                     direction, distance=distance)
-            
-            # Lifecycle is a float from 0-1 representing how close it is to death.
-            lifecycle = float(frame_number - particle.birth_time) / float(particle.lifetime)
-
-            particle_struct = dict({
-                "id": "{obj_name}-{system_name}-{counter}".format(obj_name=obj_name, system_name=system_name, counter=counter),
-                "location": serialise_position(particle.location, context),
-                "quaternion": serialise_quaternion(particle.rotation),
-                "velocity": serialise_vector(particle.velocity),
-                "occluded": True if result else False,
-                "lifecycle": lifecycle,
-            })
-            system_struct["particles"].append(particle_struct)
+        if obj.type not in OCCLUDER_TYPES or obj.original.get("occluder", 1) == 0:
+            continue
 
-            has_content = True
+        # Instances of the same geometry share its mesh, only read it once. Geometry nodes instances all carry their
+        # instancer's name whatever they instance, so they are told apart by their evaluated data instead
+        data_key = obj.data.as_pointer()
 
+        if data_key not in mesh_cache:
+            mesh_cache[data_key] = read_mesh_triangles(obj)
 
-    if has_content:
-        save_file(get_output_filepath(context, frame_number, pt_obj.name), save_struct)
+        mesh = mesh_cache[data_key]
 
+        if mesh is None or len(mesh[1]) == 0:
+            continue
 
-def camera_export(self, context, frame_number: int, cm_obj: bpy.types.Camera):
-    sensor_height = cm_obj.data.sensor_height
-    sensor_width = cm_obj.data.sensor_width
+        positions, triangles = mesh
 
-    loc, rot, scale = cm_obj.matrix_world.decompose()
+        vertex_chunks.append(transform_position_numpy_array(positions, np.array(instance.matrix_world)))
+        triangle_chunks.append(triangles + vertex_total)
+        vertex_total += len(positions)
 
-    save_struct = dict({
-        "type": "camera",
-        "frame": frame_number,
-        "name": cm_obj.name,
-        "focal_length": cm_obj.data.lens,
-        "sensor_height": sensor_height,
-        "sensor_width": sensor_width,
-        "position": serialise_position(loc, context),
-        "quaternion": serialise_quaternion(rot),
-        "near": serialise_float(cm_obj.data.clip_start / SCALE_DIVISOR),
-        "far": serialise_float(cm_obj.data.clip_end / SCALE_DIVISOR),
-    })
+    if len(triangle_chunks) == 0:
+        return None
 
-    save_file(get_output_filepath(context, frame_number, cm_obj.name), save_struct)
+    return BVHTree.FromPolygons(
+        np.concatenate(vertex_chunks).tolist(),
+        np.concatenate(triangle_chunks).tolist(),
+        all_triangles=True,
+    )
 
 
-def light_export(self, context, frame_number: int, li_obj: bpy.types.Light):
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_light = li_obj.evaluated_get(deps_graph)
+class SceneOcclusion:
+    """
+    Answers whether points can be seen from the camera, for one frame
 
-    loc, rot, scale = evaluated_light.matrix_world.decompose()
+    The BVH is only built the first time a frame asks for it, and is then shared by every exporter on that frame.
+    """
 
-    # Extract the camera details for occlusion culling
-    camera_location, camera_rot, camera_scale = context.scene.camera.matrix_world.decompose()
+    def __init__(self, deps_graph, camera_location: Vector):
+        self.deps_graph = deps_graph
+        self.camera_location: Vector = camera_location
+        self._bvh = None
+        self._built = False
 
-    # Do a raycast at the camera to see if it's occluded
-    starting_point: Vector = camera_location  # The particle in world space
-    ending_point: Vector = loc  # The camera
-    direction = (ending_point - starting_point).normalized()
-    distance = (ending_point - starting_point).length
+    def bvh(self):
+        if not self._built:
+            self._bvh = build_occluder_bvh(self.deps_graph)
+            self._built = True
 
-    # Scene raycast
-    result, location, normal, index, object, matrix = context.scene.ray_cast(deps_graph, starting_point,
-                                                                             direction, distance=distance)
+        return self._bvh
 
-    save_struct = dict({
-        "type": "light",
-        "frame": frame_number,
-        "name": evaluated_light.name,
-        "material": dict({
-            "type": "color",
-            "color": serialise_vector_color(evaluated_light.data.color)
-        }),
-        "position": serialise_position(loc, context),
-        "occluded": True if result else False
-    })
+    def occluded(self, obj: bpy.types.bpy_struct, points: np.ndarray):
+        """
+        For each world space point, whether something lies between it and the camera
 
-    dict_assign(save_struct["material"], li_obj.data, "material.")
+        Objects with an "occlusion" custom property of 0 are never occluded.
+        """
+        result: np.ndarray = np.zeros(len(points), dtype=bool)
 
-    save_file(get_output_filepath(context, frame_number, li_obj.name), save_struct)
+        if len(points) == 0 or self.camera_location is None or obj.get("occlusion", 1) == 0:
+            return result
 
+        bvh: BVHTree = self.bvh()
 
-def empty_export(self, context, frame_number: int, em_obj: bpy.types.bpy_struct):
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_empty = em_obj.evaluated_get(deps_graph)
+        if bvh is None:
+            return result
 
-    save_struct = dict({
-        "type": "empty",
-        "frame": frame_number,
-        "name": evaluated_empty.name,
-        "data": dict({}),
-    })
+        # Do a raycast from the camera to each point to see if it's occluded
+        starting_point: Vector = self.camera_location
+        offsets: np.ndarray = np.asarray(points, dtype=np.float64) - np.array(starting_point)
+        distances: np.ndarray = np.linalg.norm(offsets, axis=1)
+        directions: np.ndarray = offsets / np.where(distances > 0, distances, 1)[:, np.newaxis]
 
-    dict_assign(save_struct["data"], em_obj, "")
+        ray_cast = bvh.ray_cast
 
-    save_file(get_output_filepath(context, frame_number, em_obj.name), save_struct)
+        for index, (direction, distance) in enumerate(zip(directions.tolist(), distances.tolist())):
+            if distance == 0:
+                continue
 
+            location, normal, face_index, hit_distance = ray_cast(starting_point, direction, distance)
 
-def effector_export(self, context, frame_number: int, ef_obj: bpy.types.bpy_struct):
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_effector = ef_obj.evaluated_get(deps_graph)
+            if location is not None:
+                result[index] = True
 
-    loc, rot, scale = evaluated_effector.matrix_world.decompose()
+        return result
 
-    save_struct = dict({
-        "type": "effector",
-        "name": evaluated_effector.name,
-        "frame": frame_number,
-        "position": serialise_position(loc, context),
-        "quaternion": serialise_quaternion(rot),
-        "display_size": evaluated_effector.empty_display_size / SCALE_DIVISOR,  # 1 = 100 mm
-        "display_type": evaluated_effector.empty_display_type, 
-        "align": evaluated_effector.get("align", "start"), # the object can have a custom property called align which can be: center, start, end
-        "enabled": True if evaluated_effector.get("enabled", 1) == 1 else False, # whether the effector is enabled this frame
-        "duration": evaluated_effector.get("duration", 0), # object can set its own exposure time, by default it's 0, the max speed
-        # Probably temporary:
-        "dmx_val": evaluated_effector.get("dmx_val", 0), # a value from 0 to 100 representing the DMX light
-    })
 
-    save_file(get_output_filepath(context, frame_number, evaluated_effector.name), save_struct)
+# How many finished exports may wait for each writer thread before the exporters are held up
+WRITES_PER_THREAD = 8
 
 
-def dict_assign(original, mutations, prefix):
+class BlobStore:
     """
-    Sort the mutation keys by length of the key, shortest to longest
+    Stores each distinct export once, in a file named by the hash of its contents
 
-    This gives us a 'css-like' specificity guarantee
+    Safe to use from several writer threads. Blobs already in the folder from an earlier export are reused. Blobs
+    are named by the hash of the data before it's compressed.
     """
 
-    for sorted_key in sorted(mutations.keys(), key=lambda k: len(k)):
-        if sorted_key.startswith(prefix):
-            key_no_prefix = sorted_key[len(prefix):]
-            mutate_dict_with_path(original, key_no_prefix, convert_blender_value(mutations[sorted_key]))
+    def __init__(self, folder: str, extension: str, compress=None):
+        self.folder = folder
+        self.extension = extension
+        self.compress = compress
+        self.lock = threading.Lock()
+        self.stored: set[str] = set()
 
+        # Blobs being written right now, other threads storing the same blob wait for these
+        self.writing: dict[str, threading.Event] = dict({})
 
-def convert_blender_value(value):
-    has_to_list = getattr(value, "to_list", None)
-    has_to_dict = getattr(value, "to_dict", None)
+    def store(self, data: bytes) -> str:
+        """
+        Store the data if it isn't already, returns the blob's file name once the blob is on disk
+        """
+        name = "{digest}.{extension}".format(digest=hashlib.blake2b(data, digest_size=16).hexdigest(), extension=self.extension)
 
-    if callable(has_to_list):
-        return value.to_list()
-    elif callable(has_to_dict):
-        return value.to_dict()
-    else:
-        return value
+        with self.lock:
+            if name in self.stored:
+                return name
 
+            written = self.writing.get(name)
 
-def mutate_dict_with_path(d, path_str, val):
+            if written is None:
+                written = threading.Event()
+                self.writing[name] = written
+                is_writer = True
+            else:
+                is_writer = False
+
+        if not is_writer:
+            # If the other write failed, this thread tries again
+            written.wait()
+            return self.store(data)
+
+        try:
+            self.write(name, data)
+
+            with self.lock:
+                self.stored.add(name)
+        finally:
+            with self.lock:
+                del self.writing[name]
+
+            written.set()
+
+        return name
+
+    def write(self, name: str, data: bytes):
+        file_path = os.path.join(self.folder, name)
+
+        if os.path.exists(file_path):
+            return
+
+        # Write next to it and rename, so an interrupted write never leaves a blob with the wrong contents
+        temp_path = "{file_path}.{thread}.tmp".format(file_path=file_path, thread=threading.get_ident())
+
+        with open(temp_path, "wb") as outfile:
+            outfile.write(self.compress(data) if self.compress else data)
+
+        os.replace(temp_path, file_path)
+
+
+class ExportRun:
     """
-    Decompose a path string with a value into a mutation of a dict
+    State that lives for a whole export run and is shared by every frame of it
+
+    The bake doesn't write anything, so it runs without settings.
     """
-    path = path_str.split(".")
 
-    key = path[0]
-    d[key] = val \
-        if len(path) == 1 \
-        else mutate_dict_with_path(d[key] if key in d else {},
-                        path[1:],
-                        val)
-    return d
+    def __init__(self, settings: ExportSettings = None, plan=None):
+        self.settings = settings
+        self.plan: ExportPlan = plan
 
+        # Grease pencil keyframes are indexed once for the whole run
+        self.keyframe_index = GPencilKeyframeIndex()
 
-def curve_export(self, context, frame_number: int, cu_obj: bpy.types.Curve):
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_curve = cu_obj.evaluated_get(deps_graph)
+        # As are the custom property overrides of every ID block
+        self.overrides = OverridePlans()
 
-    splines: bpy.types.CurveSplines = evaluated_curve.data.splines
+        # Finished exports are written in the background while the next frame evaluates
+        writer_threads = settings.writer_threads if settings else 0
+        self.writer = writer.BackgroundWriter(writer_threads, writer_threads * WRITES_PER_THREAD)
 
-    save_struct = dict({
-        "type": "curves",
-        "frame": frame_number,
-        "name": cu_obj.name,
-        "splines": [],
-    })
+        self.extension, self.save_function = FORMAT_WRITERS[settings.output_format] if settings else FORMAT_WRITERS["JSON"]
 
-    for spline in splines:
-        material = evaluated_curve.data.materials[spline.material_index]
+        # The profile sets the precision of the export and the attributes it leaves out
+        self.profile = profiles.PROFILES[settings.profile] if settings else profiles.PROFILES["FULL"]
 
-        spline_struct = dict({
-            "type": spline.type, # [‘POLY’, ‘BEZIER’, ‘BSPLINE’, ‘CARDINAL’, ‘NURBS’]
-            "material": serialise_material(material.name),
-            "points": [],
-        })
-        save_struct["splines"].append(spline_struct)
+        # Compressed files are encoded whole and then compressed, on the writer threads
+        if settings and settings.compression != "NONE":
+            self.extension = output_extension(settings)
+            self.save_function = save_compressed_file
 
-        if spline.type == "BEZIER":
-            for point in spline.bezier_points:
-                point: bpy.types.BezierSplinePoint = point
+        # Binary exports can store most frames as changes from the one before
+        self.deltas = None
 
-                point_struct = dict({
-                    "co": serialise_position(evaluated_curve.matrix_world @ point.co, context),
-                    "handle_left": serialise_position(evaluated_curve.matrix_world @ point.handle_left, context),
-                    "handle_right": serialise_position(evaluated_curve.matrix_world @ point.handle_right, context),
-                    "handle_left_type": point.handle_left_type,
-                    "handle_right_type": point.handle_right_type,
-                })
-                spline_struct["points"].append(point_struct)
+        if settings and settings.output_format == "BINARY" and settings.keyframe_interval > 1:
+            self.deltas = columns.DeltaEncoder(settings.keyframe_interval, settings.quantization())
+
+        # With the deduplicated layout, identical exports are only stored once
+        self.blobs = None
+
+        if settings and settings.output_layout == "BLOBS":
+            self.blobs = BlobStore(os.path.join(settings.output_path, BLOB_FOLDER), self.extension, settings.compress)
+
+        # With timelines, objects that only export a handful of values are gathered and written once at the end
+        self.timelines = timelines.Timelines() if settings and settings.timelines else None
+
+    def encode_deltas(self, contents: dict) -> dict:
+        """
+        Encode an object's export against its previous frame, exports have to arrive in frame order
+        """
+        if self.deltas is None:
+            return contents
+
+        return self.deltas.encode(contents)
+
+    def save(self, frame_number: int, obj_name: str, contents: dict):
+        if self.plan:
+            file_path = self.plan.file_path(frame_number, obj_name)
         else:
-            # TODO: Other types of splines
-            pass
+            file_path = get_output_filepath(self.settings.output_path, frame_number, obj_name, self.extension)
+        self.writer.submit(self.save_function, file_path, contents, self.settings)
+
+    def save_bundle(self, frame_number: int, objects: list[dict]):
+        """
+        Save every object's export for a frame in a single file
+        """
+        bundle = dict({
+            "type": "frame",
+            "frame": frame_number,
+            "objects": objects,
+        })
 
-    save_file(get_output_filepath(context, frame_number, cu_obj.name), save_struct)
+        file_path = get_bundle_filepath(self.settings.output_path, frame_number, self.extension)
+        self.writer.submit(self.save_function, file_path, bundle, self.settings)
 
+    def save_manifest(self, frame_number: int, objects: list[dict]):
+        """
+        Store every object's export for a frame in the blob store, and save a manifest listing them
+        """
+        self.writer.submit(self.write_manifest, frame_number, objects)
 
-COLOR_ATTRIBUTE_NAME = "color"
-DEFAULT_COLOR = [1.0, 1.0, 1.0, 1.0]
-UV_ATTRIBUTE_NAME = "UV"
+    def write_manifest(self, frame_number: int, objects: list[dict]):
+        blob_names = []
+
+        for contents in objects:
+            # The frame number is left out of the blob, so an object that doesn't change is stored once
+            frameless = dict({key: value for key, value in contents.items() if key != "frame"})
+            blob_names.append(self.blobs.store(encode_contents(frameless, self.settings)))
+
+        manifest = dict({
+            "type": "manifest",
+            "frame": frame_number,
+            "objects": blob_names,
+        })
+
+        save_file(get_bundle_filepath(self.settings.output_path, frame_number), manifest)
+
+    def save_timelines(self):
+        """
+        Write the timeline of every object gathered over the run, as JSON whatever the format
+        """
+        start_frame = self.plan.start_frame
+        end_frame = self.plan.end_frame
+        extension = "json" + compression.COMPRESSION_EXTENSIONS[self.settings.compression]
+        save_function = save_file if self.settings.compression == "NONE" else save_compressed_json
+
+        for timeline in self.timelines:
+            remove_timelines(self.settings.output_path, timeline.name)
+            file_path = get_timeline_filepath(self.settings.output_path, timeline.name, start_frame, end_frame,
+                                              extension)
+            self.writer.submit(save_function, file_path, timeline.to_json(), self.settings)
+
+    def close(self):
+        """
+        Write the timelines and wait for everything to be written
+        """
+        if self.timelines is not None:
+            self.save_timelines()
 
-def geometry_nodes_mesh_export(self, context, frame_number: int, gn_obj: bpy.types.bpy_struct):
+        self.writer.close()
+
+
+class FrameContext:
     """
-    Exports the edges of a mesh object
-    
-    Looks for a color attribute matching COLOR_ATTRIBUTE_NAME on the vertex domain; uses DEFAULT_COLOR as fallback.
+    Everything the exporters share on a single frame, evaluated once and handed to each of them
+
+    Holds the depsgraph, the evaluated objects and their transforms, the camera transform and the scale matrix,
+    along with the run it belongs to.
     """
 
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_obj = gn_obj.evaluated_get(deps_graph)
-    
-    # Check if mesh has any edges, else return early
+    def __init__(self, context, frame_number: int, run: ExportRun, transforms: dict = None):
+        self.context = context
+        self.frame_number = frame_number
+        self.run = run
+        self.settings = run.settings
+        self.keyframe_index = run.keyframe_index
+        self.overrides = run.overrides
+
+        # With implicit IDs, exporters skip building an ID string for every element
+        self.implicit_ids = run.settings is not None and run.settings.id_mode == "INDEX"
+
+        # With the frame and deduplicated layouts, exports are held here until the frame is finished
+        self.bundle: list[dict] = []
+
+        # Grab the evaluated dependency graph
+        self.deps_graph = context.evaluated_depsgraph_get()
+
+        # Scales Blender units into the millimeters the robot uses, see SCALE_DIVISOR
+        self.scale_matrix: mathutils.Matrix = mathutils.Matrix.Scale(1 / SCALE_DIVISOR, 4)
+
+        self._evaluated_objects = dict({})
+        # Transforms already known for this frame, such as those read from F-curves, skip the dependency graph
+        self._transforms = dict(transforms) if transforms else dict({})
+        self._export_matrices = dict({})
+
+        # Extract the camera details for occlusion culling
+        self.camera = context.scene.camera
+        self.camera_location, self.camera_rotation, self.camera_scale = \
+            self.transform(self.camera) if self.camera else (None, None, None)
+
+        # Occluders are gathered at most once per frame, and only if something asks
+        self.occlusion = SceneOcclusion(self.deps_graph, self.camera_location)
+
+    def evaluated(self, obj: bpy.types.bpy_struct):
+        """
+        The evaluated version of an object on this frame
+        """
+        evaluated_obj = self._evaluated_objects.get(obj.name)
+
+        if evaluated_obj is None:
+            evaluated_obj = obj.evaluated_get(self.deps_graph)
+            self._evaluated_objects[obj.name] = evaluated_obj
+
+        return evaluated_obj
+
+    def transform(self, obj: bpy.types.bpy_struct):
+        """
+        The decomposed world space location, rotation and scale of an object on this frame
+        """
+        transform = self._transforms.get(obj.name)
+
+        if transform is None:
+            transform = self.evaluated(obj).matrix_world.decompose()
+            self._transforms[obj.name] = transform
+
+        return transform
+
+    def export_matrix(self, obj: bpy.types.bpy_struct) -> np.ndarray:
+        """
+        The object's world matrix with the scale matrix applied, as a numpy array
+
+        Transforming local positions by this takes them straight to robot space.
+        """
+        export_matrix = self._export_matrices.get(obj.name)
+
+        if export_matrix is None:
+            export_matrix = np.array(self.scale_matrix @ self.evaluated(obj).matrix_world)
+            self._export_matrices[obj.name] = export_matrix
+
+        return export_matrix
+
+    def save(self, obj_name: str, contents: dict):
+        """
+        Save an object's export for this frame
+
+        The contents are handed to the run's writer, so they mustn't be changed afterwards.
+        """
+        contents = self.run.profile.apply(contents)
+
+        if self.run.timelines is not None and self.run.timelines.add(contents):
+            return
+
+        contents = self.run.encode_deltas(contents)
+
+        if self.settings.output_layout in ("FRAME", "BLOBS"):
+            self.bundle.append(contents)
+            return
+
+        self.run.save(self.frame_number, obj_name, contents)
+
+    def finish(self):
+        """
+        Called once every object on the frame has been exported
+        """
+        if len(self.bundle) == 0:
+            return
+
+        if self.settings.output_layout == "BLOBS":
+            self.run.save_manifest(self.frame_number, self.bundle)
+        else:
+            self.run.save_bundle(self.frame_number, self.bundle)
+
+
+# The value foreach_get reports for "alive_state" when a particle is alive
+PARTICLE_ALIVE: int = bpy.types.Particle.bl_rna.properties["alive_state"].enum_items["ALIVE"].value
+
+
+def particle_system_export(self, context, frame_context: FrameContext, pt_obj: bpy.types.bpy_struct):
+    frame_number = frame_context.frame_number
+    particle_systems = frame_context.evaluated(pt_obj).particle_systems
+
+    save_struct = dict({
+        "type": "particles",
+        "frame": frame_number,
+        "name": pt_obj.name,
+        "systems": [],
+    })
+
+    # Particles are then identified as {idPrefix}-{index + 1}, dead particles are skipped so the index is stored
+    if frame_context.implicit_ids:
+        save_struct["idScheme"] = ID_SCHEME_INDEX
+
+    has_content = False
+
+    obj_name = slugify(pt_obj.name)
+
+    for index, _ in enumerate(particle_systems):
+        ps: bpy.types.ParticleSystem = particle_systems[index]
+        settings: bpy.types.ParticleSettings = ps.settings
+
+        if ps.settings.type != "EMITTER":
+            print("Hair not supported yet")
+            return
+
+        system_struct = dict({
+            "name": ps.name,
+            "material": serialise_material(settings.material_slot),
+            "particles": [],
+        })
+
+        save_struct["systems"].append(system_struct)
+
+        system_name = slugify(ps.name)
+
+        if frame_context.implicit_ids:
+            system_struct["idPrefix"] = "{obj_name}-{system_name}".format(obj_name=obj_name, system_name=system_name)
+
+        # Pull every particle's state out of the system in bulk
+        particles: bpy.types.ParticleSystem.particles = ps.particles
+        particle_count = len(particles)
+
+        alive_states: np.ndarray = np.empty(particle_count, dtype=np.int32)
+        particles.foreach_get("alive_state", alive_states)
+
+        # Indices of the live particles, the rest are skipped
+        alive: np.ndarray = np.flatnonzero(alive_states == PARTICLE_ALIVE)
+
+        if len(alive) == 0:
+            continue
+
+        locations: np.ndarray = np.empty(particle_count * 3)
+        particles.foreach_get("location", locations)
+        locations.shape = (particle_count, 3)
+        locations = locations[alive]
+
+        # Rotations come out as w, x, y, z but are serialised as x, y, z, w
+        rotations: np.ndarray = np.empty(particle_count * 4)
+        particles.foreach_get("rotation", rotations)
+        rotations.shape = (particle_count, 4)
+        rotations = rotations[alive][:, [1, 2, 3, 0]]
+
+        velocities: np.ndarray = np.empty(particle_count * 3)
+        particles.foreach_get("velocity", velocities)
+        velocities.shape = (particle_count, 3)
+        velocities = velocities[alive]
+
+        birth_times: np.ndarray = np.empty(particle_count)
+        lifetimes: np.ndarray = np.empty(particle_count)
+        particles.foreach_get("birth_time", birth_times)
+        particles.foreach_get("lifetime", lifetimes)
+
+        # Lifecycle is a float from 0-1 representing how close it is to death.
+        lifecycles: np.ndarray = (frame_number - birth_times[alive]) / lifetimes[alive]
+
+        # The particles are in world space
+        occluded: np.ndarray = frame_context.occlusion.occluded(pt_obj, locations)
+
+        particle_table = ColumnTable(len(alive))
+
+        if frame_context.implicit_ids:
+            particle_table.column("index", alive, "index")
+        else:
+            particle_table.field("id", [
+                "{obj_name}-{system_name}-{counter}".format(obj_name=obj_name, system_name=system_name, counter=counter)
+                for counter in (alive + 1).tolist()
+            ])
+
+        system_struct["particles"] = particle_table \
+            .column("location", locations / SCALE_DIVISOR, "position") \
+            .column("quaternion", rotations, "float") \
+            .column("velocity", velocities, "float") \
+            .column("occluded", occluded, "flag") \
+            .column("lifecycle", lifecycles, "value")
+
+        has_content = True
+
+
+    if has_content:
+        frame_context.save(pt_obj.name, save_struct)
+
+
+def camera_export(self, context, frame_context: FrameContext, cm_obj: bpy.types.Camera):
+    frame_number = frame_context.frame_number
+
+    sensor_height = cm_obj.data.sensor_height
+    sensor_width = cm_obj.data.sensor_width
+
+    loc, rot, scale = frame_context.transform(cm_obj)
+
+    save_struct = dict({
+        "type": "camera",
+        "frame": frame_number,
+        "name": cm_obj.name,
+        "focal_length": cm_obj.data.lens,
+        "sensor_height": sensor_height,
+        "sensor_width": sensor_width,
+        "position": serialise_position(loc, context),
+        "quaternion": serialise_quaternion(rot),
+        "near": serialise_float(cm_obj.data.clip_start / SCALE_DIVISOR),
+        "far": serialise_float(cm_obj.data.clip_end / SCALE_DIVISOR),
+    })
+
+    frame_context.save(cm_obj.name, save_struct)
+
+
+def light_export(self, context, frame_context: FrameContext, li_obj: bpy.types.Light):
+    frame_number = frame_context.frame_number
+    evaluated_light = frame_context.evaluated(li_obj)
+
+    loc, rot, scale = frame_context.transform(li_obj)
+
+    # Check whether the light can be seen from the camera
+    occluded = bool(frame_context.occlusion.occluded(li_obj, np.array([loc]))[0])
+
+    save_struct = dict({
+        "type": "light",
+        "frame": frame_number,
+        "name": evaluated_light.name,
+        "material": dict({
+            "type": "color",
+            "color": serialise_vector_color(evaluated_light.data.color)
+        }),
+        "position": serialise_position(loc, context),
+        "occluded": occluded
+    })
+
+    frame_context.overrides.assign(save_struct["material"], li_obj.data, "material.")
+
+    frame_context.save(li_obj.name, save_struct)
+
+
+def empty_export(self, context, frame_context: FrameContext, em_obj: bpy.types.bpy_struct):
+    frame_number = frame_context.frame_number
+    evaluated_empty = frame_context.evaluated(em_obj)
+
+    save_struct = dict({
+        "type": "empty",
+        "frame": frame_number,
+        "name": evaluated_empty.name,
+        "data": dict({}),
+    })
+
+    frame_context.overrides.assign(save_struct["data"], em_obj, "")
+
+    frame_context.save(em_obj.name, save_struct)
+
+
+def effector_export(self, context, frame_context: FrameContext, ef_obj: bpy.types.bpy_struct):
+    frame_number = frame_context.frame_number
+    evaluated_effector = frame_context.evaluated(ef_obj)
+
+    loc, rot, scale = frame_context.transform(ef_obj)
+
+    save_struct = dict({
+        "type": "effector",
+        "name": evaluated_effector.name,
+        "frame": frame_number,
+        "position": serialise_position(loc, context),
+        "quaternion": serialise_quaternion(rot),
+        "display_size": evaluated_effector.empty_display_size / SCALE_DIVISOR,  # 1 = 100 mm
+        "display_type": evaluated_effector.empty_display_type, 
+        "align": evaluated_effector.get("align", "start"), # the object can have a custom property called align which can be: center, start, end
+        "enabled": True if evaluated_effector.get("enabled", 1) == 1 else False, # whether the effector is enabled this frame
+        "duration": evaluated_effector.get("duration", 0), # object can set its own exposure time, by default it's 0, the max speed
+        # Probably temporary:
+        "dmx_val": evaluated_effector.get("dmx_val", 0), # a value from 0 to 100 representing the DMX light
+    })
+
+    frame_context.save(evaluated_effector.name, save_struct)
+
+
+class OverridePlan:
+    """
+    The custom properties of an ID block that override an export under a prefix, as split paths
+
+    The keys are sorted by length, shortest to longest. This gives us a 'css-like' specificity guarantee.
+    """
+
+    def __init__(self, keys: tuple, prefix: str):
+        self.keys = keys
+        self.paths = [
+            (key, key[len(prefix):].split("."))
+            for key in sorted(keys, key=lambda k: len(k))
+            if key.startswith(prefix)
+        ]
+
+    def apply(self, original: dict, mutations):
+        """
+        Read the current value of every override from the ID block and write it into the dict
+        """
+        for key, path in self.paths:
+            target = original
+
+            for part in path[:-1]:
+                if not isinstance(target.get(part), dict):
+                    target[part] = dict({})
+
+                target = target[part]
+
+            target[path[-1]] = convert_blender_value(mutations[key])
+
+
+class OverridePlans:
+    """
+    Override plans for every ID block an export reads, compiled once and reused on every frame
+
+    A plan is compiled again when the custom properties of its ID block are added or removed.
+    """
+
+    def __init__(self):
+        self.plans = dict({})
+
+    def assign(self, original: dict, mutations, prefix: str):
+        keys = tuple(mutations.keys())
+        plan_key = (type(mutations).__name__, getattr(mutations, "name_full", id(mutations)), prefix)
+        plan: OverridePlan = self.plans.get(plan_key)
+
+        if plan is None or plan.keys != keys:
+            plan = OverridePlan(keys, prefix)
+            self.plans[plan_key] = plan
+
+        plan.apply(original, mutations)
+
+
+def convert_blender_value(value):
+    has_to_list = getattr(value, "to_list", None)
+    has_to_dict = getattr(value, "to_dict", None)
+
+    if callable(has_to_list):
+        return value.to_list()
+    elif callable(has_to_dict):
+        return value.to_dict()
+    else:
+        return value
+
+
+def curve_export(self, context, frame_context: FrameContext, cu_obj: bpy.types.Curve):
+    frame_number = frame_context.frame_number
+    evaluated_curve = frame_context.evaluated(cu_obj)
+    matrix_world: mathutils.Matrix = evaluated_curve.matrix_world
+
+    splines: bpy.types.CurveSplines = evaluated_curve.data.splines
+
+    # Splines refer to their material by its index in the palette
+    palette = MaterialPalette()
+
+    save_struct = dict({
+        "type": "curves",
+        "frame": frame_number,
+        "name": cu_obj.name,
+        "materials": palette.materials,
+        "splines": [],
+    })
+
+    for spline in splines:
+        material = evaluated_curve.data.materials[spline.material_index]
+
+        spline_struct = dict({
+            "type": spline.type, # [‘POLY’, ‘BEZIER’, ‘BSPLINE’, ‘CARDINAL’, ‘NURBS’]
+            "material": palette.index(("slot", spline.material_index), lambda: serialise_material(material.name)),
+            "points": [],
+        })
+        save_struct["splines"].append(spline_struct)
+
+        if spline.type == "BEZIER":
+            for point in spline.bezier_points:
+                point: bpy.types.BezierSplinePoint = point
+
+                point_struct = dict({
+                    "co": serialise_position(matrix_world @ point.co, context),
+                    "handle_left": serialise_position(matrix_world @ point.handle_left, context),
+                    "handle_right": serialise_position(matrix_world @ point.handle_right, context),
+                    "handle_left_type": point.handle_left_type,
+                    "handle_right_type": point.handle_right_type,
+                })
+                spline_struct["points"].append(point_struct)
+        else:
+            # TODO: Other types of splines
+            pass
+
+    frame_context.save(cu_obj.name, save_struct)
+
+
+COLOR_ATTRIBUTE_NAME = "color"
+DEFAULT_COLOR = [1.0, 1.0, 1.0, 1.0]
+UV_ATTRIBUTE_NAME = "UV"
+
+def geometry_nodes_mesh_export(self, context, frame_context: FrameContext, gn_obj: bpy.types.bpy_struct):
+    """
+    Exports the edges of a mesh object
+    
+    Looks for a color attribute matching COLOR_ATTRIBUTE_NAME on the vertex domain; uses DEFAULT_COLOR as fallback.
+    """
+
+    frame_number = frame_context.frame_number
+    evaluated_obj = frame_context.evaluated(gn_obj)
+    
+    # Check if mesh has any edges, else return early
     edge_count = len(evaluated_obj.data.edges)
     if edge_count == 0:
         return
@@ -583,8 +1535,8 @@ def geometry_nodes_mesh_export(self, context, frame_number: int, gn_obj: bpy.typ
     evaluated_obj.data.vertices.foreach_get("co", vertex_positions)
     vertex_positions.shape = (vertex_count, 3)
 
-    # Transform positions to world-space
-    vertex_positions = transform_position_numpy_array(vertex_positions, np.array(evaluated_obj.matrix_world))
+    # Transform positions to world-space, scaled to robot space
+    vertex_positions = transform_position_numpy_array(vertex_positions, frame_context.export_matrix(gn_obj))
     
     # Get color attributes
     attribute: bpy.types.Attribute = evaluated_obj.data.attributes.get(COLOR_ATTRIBUTE_NAME)
@@ -598,49 +1550,49 @@ def geometry_nodes_mesh_export(self, context, frame_number: int, gn_obj: bpy.typ
         # Color attribute does not exist; Use default color instead
         colors = np.array([DEFAULT_COLOR]).repeat(vertex_count, axis=0)
     
-    # Convert numpy arrays to lists, rounded to 6 decimal places
-    serialised_vertex_positions: list = serialise_position_numpy_array(vertex_positions)
-    serialised_colors: list = serialise_color_numpy_array(colors)
-    
-    # Prepare save struct
     obj_name = slugify(gn_obj.name)
+
+    # Each edge owns two points, gathered from the vertex columns
+    point_vertex_indices: np.ndarray = edge_vertex_indices.ravel()
+
+    points = ColumnTable(edge_count * 2)
+
+    # With implicit IDs, points are identified as {name}-{edge index}-{0 or 1}
+    if not frame_context.implicit_ids:
+        points.field("id", [f"{obj_name}-{edge_counter}-{point_counter}" for edge_counter in range(edge_count) for point_counter in range(2)])
+
+    points \
+        .column("co", vertex_positions[point_vertex_indices], "position") \
+        .column("color", colors[point_vertex_indices], "color")
+
+    edges = ColumnTable(edge_count) \
+        .column("edge_index", np.arange(edge_count), "index") \
+        .nested("points", np.arange(0, edge_count * 2 + 1, 2), points)
+
+    # Prepare save struct
     save_struct = dict({
         "type": "gn_mesh",
         "frame": frame_number,
         "name": obj_name,
-        "edges": [],
+        "edges": edges,
     })
-    
-    # Fill save struct with vertex positions and colours for each edge
-    for edge_counter, vertex_indices in enumerate(edge_vertex_indices):
-        edge_struct = dict({
-            "edge_index": edge_counter,
-            "points": []
-        })
-        save_struct["edges"].append(edge_struct)
-        
-        for point_counter, i in enumerate(vertex_indices):
-            point_struct = dict({
-                "id": f"{obj_name}-{edge_counter}-{point_counter}",
-                "co": serialised_vertex_positions[i],
-                "color": serialised_colors[i],
-            })
-            edge_struct["points"].append(point_struct)
+
+    if frame_context.implicit_ids:
+        save_struct["idScheme"] = ID_SCHEME_INDEX
     
     # Save the frame
-    save_file(get_output_filepath(context, frame_number, gn_obj.name), save_struct)
+    frame_context.save(gn_obj.name, save_struct)
 
 
-def geometry_nodes_verts_export(self, context, frame_number: int, gp_obj: bpy.types.bpy_struct):
+def geometry_nodes_verts_export(self, context, frame_context: FrameContext, gp_obj: bpy.types.bpy_struct):
     """
     Exports the vertices of a mesh object
     
     Looks for a color attribute matching COLOR_ATTRIBUTE_NAME on the vertex domain; uses DEFAULT_COLOR as fallback.
     """
 
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_obj = gp_obj.evaluated_get(deps_graph)
+    frame_number = frame_context.frame_number
+    evaluated_obj = frame_context.evaluated(gp_obj)
     
     # Check if mesh has any edges, else return early
     vertices_count = len(evaluated_obj.data.vertices)
@@ -653,8 +1605,8 @@ def geometry_nodes_verts_export(self, context, frame_number: int, gp_obj: bpy.ty
     evaluated_obj.data.vertices.foreach_get("co", vertex_positions)
     vertex_positions.shape = (vertex_count, 3)
 
-    # Transform positions to world-space
-    vertex_positions = transform_position_numpy_array(vertex_positions, np.array(evaluated_obj.matrix_world))
+    # Transform positions to world-space, scaled to robot space
+    vertex_positions = transform_position_numpy_array(vertex_positions, frame_context.export_matrix(gp_obj))
     
     # Get color attributes
     attribute: bpy.types.Attribute = evaluated_obj.data.attributes.get(COLOR_ATTRIBUTE_NAME)
@@ -668,31 +1620,31 @@ def geometry_nodes_verts_export(self, context, frame_number: int, gp_obj: bpy.ty
         # Color attribute does not exist; Use default color instead
         colors = np.array([DEFAULT_COLOR]).repeat(vertex_count, axis=0)
     
-    # Convert numpy arrays to lists, rounded to 6 decimal places
-    serialised_vertex_positions: list = serialise_position_numpy_array(vertex_positions)
-    serialised_colors: list = serialise_color_numpy_array(colors)
-    
-    # Prepare save struct
     obj_name = slugify(gp_obj.name)
+
+    points = ColumnTable(vertex_count)
+
+    # With implicit IDs, points are identified as {name}-{index}
+    if not frame_context.implicit_ids:
+        points.field("id", [f"{obj_name}-{point_counter}" for point_counter in range(vertex_count)])
+
+    points \
+        .column("co", vertex_positions, "position") \
+        .column("color", colors, "color")
+
+    # Prepare save struct
     save_struct = dict({
         "type": "gn_vertices",
         "frame": frame_number,
         "name": obj_name,
-        "points": [],
+        "points": points,
     })
-    
-    # Fill save struct with vertex positions and colours for each edge
 
-    for point_counter, co in enumerate(serialised_vertex_positions):
-        point_struct = dict({
-            "id": f"{obj_name}-{point_counter}",
-            "co": co,
-            "color": serialised_colors[point_counter],
-        })
-        save_struct["points"].append(point_struct)
+    if frame_context.implicit_ids:
+        save_struct["idScheme"] = ID_SCHEME_INDEX
     
     # Save the frame
-    save_file(get_output_filepath(context, frame_number, gp_obj.name), save_struct)
+    frame_context.save(gp_obj.name, save_struct)
 
 class CurveType:
     """
@@ -716,18 +1668,21 @@ class HandleType:
     # The location is constrained to point in the opposite direction as the other handle.
     BEZIER_HANDLE_ALIGN: int = 3
 
-def hair_curves_export(self, context, frame_number: int, cu_obj: bpy.types.bpy_struct):
+def hair_curves_export(self, context, frame_context: FrameContext, cu_obj: bpy.types.bpy_struct):
     """
     Exports the splines of a hair-curves object
     
     Looks for a color attribute matching COLOR_ATTRIBUTE_NAME on the point domain; uses DEFAULT_COLOR as fallback.
     
     Also looks for a 2D vector attribute matching UV_ATTRIBUTE_NAME on the point domain.
+
+    Points are "co", "color", the handles and handle types, then "uv" when any spline is Bezier, and "color", "co",
+    then "uv" otherwise. Every point shares one set of columns, so when Bezier splines are mixed with other types the
+    points of the other splines carry handles too, which consumers should ignore for non-Bezier splines.
     """
 
-    # Grab the evaluated dependency graph
-    deps_graph = context.evaluated_depsgraph_get()
-    evaluated_obj = cu_obj.evaluated_get(deps_graph)
+    frame_number = frame_context.frame_number
+    evaluated_obj = frame_context.evaluated(cu_obj)
     data: bpy.types.Curves = evaluated_obj.data
 
     # Check if object has any splines, else return early
@@ -756,9 +1711,10 @@ def hair_curves_export(self, context, frame_number: int, cu_obj: bpy.types.bpy_s
     else:
         spline_attributes["cyclic"] = np.array([False]).repeat(spline_count, axis=0)
     
-    # Convert numpy arrays to lists
-    for attribute in spline_attributes:
-        spline_attributes[attribute] = spline_attributes[attribute].tolist()
+    # Each spline owns the points from its first point up to the next spline's
+    first_point_indices: np.ndarray = np.empty(spline_count, dtype=np.int32)
+    data.curves.foreach_get("first_point_index", first_point_indices)
+    spline_offsets: np.ndarray = np.append(first_point_indices, point_count)
 
     # Create a dictionary for point attributes
     point_attributes = {
@@ -779,9 +1735,6 @@ def hair_curves_export(self, context, frame_number: int, cu_obj: bpy.types.bpy_s
     else:
         # Color attribute does not exist; Use default color instead
         point_attributes["color"] = np.array([DEFAULT_COLOR]).repeat(point_count, axis=0)
-    
-    # Convert color numpy arrays to lists, rounded to 6 decimal places
-    point_attributes["color"] = serialise_color_numpy_array(point_attributes["color"])
 
     has_uv = False
 
@@ -793,12 +1746,13 @@ def hair_curves_export(self, context, frame_number: int, cu_obj: bpy.types.bpy_s
             point_attributes["UV"] =  np.empty(point_count * 2).astype(np.float32)
             attribute.data.foreach_get("vector", point_attributes["UV"])
             point_attributes["UV"].shape = (point_count, 2)
-            point_attributes["UV"] = serialise_float_numpy_array(point_attributes["UV"])
 
             has_uv = True
-    
+
     # Get Bezier attributes if any Bezier splines exist
-    if CurveType.CURVE_TYPE_BEZIER in spline_attributes["curve_type"]:
+    has_bezier = CurveType.CURVE_TYPE_BEZIER in spline_attributes["curve_type"]
+
+    if has_bezier:
         point_attributes["handle_left"] = np.empty(point_count * 3).astype(np.float32)
         point_attributes["handle_right"] = np.empty(point_count * 3).astype(np.float32)
         point_attributes["handle_type_left"] = np.empty(point_count).astype(int)
@@ -814,168 +1768,987 @@ def hair_curves_export(self, context, frame_number: int, cu_obj: bpy.types.bpy_s
 
         attributes_to_transform += ["handle_left", "handle_right"]
 
-        # Convert handle_type numpy arrays to lists
-        for handle_type in ["handle_type_left", "handle_type_right"]:
-            point_attributes[handle_type] = point_attributes[handle_type].tolist()
-    
     for attribute in attributes_to_transform:
-        # Transform position attributes to world space
-        point_attributes[attribute] = transform_position_numpy_array(point_attributes[attribute], np.array(evaluated_obj.matrix_world))
-    
-        # Convert numpy arrays to lists, rounded to 6 decimal places
-        point_attributes[attribute] = serialise_position_numpy_array(point_attributes[attribute])
-    
+        # Transform position attributes to world space, scaled to robot space
+        point_attributes[attribute] = transform_position_numpy_array(point_attributes[attribute], frame_context.export_matrix(cu_obj))
+
+    points = ColumnTable(point_count)
+
+    if has_bezier:
+        points \
+            .column("co", point_attributes["position"], "position") \
+            .column("color", point_attributes["color"], "color") \
+            .column("handle_left", point_attributes["handle_left"], "position") \
+            .column("handle_right", point_attributes["handle_right"], "position") \
+            .column("handle_type_left", point_attributes["handle_type_left"], "index") \
+            .column("handle_type_right", point_attributes["handle_type_right"], "index")
+    else:
+        points \
+            .column("color", point_attributes["color"], "color") \
+            .column("co", point_attributes["position"], "position")
+
+    if has_uv:
+        points.column("uv", point_attributes["UV"], "float")
+
+    splines = ColumnTable(spline_count) \
+        .column("type", spline_attributes["curve_type"], "index") \
+        .column("cyclic", spline_attributes["cyclic"], "flag") \
+        .nested("points", spline_offsets, points)
+
+    # TODO: Read this out of the object itself in case we need more than one texture
+    if has_uv:
+        splines.field("texture_file", ['./texture.png'] * spline_count)
+
     # Prepare save struct
     obj_name = slugify(cu_obj.name)
     save_struct = dict({
         "type": "gn_curves",
         "frame": frame_number,
         "name": obj_name,
-        "splines": [],
+        "splines": splines,
     })
 
-    # Fill save struct with data
-    for spline in data.curves:
-        spline: bpy.types.CurveSlice = spline
-        spline_first_point_index: int = spline.first_point_index
-        spline_last_point_index: int = spline_first_point_index + spline.points_length
-        spline_type: int = spline_attributes["curve_type"][spline.index]
-        spline_cyclic: bool = spline_attributes["cyclic"][spline.index]
+    # Save the frame
+    frame_context.save(cu_obj.name, save_struct)
 
-        spline_struct = dict({
-            "type": spline_type,
-            "cyclic": spline_cyclic,
-            "points": [],
+
+def get_random_color():
+    ''' generate rgb using a list comprehension '''
+    r, g, b = [random.random() for i in range(3)]
+    return r, g, b, 1
+
+
+def resolve_exporter(obj: bpy.types.bpy_struct):
+    """
+    The exporter that matches an object's type and name, or None if there isn't one
+    """
+    if obj.type == "CURVES":
+        return hair_curves_export
+
+    if obj.name[:3] == "GP_" and obj.type == "MESH":
+        return geometry_nodes_verts_export
+
+    if obj.name[:3] == "GN_" and obj.type == "MESH":
+        return geometry_nodes_mesh_export
+
+    if obj.type == "GPENCIL":
+        return grease_pencil_export
+
+    if obj.type == "PARTICLES" or obj.type == "MESH":
+        return particle_system_export
+
+    if obj.type == "LIGHT":
+        return light_export
+
+    if obj.type == "CURVE":
+        return curve_export
+
+    if obj.type == "EMPTY" and obj.name.lower().startswith("effector"):
+        return effector_export
+
+    if obj.type == "EMPTY":
+        return empty_export
+
+    return None
+
+
+def has_animation(id_block) -> bool:
+    animation_data = getattr(id_block, "animation_data", None)
+
+    return animation_data is not None and (animation_data.action is not None or len(animation_data.drivers) > 0)
+
+
+# Properties left out of fingerprints, they follow from the animation or are bookkeeping that changes on its own
+FINGERPRINT_SKIPPED = {
+    "rna_type", "matrix_world", "matrix_local", "matrix_basis", "dimensions", "bound_box", "mode", "users",
+    "is_evaluated", "original", "session_uid", "tag", "is_runtime_data", "is_missing", "is_library_indirect",
+    "use_fake_user", "preview", "is_editmode", "total_vert_sel", "total_edge_sel", "total_face_sel", "select",
+    "select_control_point", "select_left_handle", "select_right_handle",
+}
+
+# Node properties that only lay the node out in the editor
+NODE_LAYOUT_PROPERTIES = {
+    "location", "width", "height", "width_hidden", "label", "color", "use_custom_color", "show_options",
+    "show_preview", "show_texture", "hide",
+}
+
+# Modifiers that simulate, so a change on one frame carries on to every frame after it
+SIMULATION_MODIFIERS = {"CLOTH", "SOFT_BODY", "FLUID", "DYNAMIC_PAINT", "PARTICLE_SYSTEM", "COLLISION"}
+
+# How to read each type of generic attribute in bulk, as (property, components, dtype). Strings can't be read in bulk.
+ATTRIBUTE_READERS = dict({
+    "FLOAT": ("value", 1, np.float32),
+    "INT": ("value", 1, np.int32),
+    "INT8": ("value", 1, np.int32),
+    "BOOLEAN": ("value", 1, bool),
+    "FLOAT_VECTOR": ("vector", 3, np.float32),
+    "FLOAT2": ("vector", 2, np.float32),
+    "INT32_2D": ("value", 2, np.int32),
+    "QUATERNION": ("value", 4, np.float32),
+    "FLOAT_COLOR": ("color", 4, np.float32),
+    "BYTE_COLOR": ("color", 4, np.float32),
+})
+
+
+def fingerprint_value(value):
+    """
+    A property value as something json and repr give the same text for every time
+    """
+    if isinstance(value, bpy.types.ID):
+        return value.name_full
+
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+
+    if isinstance(value, set):
+        return sorted(value)
+
+    if hasattr(value, "to_dict"):
+        return fingerprint_value(value.to_dict())
+
+    if hasattr(value, "to_list"):
+        return value.to_list()
+
+    if isinstance(value, dict):
+        return dict({key: fingerprint_value(child) for key, child in value.items()})
+
+    try:
+        return np.array(value, dtype=np.float64).ravel().tolist()
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def animated_paths(id_block) -> set:
+    """
+    The data paths of an ID block that F-curves or drivers set, their values depend on the frame
+    """
+    animation_data = getattr(id_block, "animation_data", None)
+
+    if animation_data is None:
+        return set()
+
+    fcurves = list(animation_data.action.fcurves) if animation_data.action else []
+
+    return set(fcurve.data_path for fcurve in fcurves + list(animation_data.drivers))
+
+
+def custom_property_keys(struct) -> list[str]:
+    # Only some types can hold custom properties, the rest raise when asked for them
+    try:
+        return list(struct.keys())
+    except TypeError:
+        return []
+
+
+def property_values(struct, animated: set = frozenset(), prefix: str = "", skipped: set = None) -> list:
+    """
+    The value of every plain property and custom property of an RNA struct
+
+    Animated properties are tracked as channels instead. Pointers to ID blocks are recorded by name, other pointers
+    and collections are left out.
+    """
+    skipped = FINGERPRINT_SKIPPED if skipped is None else skipped
+    values = []
+
+    for prop in struct.bl_rna.properties:
+        identifier = prop.identifier
+
+        if identifier in skipped or prop.type == "COLLECTION" or prefix + identifier in animated:
+            continue
+
+        value = getattr(struct, identifier, None)
+
+        if prop.type == "POINTER" and not isinstance(value, bpy.types.ID):
+            continue
+
+        values.append((identifier, fingerprint_value(value)))
+
+    for key in custom_property_keys(struct):
+        if prefix + '["{key}"]'.format(key=key) not in animated:
+            values.append(("[{key}]".format(key=key), fingerprint_value(struct[key])))
+
+    return values
+
+
+def hash_values(values) -> str:
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()
+
+
+def hash_arrays(*arrays: np.ndarray) -> str:
+    digest = hashlib.sha1()
+
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+
+    return digest.hexdigest()
+
+
+def is_curves_data(data) -> bool:
+    # The hair curves type only exists from Blender 3.3
+    return hasattr(bpy.types, "Curves") and isinstance(data, bpy.types.Curves)
+
+
+def attribute_arrays(attributes) -> list:
+    """
+    The name, type and values of every generic attribute, such as color attributes and UV maps
+    """
+    arrays = []
+
+    for attribute in attributes:
+        reader = ATTRIBUTE_READERS.get(attribute.data_type)
+
+        if reader is None:
+            continue
+
+        prop, components, dtype = reader
+        values: np.ndarray = np.empty(len(attribute.data) * components, dtype=dtype)
+        attribute.data.foreach_get(prop, values)
+
+        arrays += [np.frombuffer("{name}/{domain}/{data_type}".format(
+            name=attribute.name, domain=attribute.domain, data_type=attribute.data_type).encode("utf-8"),
+            dtype=np.uint8), values]
+
+    return arrays
+
+
+def geometry_hash(data) -> str:
+    """
+    A hash of the geometry an object's export or occlusion is read from, its positions, topology and attributes
+    """
+    if isinstance(data, bpy.types.Mesh):
+        co: np.ndarray = np.empty(len(data.vertices) * 3, dtype=np.float32)
+        data.vertices.foreach_get("co", co)
+        loops: np.ndarray = np.empty(len(data.loops), dtype=np.int32)
+        data.loops.foreach_get("vertex_index", loops)
+        loop_totals: np.ndarray = np.empty(len(data.polygons), dtype=np.int32)
+        data.polygons.foreach_get("loop_total", loop_totals)
+        arrays = [co, loops, loop_totals] + attribute_arrays(data.attributes)
+
+        # Before Blender 3.5, UV maps aren't generic attributes
+        for uv_layer in data.uv_layers:
+            if uv_layer.name not in data.attributes:
+                uv: np.ndarray = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+                uv_layer.data.foreach_get("uv", uv)
+                arrays.append(uv)
+
+        return hash_arrays(*arrays)
+
+    if isinstance(data, bpy.types.Curve):
+        arrays = []
+
+        for spline in data.splines:
+            points: np.ndarray = np.empty(len(spline.points) * 4, dtype=np.float32)
+            spline.points.foreach_get("co", points)
+            bezier_points: np.ndarray = np.empty(len(spline.bezier_points) * 9, dtype=np.float32)
+
+            for index, point in enumerate(spline.bezier_points):
+                bezier_points[index * 9:index * 9 + 9] = list(point.co) + list(point.handle_left) \
+                    + list(point.handle_right)
+
+            arrays += [points, bezier_points]
+
+        return hash_arrays(*arrays)
+
+    if is_curves_data(data):
+        position: np.ndarray = np.empty(len(data.points) * 3, dtype=np.float32)
+        data.attributes.get("position").data.foreach_get("vector", position)
+        first_point_indices: np.ndarray = np.empty(len(data.curves), dtype=np.int32)
+        data.curves.foreach_get("first_point_index", first_point_indices)
+
+        return hash_arrays(position, first_point_indices, *attribute_arrays(data.attributes))
+
+    return ""
+
+
+def fcurve_channels(id_block) -> dict:
+    """
+    The keys of every F-curve on an ID block, as the interpolated channels of a fingerprint
+    """
+    channels = dict({})
+    animation_data = getattr(id_block, "animation_data", None)
+
+    if animation_data is None or animation_data.action is None:
+        return channels
+
+    for fcurve in animation_data.action.fcurves:
+        path = "{id}/{data_path}[{index}]".format(id=id_block.name_full, data_path=fcurve.data_path,
+                                                   index=fcurve.array_index)
+
+        channels[path] = dict({
+            "kind": "interpolated",
+            # Modifiers like cycles spread a key's change over the whole curve, they're part of the curve's settings
+            "static": hash_values([property_values(fcurve), [property_values(modifier)
+                                                             for modifier in fcurve.modifiers]]),
+            "keys": [
+                [point.co[0], hash_values(property_values(point))] for point in fcurve.keyframe_points
+            ],
         })
 
-        # TODO: Read this out of the object itself in case we need more than one texture
-        if has_uv:
-            spline_struct["texture_file"] = './texture.png'
+    return channels
 
-        if spline_type == CurveType.CURVE_TYPE_BEZIER:
-            for point in spline.points:
-                point: bpy.types.CurvePoint = point
-                point_struct = dict({
-                    "co": point_attributes["position"][point.index],
-                    "color": point_attributes["color"][point.index],
-                    "handle_left": point_attributes["handle_left"][point.index],
-                    "handle_right": point_attributes["handle_right"][point.index],
-                    "handle_type_left": point_attributes["handle_type_left"][point.index],
-                    "handle_type_right": point_attributes["handle_type_right"][point.index],
-                })
-                if "UV" in point_attributes:
-                    point_struct["uv"] = point_attributes["UV"][point.index]
 
-                spline_struct["points"].append(point_struct)
+def drawing_channels(gp_data) -> dict:
+    """
+    The drawings of every grease pencil layer, as the held channels of a fingerprint
+    """
+    channels = dict({})
+
+    for layer in gp_data.layers:
+        keys = []
+
+        for frame in layer.frames:
+            points = read_gpencil_frame_points(frame)
+            keys.append([frame.frame_number, hash_arrays(*[points[name] for name in (
+                "stroke_offsets", "use_cyclic", "material_index", "co", "pressure", "strength", "vertex_color")])])
+
+        channels["{id}/layers[{layer}]".format(id=gp_data.name_full, layer=layer.info)] = dict({
+            "kind": "held",
+            "static": "",
+            "keys": sorted(keys),
+        })
+
+    return channels
+
+
+def object_references(struct) -> list:
+    """
+    The objects a modifier or constraint points to, collections stand for every object in them
+    """
+    references = []
+    values = [getattr(struct, prop.identifier, None) for prop in struct.bl_rna.properties if prop.type == "POINTER"]
+
+    # Geometry nodes modifiers keep their inputs as custom properties
+    values += [struct[key] for key in custom_property_keys(struct)]
+
+    for value in values:
+        if isinstance(value, bpy.types.Object):
+            references.append(value)
+        elif isinstance(value, bpy.types.Collection):
+            references.extend(value.all_objects)
+
+    return references
+
+
+def fingerprint_object(obj: bpy.types.bpy_struct, frames: range) -> dict:
+    """
+    A fingerprint of everything an object's export is read from, see incremental
+    """
+    modifiers = list(getattr(obj, "modifiers", [])) + list(getattr(obj, "grease_pencil_modifiers", []))
+    materials = [slot.material for slot in obj.material_slots if slot.material is not None]
+    particle_settings = [system.settings for system in getattr(obj, "particle_systems", [])]
+    node_groups = [modifier.node_group for modifier in modifiers if getattr(modifier, "node_group", None)]
+    node_trees = [material.node_tree for material in materials if material.node_tree is not None]
+
+    id_blocks = [obj] + ([obj.data] if obj.data is not None else []) + materials + particle_settings + node_groups \
+        + node_trees
+    object_animated = animated_paths(obj)
+
+    inputs = [obj.type]
+    channels = dict({})
+
+    for id_block in id_blocks:
+        animated = animated_paths(id_block)
+        inputs.append((id_block.name_full, property_values(id_block, animated)))
+        channels.update(fcurve_channels(id_block))
+
+        if isinstance(id_block, bpy.types.Material) and id_block.grease_pencil is not None:
+            inputs.append(property_values(id_block.grease_pencil, animated, "grease_pencil."))
+
+        if isinstance(id_block, bpy.types.NodeTree):
+            for node in id_block.nodes:
+                prefix = 'nodes["{name}"].'.format(name=node.name)
+                inputs.append((node.name, property_values(node, animated, prefix,
+                                                          FINGERPRINT_SKIPPED | NODE_LAYOUT_PROPERTIES),
+                               [fingerprint_value(getattr(socket, "default_value", None))
+                                for index, socket in enumerate(node.inputs)
+                                if "{prefix}inputs[{index}].default_value".format(prefix=prefix, index=index)
+                                not in animated]))
+
+    for collection_name in ("modifiers", "grease_pencil_modifiers", "constraints", "particle_systems"):
+        for item in getattr(obj, collection_name, []):
+            prefix = '{collection}["{name}"].'.format(collection=collection_name, name=item.name)
+            inputs.append((prefix, property_values(item, object_animated, prefix)))
+
+    if obj.type == "GPENCIL":
+        inputs.append([property_values(layer, animated_paths(obj.data), 'layers["{name}"].'.format(name=layer.info))
+                       for layer in obj.data.layers])
+        channels.update(drawing_channels(obj.data))
+    elif obj.data is not None:
+        inputs.append(geometry_hash(obj.data))
+
+    dependencies = [obj.parent] if obj.parent is not None else []
+
+    for item in modifiers + list(obj.constraints):
+        dependencies += object_references(item)
+
+    return dict({
+        "inputs": hash_values(inputs),
+        "channels": channels,
+        "always": any(len(id_block.animation_data.drivers) > 0 or len(id_block.animation_data.nla_tracks) > 0
+                      for id_block in id_blocks if getattr(id_block, "animation_data", None) is not None),
+        "cumulative": any(modifier.type in SIMULATION_MODIFIERS for modifier in modifiers),
+        # Occlusion is found against the whole scene, as are line art strokes
+        "scene": obj.type not in ("CAMERA", "EMPTY") and obj.get("occlusion", 1) != 0
+                 or any(modifier.type == "GP_LINEART" for modifier in modifiers),
+        "dependencies": sorted(set(dependency.name for dependency in dependencies if dependency != obj)),
+        "frames": [frames.start, frames.stop],
+    })
+
+
+def fingerprint_objects(objects: list, frames: range) -> dict[str, dict]:
+    """
+    The fingerprint of every object in the list and of every object they follow
+    """
+    fingerprints = dict({})
+    pending = list(objects)
+
+    while len(pending) > 0:
+        obj = pending.pop()
+
+        if obj.name in fingerprints:
+            continue
+
+        fingerprints[obj.name] = fingerprint_object(obj, frames)
+        pending.extend(bpy.data.objects[name] for name in fingerprints[obj.name]["dependencies"]
+                       if name in bpy.data.objects)
+
+    return fingerprints
+
+
+def scene_occluders(scene: bpy.types.Scene) -> list:
+    """
+    The objects occlusion is found against, see build_occluder_bvh
+    """
+    return [obj for obj in scene.objects if obj.type in OCCLUDER_TYPES and obj.get("occluder", 1) != 0]
+
+
+# The keyframeable channels of an object's own transform, and the length of each
+TRANSFORM_CHANNELS = dict({
+    "location": 3,
+    "rotation_euler": 3,
+    "rotation_quaternion": 4,
+    "rotation_axis_angle": 4,
+    "scale": 3,
+})
+
+
+def is_keyframed_transform(obj: bpy.types.bpy_struct) -> bool:
+    """
+    Whether only keyframes on an object's own transform change its export, so every frame of it can be read from its
+    F-curves without stepping the scene
+
+    Only cameras, lights and empties qualify, with no parent, constraints, drivers, NLA strips or delta transforms.
+    Lights also need occlusion turned off, since it depends on the rest of the scene on each frame.
+    """
+    if obj.type not in ("CAMERA", "LIGHT", "EMPTY"):
+        return False
+
+    if obj.parent is not None or len(obj.constraints) > 0 or has_animation(obj.data):
+        return False
+
+    if obj.type == "LIGHT" and obj.get("occlusion", 1) != 0:
+        return False
+
+    if tuple(obj.delta_location) != (0, 0, 0) or tuple(obj.delta_rotation_euler) != (0, 0, 0) \
+            or tuple(obj.delta_rotation_quaternion) != (1, 0, 0, 0) or tuple(obj.delta_scale) != (1, 1, 1):
+        return False
+
+    animation_data = obj.animation_data
+
+    if animation_data is None:
+        return True
+
+    if len(animation_data.drivers) > 0 or len(animation_data.nla_tracks) > 0:
+        return False
+
+    # Keyframed custom properties and the like are left to the scene
+    return animation_data.action is None or all(
+        fcurve.data_path in TRANSFORM_CHANNELS for fcurve in animation_data.action.fcurves)
+
+
+def sample_fcurves(obj: bpy.types.bpy_struct, frame_numbers: list[int]) -> dict:
+    """
+    The value of each of an object's transform channels on every frame, as arrays with a row per frame
+
+    Channels without an F-curve keep the object's current value.
+    """
+    count = len(frame_numbers)
+    channels = dict({
+        name: np.tile(np.array(getattr(obj, name), dtype=np.float64), (count, 1))
+        for name in TRANSFORM_CHANNELS.keys()
+    })
+
+    action = obj.animation_data.action if obj.animation_data else None
+
+    if action is None:
+        return channels
+
+    for fcurve in action.fcurves:
+        if fcurve.mute:
+            continue
+
+        evaluate = fcurve.evaluate
+        channels[fcurve.data_path][:, fcurve.array_index] = [evaluate(frame_number) for frame_number in frame_numbers]
+
+    return channels
+
+
+def keyframed_transforms(obj: bpy.types.bpy_struct, frame_numbers: list[int]) -> list:
+    """
+    The decomposed world space location, rotation and scale of a keyframed object on every frame
+
+    With no parent the world matrix is built from the object's own channels, the same as matrix_world would be.
+    """
+    channels = sample_fcurves(obj, frame_numbers)
+    rotation_mode = obj.rotation_mode
+    transforms = []
+
+    for index in range(len(frame_numbers)):
+        if rotation_mode == "QUATERNION":
+            rotation = mathutils.Quaternion(channels["rotation_quaternion"][index]).normalized()
+        elif rotation_mode == "AXIS_ANGLE":
+            angle, x, y, z = channels["rotation_axis_angle"][index]
+            rotation = mathutils.Quaternion(Vector((x, y, z)), angle)
         else:
-            for point in spline.points:
-                point: bpy.types.CurvePoint = point
-                point_struct = dict({
-                    "color": serialise_vector_color(point_attributes["color"][point.index]),
-                    "co": point_attributes["position"][point.index],
-                })
-                if "UV" in point_attributes:
-                    point_struct["uv"] = point_attributes["UV"][point.index]
-                
-                spline_struct["points"].append(point_struct)
-        
-        save_struct["splines"].append(spline_struct)
-    
-    # Save the frame
-    save_file(get_output_filepath(context, frame_number, cu_obj.name), save_struct)
+            rotation = mathutils.Euler(channels["rotation_euler"][index], rotation_mode).to_quaternion()
 
+        matrix = mathutils.Matrix.LocRotScale(Vector(channels["location"][index]), rotation,
+                                              Vector(channels["scale"][index]))
+        transforms.append(matrix.decompose())
 
-def get_random_color():
-    ''' generate rgb using a list comprehension '''
-    r, g, b = [random.random() for i in range(3)]
-    return r, g, b, 1
+    return transforms
 
 
-class OBJECT_OT_TPVExport(Operator):
-    bl_idname = "object.gptounityanimated"
-    bl_label = "Export Selected Objects"
-    bl_options = {'REGISTER', 'UNDO'}
+# The exporters that write a handful of values per frame, which can be gathered into timelines
+TIMELINE_EXPORTERS = (camera_export, light_export, empty_export, effector_export)
 
-    def execute(self, context):
-        # get object in selection, for each, set active and selection
-        selObjs = bpy.context.selected_objects
 
-        # Create the base folder
-        base_folder = os.path.abspath(context.scene.export_pathStatic)
+class PlannedObject:
+    """
+    An object in an export plan, with its exporter and file name resolved
+    """
 
-        if not os.path.exists(base_folder):
-            os.mkdir(base_folder)
+    def __init__(self, obj: bpy.types.bpy_struct, exporter, extension: str, timeline: bool = False):
+        self.obj = obj
+        self.name = obj.name
+        self.exporter = exporter
+        self.timeline = timeline
+        self.file_name = "obj_{name}.{extension}".format(name=slugify(obj.name), extension=extension)
+        self.keyframed = is_keyframed_transform(obj)
 
-        # Remember what frame we're on
-        saveFrame = bpy.context.scene.frame_current
 
-        # Deselect everything
-        for selObj in selObjs:
-            selObj.select_set(False)
+class ExportPlan:
+    """
+    Everything about an export that stays the same from frame to frame, resolved once before the frame loop
 
-        # For every frame, save every object
-        start_frame = bpy.context.scene.frame_start
-        end_frame = bpy.context.scene.frame_end
+    The loop only runs the plan: each object's exporter, and the folder and file name every export is written to.
+    The plan can also list exactly what the export will write, for dry runs.
+    """
 
-        for frame_number in range(start_frame, end_frame):
+    def __init__(self, objects: list, camera, start_frame: int, end_frame: int, settings: ExportSettings,
+                 scene: bpy.types.Scene = None):
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.settings = settings
+        self.extension = output_extension(settings)
+
+        self.objects: list[PlannedObject] = []
+        self.skipped: list[bpy.types.bpy_struct] = []
+
+        for obj in objects:
+            exporter = resolve_exporter(obj)
+
+            if exporter is None:
+                self.skipped.append(obj)
+            else:
+                self.objects.append(PlannedObject(obj, exporter, self.extension,
+                                                  settings.timelines and exporter in TIMELINE_EXPORTERS))
+
+        # The active camera is exported too, it's looked up on every frame since markers can switch it
+        self.camera = PlannedObject(camera, camera_export, self.extension, settings.timelines) if camera else None
+
+        self.file_names = dict({planned.name: planned.file_name for planned in self.objects})
+
+        if self.camera:
+            self.file_names[self.camera.name] = self.camera.file_name
+
+        self.frame_folders = [
+            os.path.join(settings.output_path, str(frame_number)) for frame_number in range(start_frame, end_frame)
+        ]
+
+        # When nothing but keyframed transforms changes, the frames are read from F-curves and the scene never steps.
+        # A marker bound to a camera could switch it partway through, so those scenes always step.
+        scene = scene or bpy.context.scene
+        markers = scene.timeline_markers
+        planned = self.objects + ([self.camera] if self.camera else [])
+
+        self.keyframed_only = len(planned) > 0 and all(planned_object.keyframed for planned_object in planned) \
+            and not any(marker.camera is not None for marker in markers)
+
+        # With incremental exports, the frames each object has to be written on, None writes every frame
+        self.fingerprints: dict[str, dict] = None
+        self.scene_names: list[str] = None
+        self.dirty: dict[str, set[int]] = None
+
+        if settings.incremental:
+            self.find_dirty_frames(scene)
+
+    def planned(self) -> list[PlannedObject]:
+        return self.objects + ([self.camera] if self.camera else [])
+
+    def find_dirty_frames(self, scene: bpy.types.Scene):
+        """
+        Fingerprint the objects and compare them with the last incremental export into the folder, see incremental
+        """
+        frames = range(self.start_frame, self.end_frame)
+        planned = self.planned()
+
+        # The camera and occluders decide what's occluded, so they're fingerprinted whether they're exported or not
+        scene_objects = ([self.camera.obj] if self.camera else []) + scene_occluders(scene)
+        self.scene_names = [obj.name for obj in scene_objects]
+
+        self.fingerprints = fingerprint_objects([planned_object.obj for planned_object in planned] + scene_objects,
+                                                frames)
+
+        manifest = incremental.read_manifest(self.settings.output_path)
+        same_settings = manifest["settings"] == self.settings.output_arguments()
+        previous = manifest["objects"] if same_settings else dict({})
+        previous_scene = manifest.get("scene", []) if same_settings else []
+
+        # Frames stored as changes from the frame before can't be rewritten on their own
+        if self.settings.output_format == "BINARY" and self.settings.keyframe_interval > 1:
+            return
+
+        dirty = incremental.dirty_frames(previous, self.fingerprints,
+                                         [planned_object.name for planned_object in planned],
+                                         self.scene_names, previous_scene, frames)
+
+        # A timeline holds every frame of its object, so it's written whole or not at all
+        for planned_object in planned:
+            if planned_object.timeline and len(dirty[planned_object.name]) > 0:
+                dirty[planned_object.name] = set(frames)
+
+        # A bundle or manifest holds every object on its frame, so a frame is written whole if anything changed on it
+        if self.settings.output_layout != "OBJECT":
+            bundled = [planned_object for planned_object in planned if not planned_object.timeline]
+            frame_numbers = set().union(*[dirty[planned_object.name] for planned_object in bundled])
+
+            for planned_object in bundled:
+                dirty[planned_object.name] = frame_numbers
+
+        self.dirty = dirty
+
+    def frame_numbers(self) -> list[int]:
+        """
+        The frames the export steps through
+        """
+        if self.dirty is None:
+            return list(range(self.start_frame, self.end_frame))
+
+        return sorted(set().union(*self.dirty.values()))
+
+    def exports(self, obj_name: str, frame_number: int) -> bool:
+        """
+        Whether an object is written on a frame
+
+        Objects outside the plan, like a camera switched to by a marker, always are.
+        """
+        return self.dirty is None or obj_name not in self.dirty or frame_number in self.dirty[obj_name]
+
+    def file_path(self, frame_number: int, obj_name: str) -> str:
+        """
+        Where an object's export for a frame is written with the file per object layout
+        """
+        file_name = self.file_names.get(obj_name)
+
+        # Objects outside the plan, like a camera switched to by a marker, are named the first time they're saved
+        if file_name is None:
+            file_name = "obj_{name}.{extension}".format(name=slugify(obj_name), extension=self.extension)
+            self.file_names[obj_name] = file_name
+
+        return os.path.join(self.frame_folders[frame_number - self.start_frame], file_name)
+
+    def planned_files(self):
+        """
+        Every file the export will write, blobs aside since they're named by their contents
+        """
+        planned = self.planned()
+        per_frame = [planned_object for planned_object in planned if not planned_object.timeline]
+
+        for planned_object in planned:
+            if planned_object.timeline and self.exports(planned_object.name, self.start_frame):
+                yield get_timeline_filepath(self.settings.output_path, planned_object.name, self.start_frame,
+                                            self.end_frame, "json" + compression.COMPRESSION_EXTENSIONS[
+                                                self.settings.compression])
+
+        # Frames where everything went into timelines have no files of their own
+        if len(per_frame) == 0:
+            return
+
+        for frame_number in range(self.start_frame, self.end_frame):
+            if not any(self.exports(planned_object.name, frame_number) for planned_object in per_frame):
+                continue
+
+            if self.settings.output_layout == "OBJECT":
+                for planned_object in per_frame:
+                    if self.exports(planned_object.name, frame_number):
+                        yield self.file_path(frame_number, planned_object.name)
+            elif self.settings.output_layout == "BLOBS":
+                # Manifests are always plain JSON
+                yield get_bundle_filepath(self.settings.output_path, frame_number)
+            else:
+                yield get_bundle_filepath(self.settings.output_path, frame_number, self.extension)
+
+    def describe(self) -> list[str]:
+        """
+        A readable listing of the plan, for dry runs
+        """
+        lines = ["Export of {count} objects, frames {start_frame}-{end_frame} to {output} ({format}, {layout})".format(
+            count=len(self.objects), start_frame=self.start_frame, end_frame=self.end_frame - 1,
+            output=self.settings.output_path, format=self.settings.output_format, layout=self.settings.output_layout)]
+
+        if self.keyframed_only:
+            lines.append("Only keyframed transforms change, frames are read from F-curves without stepping the scene")
+
+        if self.settings.incremental and self.dirty is None:
+            lines.append("Incremental exports can't skip frames stored as changes, every frame is written")
+
+        for planned in self.planned():
+            lines.append("  {name}: {exporter}{timeline}{dirty}".format(
+                name=planned.name, exporter=planned.exporter.__name__,
+                timeline=", as a timeline" if planned.timeline else "",
+                dirty="" if self.dirty is None else ", {count} of {total} frames changed".format(
+                    count=len(self.dirty[planned.name]), total=self.end_frame - self.start_frame)))
+
+        for obj in self.skipped:
+            lines.append("  {name}: skipped, no exporter for {type} objects".format(name=obj.name, type=obj.type))
+
+        lines.append("Files:")
+        lines.extend("  " + file_path for file_path in self.planned_files())
+
+        if self.settings.output_layout == "BLOBS":
+            lines.append("  and the distinct exports in " + os.path.join(self.settings.output_path, BLOB_FOLDER))
+
+        return lines
+
+
+def export_frames(self, context, objects: list, start_frame: int, end_frame: int, settings: ExportSettings):
+    """
+    Export every object in the list on every frame in the range, plus the active camera
+
+    Works straight from the object list, the selection and active object are never touched.
+    """
+    # Remember what frame we're on
+    saveFrame = context.scene.frame_current
+
+    # Every folder is made once up front instead of being checked for every file
+    create_output_folders(settings, start_frame, end_frame)
+
+    # Work out what to do with each object once, the loop below only runs the plan
+    plan = ExportPlan(objects, context.scene.camera, start_frame, end_frame, settings, context.scene)
+
+    for obj in plan.skipped:
+        print("Unknown object type selected:", obj.type)
+
+    run = ExportRun(settings, plan)
+
+    if plan.dirty is not None:
+        print("{count} of {total} frames changed since the last incremental export".format(
+            count=len(plan.frame_numbers()), total=end_frame - start_frame))
+
+    if plan.keyframed_only:
+        try:
+            export_keyframed_frames(self, context, plan, run)
+        finally:
+            run.close()
+
+        record_fingerprints(plan)
+        return
+
+    try:
+        for frame_number in plan.frame_numbers():
             # Update the progress bar
             print("Processing frame {frame_number} in range ({start_frame}-{end_frame})".format(frame_number=frame_number,start_frame=start_frame,end_frame=end_frame))
 
             # Set the frame in the editor
-            bpy.context.scene.frame_set(frame_number)
+            context.scene.frame_set(frame_number)
+
+            # Everything the exporters share on this frame is evaluated once
+            frame_context = FrameContext(context, frame_number, run)
 
             # Run through every object, run the corresponding command
-            for selObj in selObjs:
-                bpy.ops.object.select_all(action='DESELECT')
-                selObj.select_set(True)
-                bpy.context.view_layer.objects.active = selObj
+            for planned in plan.objects:
+                if plan.exports(planned.name, frame_number):
+                    planned.exporter(self, context, frame_context, planned.obj)
 
-                if selObj.type == "CURVES":
-                    hair_curves_export(self, bpy.context, frame_number, selObj)
-                    continue
+            # Export the active camera regardless of which ones are selected
+            if context.scene.camera and plan.exports(context.scene.camera.name, frame_number):
+                camera_export(self, context, frame_context, context.scene.camera)
 
-                if selObj.name[:3] == "GP_" and selObj.type == "MESH":
-                    geometry_nodes_verts_export(self, bpy.context, frame_number, selObj)
-                    continue
+            frame_context.finish()
+    finally:
+        # Let the writers catch up
+        run.close()
 
-                if selObj.name[:3] == "GN_" and selObj.type == "MESH":
-                    geometry_nodes_mesh_export(self, bpy.context, frame_number, selObj)
-                    continue
-                
-                if selObj.type == "GPENCIL":
-                    grease_pencil_export(self, bpy.context, frame_number, selObj)
-                    continue
+    # Reset the frame that was selected
+    context.scene.frame_set(saveFrame)
 
-                if selObj.type == "PARTICLES" or selObj.type == "MESH":
-                    particle_system_export(self, bpy.context, frame_number, selObj)
-                    continue
+    record_fingerprints(plan)
 
-                if selObj.type == "LIGHT":
-                    light_export(self, bpy.context, frame_number, selObj)
-                    continue
 
-                if selObj.type == "CURVE":
-                    curve_export(self, bpy.context, frame_number, selObj)
-                    continue
+def record_fingerprints(plan: ExportPlan):
+    """
+    Once an incremental export has finished, record what it was exported from for the next one
+    """
+    if plan.fingerprints is not None:
+        incremental.write_manifest(plan.settings.output_path, plan.settings.output_arguments(), plan.fingerprints,
+                                   plan.scene_names)
 
-                if selObj.type == "EMPTY" and selObj.name.lower().startswith("effector"):
-                    effector_export(self, bpy.context, frame_number, selObj)
-                    continue
 
-                if selObj.type == "EMPTY":
-                    empty_export(self, bpy.context, frame_number, selObj)
-                    continue
+def export_keyframed_frames(self, context, plan: ExportPlan, run: ExportRun):
+    """
+    Export a plan whose objects only move by keyframes on their own transforms, without stepping the scene
+
+    Every object's F-curves are evaluated for the whole range up front, and each frame's exports are built from
+    those transforms. Everything else the exporters read stays the same from frame to frame.
+    """
+    frame_numbers = plan.frame_numbers()
+    planned = plan.planned()
 
-                print("Unknown object type selected:", selObj.type)
+    transforms = dict({
+        planned_object.name: keyframed_transforms(planned_object.obj, frame_numbers) for planned_object in planned
+    })
 
-            # Export the active camera regardless of which ones are selected
-            if bpy.context.scene.camera:
-                camera_export(self, bpy.context, frame_number, bpy.context.scene.camera)
+    print("Processing frames {start_frame}-{end_frame} from F-curves".format(
+        start_frame=plan.start_frame, end_frame=plan.end_frame))
 
+    for index, frame_number in enumerate(frame_numbers):
+        frame_context = FrameContext(context, frame_number, run, dict({
+            name: object_transforms[index] for name, object_transforms in transforms.items()
+        }))
 
+        for planned_object in plan.objects:
+            if plan.exports(planned_object.name, frame_number):
+                planned_object.exporter(self, context, frame_context, planned_object.obj)
+
+        if plan.camera and plan.exports(plan.camera.name, frame_number):
+            camera_export(self, context, frame_context, plan.camera.obj)
+
+        frame_context.finish()
+
+
+def prepare_output(settings: ExportSettings, objects: list, camera: bpy.types.Object):
+    # Create the base folder
+    if not os.path.exists(settings.output_path):
+        os.makedirs(settings.output_path)
+
+    # Workers write their timelines into staging folders that get merged over the output, so the old ones go first
+    if settings.timelines and settings.workers > 1:
+        for obj in objects + ([camera] if camera else []):
+            remove_timelines(settings.output_path, obj.name)
+
+    # A full export overwrites the files the fingerprints of an earlier incremental export describe
+    if not settings.incremental:
+        incremental.discard_manifest(settings.output_path)
+
+
+def parallel_export_finished(context, objects: list, start_frame: int, end_frame: int, settings: ExportSettings,
+                             failed_shards: list) -> list[str]:
+    """
+    Wrap up an export split between workers, returns a description of every range of frames that failed
+    """
+    # Workers write every frame, the fingerprints let the next incremental export in this session skip them
+    if settings.incremental and len(failed_shards) == 0:
+        record_fingerprints(ExportPlan(objects, context.scene.camera, start_frame, end_frame, settings,
+                                       context.scene))
+
+    return ["{start}-{end}".format(start=shard.start_frame, end=shard.end_frame - 1) for shard in failed_shards]
+
+
+def run_export(self, context, objects: list, start_frame: int, end_frame: int, settings: ExportSettings) -> list[str]:
+    """
+    Export the objects over the frame range, in this session or split between workers
+
+    Returns a description of every range of frames that failed to export.
+    """
+    prepare_output(settings, objects, context.scene.camera)
+
+    # Split the frames between headless Blender processes
+    if settings.workers > 1:
+        failed_shards = parallel.export_parallel(context, [obj.name for obj in objects], start_frame, end_frame, settings)
+
+        return parallel_export_finished(context, objects, start_frame, end_frame, settings, failed_shards)
+
+    # For every frame, save every object
+    export_frames(self, context, objects, start_frame, end_frame, settings)
+
+    return []
 
-        # Reset the frame that was selected
-        bpy.context.scene.frame_set(saveFrame)
+
+class OBJECT_OT_TPVDryRun(Operator):
+    bl_idname = "object.tpvdryrun"
+    bl_label = "Dry Run"
+    bl_description = "List what exporting the selected objects would write, without writing anything"
+
+    def execute(self, context):
+        plan = ExportPlan(list(context.selected_objects), context.scene.camera, context.scene.frame_start,
+                          context.scene.frame_end, ExportSettings.from_scene(context.scene), context.scene)
+
+        print("\n".join(plan.describe()))
+
+        self.report({'INFO'}, "{count} objects would be exported, see the console for every file".format(
+            count=len(plan.objects)))
+
+        return {'FINISHED'}
+
+
+class OBJECT_OT_TPVExport(Operator):
+    bl_idname = "object.gptounityanimated"
+    bl_label = "Export Selected Objects"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        # Resolve the selection once, the exporters work from this list
+        selObjs = list(context.selected_objects)
+        settings = ExportSettings.from_scene(context.scene)
+
+        # Workers export in their own processes, a timer checks on them so the UI stays responsive meanwhile
+        if settings.workers > 1 and context.window is not None:
+            prepare_output(settings, selObjs, context.scene.camera)
+
+            self._objects = selObjs
+            self._job = parallel.ParallelExport(context, [obj.name for obj in selObjs], context.scene.frame_start,
+                                                context.scene.frame_end, settings)
+            self._timer = context.window_manager.event_timer_add(parallel.POLL_INTERVAL, window=context.window)
+            context.window_manager.modal_handler_add(self)
+
+            self.report({'INFO'}, "Exporting across {workers} workers, press Esc to cancel".format(
+                workers=settings.workers))
+
+            return {'RUNNING_MODAL'}
+
+        failed = run_export(self, context, selObjs, context.scene.frame_start, context.scene.frame_end, settings)
+
+        return self.finished(failed)
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._job.cancel()
+        elif event.type != 'TIMER' or not self._job.poll():
+            return {'PASS_THROUGH'}
+
+        context.window_manager.event_timer_remove(self._timer)
+
+        job = self._job
+        failed = parallel_export_finished(context, self._objects, job.start_frame, job.end_frame, job.settings,
+                                          job.finish())
+
+        return self.finished(failed)
+
+    def finished(self, failed: list[str]):
+        if len(failed) > 0:
+            self.report({'ERROR'}, "Frames {ranges} failed to export".format(ranges=", ".join(failed)))
+            return {'CANCELLED'}
 
         return {'FINISHED'}
 
@@ -991,27 +2764,20 @@ class OBJECT_OT_GPBakeLighting(Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        # get object in selection, for each, set active and selection
-        selObjs = bpy.context.selected_objects
+        # Resolve the selection once, the bake works from these lists
+        selObjs = list(context.selected_objects)
+        light_objs = [selObj for selObj in selObjs if selObj.type == "LIGHT"]
+        pencil_objs = [selObj for selObj in selObjs if selObj.type == "GPENCIL"]
 
         # Remember what frame we're on
         saveFrame = bpy.context.scene.frame_current
 
-        # Deselect everything
-        for selObj in selObjs:
-            selObj.select_set(False)
-
         # For every frame, save every object
         start_frame = bpy.context.scene.frame_start
         end_frame = bpy.context.scene.frame_end
 
-        light_count = 0
-        pencil_count = 0
-        for selObj in selObjs:
-            if selObj.type == "LIGHT":
-                light_count += 1
-            if selObj.type == "GPENCIL":
-                pencil_count += 1
+        light_count = len(light_objs)
+        pencil_count = len(pencil_objs)
 
         if light_count == 0:
             print("No lights")
@@ -1021,6 +2787,9 @@ class OBJECT_OT_GPBakeLighting(Operator):
 
         print("{light_count} lights, {pencil_count} GPencils".format(light_count=light_count,pencil_count=pencil_count))
 
+        # Grease pencil keyframes are indexed once for the whole run
+        run = ExportRun()
+
         for frame_number in range(start_frame, end_frame):
             # Update the progress bar
             print(
@@ -1031,34 +2800,27 @@ class OBJECT_OT_GPBakeLighting(Operator):
             # Set the frame in the editor
             bpy.context.scene.frame_set(frame_number)
 
-            deps_graph = context.evaluated_depsgraph_get()
+            # Everything the bake shares on this frame is evaluated once
+            frame_context = FrameContext(bpy.context, frame_number, run)
 
             # Accumulate lights
             lights = []
-            for selObj in selObjs:
-                if selObj.type == "LIGHT":
-                    # Evaluate the world position and current colour of the light
-                    evaluated_light = selObj.evaluated_get(deps_graph)
-                    loc, rot, scale = evaluated_light.matrix_world.decompose()
-                    light_color = evaluated_light.data.color
-
-                    lights.append(dict({
-                        "world_position": loc,
-                        "color": light_color,
-                        "radius": evaluated_light.data.shadow_soft_size
-                    }))
-                    #print("Light has position", loc, "and color", light_color)
-                    continue
+            for selObj in light_objs:
+                # Evaluate the world position and current colour of the light
+                evaluated_light = frame_context.evaluated(selObj)
+                loc, rot, scale = frame_context.transform(selObj)
+                light_color = evaluated_light.data.color
+
+                lights.append(dict({
+                    "world_position": loc,
+                    "color": light_color,
+                    "radius": evaluated_light.data.shadow_soft_size
+                }))
+                #print("Light has position", loc, "and color", light_color)
 
             # Bake each GPencil object
-            for selObj in selObjs:
-                bpy.ops.object.select_all(action='DESELECT')
-                selObj.select_set(True)
-                bpy.context.view_layer.objects.active = selObj
-
-                if selObj.type == "GPENCIL":
-                    grease_pencil_bake_lighting(self, bpy.context, frame_number, selObj, lights)
-                    continue
+            for selObj in pencil_objs:
+                grease_pencil_bake_lighting(self, bpy.context, frame_context, selObj, lights)
 
 
         # Reset the frame that was selected
@@ -1067,12 +2829,13 @@ class OBJECT_OT_GPBakeLighting(Operator):
         return {'FINISHED'}
 
 
-def grease_pencil_bake_lighting(self, context, frame_number: int, gp_obj: bpy.types.bpy_struct, lights: list[LightData]):
+def grease_pencil_bake_lighting(self, context, frame_context: FrameContext, gp_obj: bpy.types.bpy_struct, lights: list[LightData]):
     gp_layers = gp_obj.data.layers
 
     obj_name = slugify(gp_obj.name)
 
-    deps_graph = context.evaluated_depsgraph_get()
+    frame_number = frame_context.frame_number
+    deps_graph = frame_context.deps_graph
 
     for layer in gp_layers:
         layer: bpy.types.GPencilLayer
@@ -1081,74 +2844,73 @@ def grease_pencil_bake_lighting(self, context, frame_number: int, gp_obj: bpy.ty
 
         layer_name = slugify(layer.info)
 
-        for frame in layer.frames:
-            frame: bpy.types.GPencilFrame
-
-            # Only do this frame
-            if frame.frame_number != frame_number:
-                continue
+        # Only do this frame
+        frame: bpy.types.GPencilFrame = frame_context.keyframe_index.keyframe(gp_obj, layer, frame_number)
 
-            for stroke in frame.strokes:
-                # A stroke is a collection of points, between which lines may be drawn
-                stroke: bpy.types.GPencilStroke
+        if frame is None:
+            continue
 
-                points: bpy.types.GPencilStrokePoints = stroke.points
+        for stroke in frame.strokes:
+            # A stroke is a collection of points, between which lines may be drawn
+            stroke: bpy.types.GPencilStroke
 
-                for point in points:
+            points: bpy.types.GPencilStrokePoints = stroke.points
 
-                    point: bpy.types.GPencilStrokePoint
+            for point in points:
 
-                    point_world_position: Vector = gp_obj.matrix_world @ point.co  # Multiply by the world matrix
+                point: bpy.types.GPencilStrokePoint
 
-                    visible_light_count = 0
-                    acc_r = 0
-                    acc_g = 0
-                    acc_b = 0
+                point_world_position: Vector = gp_obj.matrix_world @ point.co  # Multiply by the world matrix
 
-                    # For every light
-                    for light in lights:
-                        world_position = light["world_position"]
-                        light_color = light["color"]
-                        radius = light["radius"]
+                visible_light_count = 0
+                acc_r = 0
+                acc_g = 0
+                acc_b = 0
 
-                        starting_point: Vector = point_world_position # The point on the grease pencil
-                        ending_point: Vector = world_position # The light
+                # For every light
+                for light in lights:
+                    world_position = light["world_position"]
+                    light_color = light["color"]
+                    radius = light["radius"]
 
-                        direction = (ending_point - starting_point).normalized()  #
-                        distance = (ending_point - starting_point).length
+                    starting_point: Vector = point_world_position # The point on the grease pencil
+                    ending_point: Vector = world_position # The light
 
-                        # Move the starting point slightly along the line so we're not immediately intersecting ourselves
-                        starting_point = starting_point + (direction * (distance / 100))
+                    direction = (ending_point - starting_point).normalized()  #
+                    distance = (ending_point - starting_point).length
 
-                        # recalculate the distance
-                        distance = (ending_point - starting_point).length
+                    # Move the starting point slightly along the line so we're not immediately intersecting ourselves
+                    starting_point = starting_point + (direction * (distance / 100))
 
-                        # Only try if the distance is below the radius of the light
-                        if distance > radius:
-                            continue
+                    # recalculate the distance
+                    distance = (ending_point - starting_point).length
 
-                        # Scene raycasts seem to be the only ones that work
-                        result, location, normal, index, object, matrix = context.scene.ray_cast(deps_graph, starting_point, direction, distance=distance)
+                    # Only try if the distance is below the radius of the light
+                    if distance > radius:
+                        continue
 
-                        # If we hit nothing, accumulate the light
-                        if not result:
-                            acc_r += light_color[0]
-                            acc_g += light_color[1]
-                            acc_b += light_color[2]
-                            visible_light_count += 1
-                        else:
-                            pass
+                    # Scene raycasts seem to be the only ones that work
+                    result, location, normal, index, object, matrix = context.scene.ray_cast(deps_graph, starting_point, direction, distance=distance)
 
-                    if visible_light_count == 0:
-                        point.vertex_color[0] = 0
-                        point.vertex_color[1] = 0
-                        point.vertex_color[2] = 0
-                        point.vertex_color[3] = 0
+                    # If we hit nothing, accumulate the light
+                    if not result:
+                        acc_r += light_color[0]
+                        acc_g += light_color[1]
+                        acc_b += light_color[2]
+                        visible_light_count += 1
                     else:
-                        point.vertex_color[0] = acc_r / visible_light_count  # r
-                        point.vertex_color[1] = acc_g / visible_light_count # g
-                        point.vertex_color[2] = acc_b / visible_light_count # b
-                        point.vertex_color[3] = 1 # a
+                        pass
+
+                if visible_light_count == 0:
+                    point.vertex_color[0] = 0
+                    point.vertex_color[1] = 0
+                    point.vertex_color[2] = 0
+                    point.vertex_color[3] = 0
+                else:
+                    point.vertex_color[0] = acc_r / visible_light_count  # r
+                    point.vertex_color[1] = acc_g / visible_light_count # g
+                    point.vertex_color[2] = acc_b / visible_light_count # b
+                    point.vertex_color[3] = 1 # a
 
 
-                    # print(point, world_position, point.vertex_color)
\ No newline at end of file
+                # print(point, world_position, point.vertex_color)
\ No newline at end of file
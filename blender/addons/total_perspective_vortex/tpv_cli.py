@@ -0,0 +1,172 @@
+"""
+Headless batch export with Total Perspective Vortex, run as:
+
+blender --background scene.blend --python tpv_cli.py -- --output <folder> [--frame-start <n>] [--frame-end <n>]
+    [--objects <name or pattern> ...] [--collections <name> ...] [--format <format>] [--workers <n>] [--dry-run]
+
+Without --objects or --collections, the objects selected when the file was saved are exported, like the panel does.
+
+Several jobs can be run back to back without restarting Blender by listing them in a queue file:
+
+blender --background --python tpv_cli.py -- --queue jobs.txt
+
+Each line of a queue file is a .blend path followed by the same arguments as above. Blank lines and lines starting
+with # are skipped, and relative paths are relative to the queue file.
+"""
+import argparse
+import fnmatch
+import importlib
+import os
+import shlex
+import sys
+import traceback
+import bpy
+
+
+def import_tpv():
+    # Headless runs may use factory settings, so import the add-on from the folder this script lives in
+    addon_folder = os.path.dirname(os.path.abspath(__file__))
+
+    if os.path.dirname(addon_folder) not in sys.path:
+        sys.path.insert(0, os.path.dirname(addon_folder))
+
+    return importlib.import_module(os.path.basename(addon_folder) + ".tpv")
+
+
+tpv = import_tpv()
+
+
+def job_parser():
+    parser = argparse.ArgumentParser(prog="tpv_cli.py", description="Export a scene with Total Perspective Vortex")
+    tpv.ExportSettings.add_arguments(parser)
+    parser.add_argument("--frame-start", type=int, default=None, help="First frame to export, defaults to the scene's")
+    parser.add_argument("--frame-end", type=int, default=None,
+                        help="Frame to stop before, defaults to the scene's end frame like the panel")
+    parser.add_argument("--objects", nargs="*", default=[], help="Names or wildcard patterns of objects to export")
+    parser.add_argument("--collections", nargs="*", default=[], help="Collections whose objects are exported")
+    parser.add_argument("--dry-run", action="store_true", help="List what would be written without exporting")
+
+    return parser
+
+
+def resolve_objects(scene: bpy.types.Scene, object_patterns: list[str], collection_names: list[str]) -> list:
+    """
+    The objects a job exports, in scene order
+    """
+    if len(object_patterns) == 0 and len(collection_names) == 0:
+        return list(bpy.context.selected_objects)
+
+    names = set()
+
+    for pattern in object_patterns:
+        # Exact names win, so names containing wildcard characters still work
+        matches = [pattern] if pattern in scene.objects else fnmatch.filter([obj.name for obj in scene.objects], pattern)
+
+        if len(matches) == 0:
+            raise ValueError("No objects match {pattern}".format(pattern=pattern))
+
+        names.update(matches)
+
+    for collection_name in collection_names:
+        collection = bpy.data.collections.get(collection_name)
+
+        if collection is None:
+            raise ValueError("No collection called {name}".format(name=collection_name))
+
+        names.update(obj.name for obj in collection.all_objects)
+
+    # The camera is always exported on its own
+    return [obj for obj in scene.objects if obj.name in names and obj.type != "CAMERA"]
+
+
+def run_job(args) -> bool:
+    """
+    Export the currently open file as described by args, returns whether every frame exported
+    """
+    scene = bpy.context.scene
+    settings = tpv.ExportSettings.from_arguments(args)
+
+    start_frame = scene.frame_start if args.frame_start is None else args.frame_start
+    end_frame = scene.frame_end if args.frame_end is None else args.frame_end
+
+    objects = resolve_objects(scene, args.objects, args.collections)
+
+    if args.dry_run:
+        print("\n".join(tpv.ExportPlan(objects, scene.camera, start_frame, end_frame, settings, scene).describe()))
+        return True
+
+    print("Exporting {count} objects, frames {start_frame}-{end_frame} of {file} to {output}".format(
+        count=len(objects), start_frame=start_frame, end_frame=end_frame, file=bpy.data.filepath,
+        output=settings.output_path))
+
+    failed = tpv.run_export(None, bpy.context, objects, start_frame, end_frame, settings)
+
+    if len(failed) > 0:
+        print("Frames {ranges} failed to export".format(ranges=", ".join(failed)))
+
+    return len(failed) == 0
+
+
+def read_queue(queue_path: str) -> list[tuple[str, list[str]]]:
+    """
+    Parse a queue file into (blend path, arguments) jobs
+    """
+    queue_folder = os.path.dirname(os.path.abspath(queue_path))
+    jobs = []
+
+    with open(queue_path) as queue_file:
+        for line in queue_file:
+            line = line.strip()
+
+            if line == "" or line.startswith("#"):
+                continue
+
+            blend_path, *job_argv = shlex.split(line)
+            jobs.append((os.path.join(queue_folder, blend_path), job_argv))
+
+    return jobs
+
+
+def run_queue(queue_path: str) -> bool:
+    queue_folder = os.path.dirname(os.path.abspath(queue_path))
+    jobs = read_queue(queue_path)
+    failed_jobs = []
+
+    for index, (blend_path, job_argv) in enumerate(jobs):
+        print("Job {number} of {count}: {file}".format(number=index + 1, count=len(jobs), file=blend_path))
+
+        try:
+            args = job_parser().parse_args(job_argv)
+
+            # Outputs in the queue file are relative to it, not to wherever Blender was started
+            args.output = os.path.join(queue_folder, args.output)
+
+            bpy.ops.wm.open_mainfile(filepath=blend_path)
+
+            if not run_job(args):
+                failed_jobs.append(blend_path)
+        except (Exception, SystemExit):
+            traceback.print_exc()
+            failed_jobs.append(blend_path)
+
+    if len(failed_jobs) > 0:
+        print("{count} of {total} jobs failed: {files}".format(count=len(failed_jobs), total=len(jobs), files=", ".join(failed_jobs)))
+
+    return len(failed_jobs) == 0
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    if "--queue" in argv:
+        parser = argparse.ArgumentParser(prog="tpv_cli.py", description="Run a queue of Total Perspective Vortex exports")
+        parser.add_argument("--queue", required=True, help="File listing one .blend and its arguments per line")
+        succeeded = run_queue(parser.parse_args(argv).queue)
+    else:
+        succeeded = run_job(job_parser().parse_args(argv))
+
+    if not succeeded:
+        sys.exit(1)
+
+
+main()
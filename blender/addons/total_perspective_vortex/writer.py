@@ -0,0 +1,68 @@
+import queue
+import threading
+
+
+class BackgroundWriter:
+    """
+    Encodes and writes finished exports on worker threads while the main thread evaluates the next frame
+
+    The queue of pending writes is bounded, so when the writers fall behind, submit blocks until one finishes and
+    memory stays capped. With no threads, every write happens immediately on the calling thread.
+    """
+
+    def __init__(self, thread_count: int, max_pending: int):
+        self.pending = queue.Queue(maxsize=max(max_pending, 1))
+        self.errors: list[BaseException] = []
+        self.threads = [threading.Thread(target=self.work, daemon=True) for _ in range(thread_count)]
+
+        for thread in self.threads:
+            thread.start()
+
+    def work(self):
+        while True:
+            job = self.pending.get()
+
+            try:
+                # A None job tells the thread to stop
+                if job is None:
+                    return
+
+                function, args = job
+
+                # Once something has failed the rest of the queue is only drained
+                if len(self.errors) == 0:
+                    function(*args)
+            except BaseException as error:
+                self.errors.append(error)
+            finally:
+                self.pending.task_done()
+
+    def raise_errors(self):
+        if len(self.errors) > 0:
+            raise self.errors[0]
+
+    def submit(self, function, *args):
+        """
+        Call function(*args) on a writer thread, blocking while the queue is full
+        """
+        # Stop producing as soon as a write has failed
+        self.raise_errors()
+
+        if len(self.threads) == 0:
+            function(*args)
+            return
+
+        self.pending.put((function, args))
+
+    def close(self):
+        """
+        Wait for every pending write to finish, then raise the first error any of them hit
+        """
+        for _ in self.threads:
+            self.pending.put(None)
+
+        for thread in self.threads:
+            thread.join()
+
+        self.threads = []
+        self.raise_errors()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The add-on's package imports bpy, so the modules that don't are imported on their own, like benchmark.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "addons", "total_perspective_vortex"))
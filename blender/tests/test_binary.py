@@ -0,0 +1,102 @@
+import json
+import struct
+
+import numpy as np
+
+import columns
+from columns import ColumnTable, Quantization
+
+
+def decode(data: bytes):
+    """
+    Split a binary frame back into its header and its buffers as numpy arrays, like interface/src/optimiser/binary.ts
+    """
+    assert data[:4] == columns.BINARY_MAGIC
+    version, header_length = struct.unpack("<II", data[4:12])
+    assert version == columns.BINARY_VERSION
+    assert (12 + header_length) % columns.BINARY_ALIGNMENT == 0
+
+    header = json.loads(data[12:12 + header_length].decode("utf-8"))
+
+    for offset, length in header["buffers"]:
+        assert offset % columns.BINARY_ALIGNMENT == 0
+        assert offset + length <= len(data)
+
+    return header, data
+
+
+def column(header: dict, data: bytes, description: dict) -> np.ndarray:
+    offset, length = header["buffers"][description["buffer"]]
+    values = np.frombuffer(data[offset:offset + length], dtype=np.dtype(description["type"]).newbyteorder("<"))
+
+    if description["components"] > 1:
+        values = values.reshape(-1, description["components"])
+
+    return values
+
+
+def strokes_table():
+    points = ColumnTable(5) \
+        .column("co", np.arange(15, dtype=np.float32).reshape(5, 3) / 7, "position") \
+        .column("pressure", np.linspace(0, 1, 5, dtype=np.float32), "float") \
+        .column("vertexColor", np.full((5, 4), 0.5, dtype=np.float32), "color")
+
+    return ColumnTable(2) \
+        .column("useCyclic", np.array([True, False]), "flag") \
+        .field("id", ["a", "b"]) \
+        .nested("points", np.array([0, 2, 5]), points)
+
+
+def test_round_trip_keeps_payload_and_columns():
+    contents = dict({"type": "gpencil", "frame": 3, "name": "Drawing", "strokes": strokes_table()})
+
+    header, data = decode(columns.encode_binary(contents))
+    payload = header["payload"]
+
+    assert payload["type"] == "gpencil"
+    assert payload["frame"] == 3
+    assert payload["name"] == "Drawing"
+
+    strokes = payload["strokes"]["$table"]
+    assert strokes["length"] == 2
+    assert list(strokes["attributes"].keys()) == ["useCyclic", "id", "points"]
+    assert strokes["attributes"]["id"] == dict({"values": ["a", "b"]})
+    assert column(header, data, strokes["attributes"]["useCyclic"]).tolist() == [1, 0]
+
+    nested = strokes["attributes"]["points"]
+    assert column(header, data, nested["offsets"]).tolist() == [0, 2, 5]
+
+    points = nested["table"]["$table"]
+    expected = strokes_table().attributes["points"].table
+
+    for name in ("co", "pressure", "vertexColor"):
+        description = points["attributes"][name]
+        assert description["kind"] == expected.kinds[name]
+        np.testing.assert_array_equal(column(header, data, description), expected.attributes[name])
+
+
+def test_quantized_columns_stay_within_half_a_step():
+    positions = np.array([[10.0, -5.0, 3.25], [11.5, -4.0, 2.0]], dtype=np.float32)
+    colors = np.array([[0.0, 0.5, 1.0, 1.0], [0.2, 0.4, 0.6, 0.8]], dtype=np.float32)
+    table = ColumnTable(2).column("co", positions, "position").column("color", colors, "color")
+
+    header, data = decode(columns.encode_binary(dict({"points": table}), Quantization(0.01, "FRAME")))
+
+    assert header["quantization"]["maxError"] == 0.005
+
+    attributes = header["payload"]["points"]["$table"]["attributes"]
+    co = attributes["co"]
+    decoded = np.asarray(co["quantized"]["origin"]) + column(header, data, co) * co["quantized"]["step"]
+    assert np.abs(decoded - positions).max() <= 0.005 + 1e-6
+
+    color = attributes["color"]
+    assert color["type"] == "uint8"
+    decoded_colors = column(header, data, color) * color["quantized"]["scale"]
+    assert np.abs(decoded_colors - colors).max() <= 0.5 / columns.COLOR_LEVELS + 1e-6
+
+
+def test_empty_table():
+    header, data = decode(columns.encode_binary(dict({"strokes": ColumnTable(0)})))
+
+    assert header["payload"]["strokes"] == dict({"$table": dict({"length": 0, "attributes": dict({})})})
+    assert header["buffers"] == []
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+
+import columns
+from columns import ColumnTable
+
+# Values whose text is easy to get wrong: tiny and huge magnitudes, negative zero, ties at the last decimal place and
+# float32 values that don't widen cleanly
+EDGE_VALUES = [
+    0.0, -0.0, 1.0, -1.0, 1.5, 2.0, 0.1, 1 / 3,
+    5.2e-05, -5.2e-05, 1e-06, 4e-07, 6e-07, 1e-07,
+    0.0000005, 0.0000015, 0.0000025, -0.0000025, 0.0005, 0.0015, 0.0025,
+    123456.7890125, 1e12, 9.3e12, -9.3e12, 1e16, 1.5e300, -1.5e300,
+]
+
+
+def dumps(payload) -> str:
+    return json.dumps(payload, default=columns.encode_json_default)
+
+
+def streamed(payload) -> str:
+    pieces = []
+    columns.write_json(payload, pieces.append)
+
+    return "".join(pieces)
+
+
+def edge_table(rows: int, dtype) -> ColumnTable:
+    """
+    A table cycling through the edge values in every kind of column, with enough rows to be formatted in bulk
+    """
+    values = np.array(EDGE_VALUES)
+    values = np.resize(values[np.abs(values) <= np.finfo(dtype).max], rows)
+    points = ColumnTable(rows) \
+        .column("co", np.stack([values, -values, values[::-1]], axis=1).astype(dtype), "position") \
+        .column("pressure", values.astype(dtype), "float") \
+        .column("vertexColor", np.stack([values] * 4, axis=1).astype(dtype), "color") \
+        .column("strength", values.astype(dtype), "value") \
+        .column("index", np.arange(rows), "index") \
+        .column("selected", np.arange(rows) % 3 == 0, "flag")
+
+    return ColumnTable(2) \
+        .field("id", ["first", "second \"quoted\" é"]) \
+        .nested("points", np.array([0, rows // 3, rows]), points)
+
+
+def test_bulk_formatting_matches_json_dumps():
+    for dtype in (np.float64, np.float32):
+        rows = columns.BULK_FORMAT_ROWS * 2
+        table = edge_table(rows, dtype)
+        points = table.attributes["points"].table
+
+        assert points.format_rows(0, rows) == [dumps(row) for row in points.to_list()]
+        assert streamed(dict({"strokes": table})) == dumps(dict({"strokes": table}))
+
+
+def test_rounded_text_is_as_short_as_json_dumps():
+    values = np.array([5.2e-05, 1.5, 2.0, 1e16], dtype=np.float64)
+    table = ColumnTable(len(values)).column("pressure", values, "float")
+
+    assert table.format_column("pressure", 0, len(values)) == ["5.2e-05", "1.5", "2.0", "1e+16"]
+
+
+def test_ties_round_like_expand():
+    values = np.array([0.0000005, 0.0000015, 0.0000025, 0.0005, 0.0015, 0.0025, 2.5e-07], dtype=np.float64)
+    table = ColumnTable(len(values)).column("pressure", values, "float").column("color", values, "color")
+
+    for name in ("pressure", "color"):
+        assert table.format_column(name, 0, len(values)) == [json.dumps(value) for value in table.expand(name)]
+
+
+def test_chunked_streaming_matches_json_dumps():
+    rows = columns.STREAM_CHUNK_ROWS * 2 + 7
+    table = edge_table(rows, np.float32)
+
+    assert streamed(dict({"type": "gpencil", "strokes": table})) == dumps(dict({"type": "gpencil", "strokes": table}))
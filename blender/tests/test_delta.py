@@ -0,0 +1,135 @@
+import numpy as np
+
+from columns import ColumnTable, DeltaColumn, DeltaEncoder, Nested
+
+
+def decode(table: ColumnTable, reference: ColumnTable) -> ColumnTable:
+    """
+    Rebuild a delta encoded table from the reference frame's, like the decoder in interface/src/optimiser/binary.ts
+    """
+    decoded = ColumnTable(table.length)
+
+    for name, value in table.attributes.items():
+        kind = table.kinds[name]
+
+        if isinstance(value, Nested):
+            offsets = value.offsets
+            if isinstance(offsets, DeltaColumn):
+                offsets = reference.attributes[name].offsets
+
+            decoded.nested(name, offsets, decode(value.table, reference.attributes[name].table if reference else None))
+        elif not isinstance(value, DeltaColumn):
+            decoded.attributes[name] = value
+            decoded.kinds[name] = kind
+        elif value.mode == "same":
+            decoded.attributes[name] = reference.attributes[name]
+            decoded.kinds[name] = kind
+        else:
+            # New rows, with a source of -1, are predicted as zero
+            predicted = reference.attributes[name]
+            if table.source is not None:
+                predicted = predicted[np.maximum(table.source, 0)]
+                predicted[table.source < 0] = 0
+
+            decoded.column(name, predicted + value.values * (value.scale or 1), kind)
+
+    return decoded
+
+
+def strokes(ids: list, positions: np.ndarray) -> dict:
+    table = ColumnTable(len(ids)) \
+        .field("id", ids) \
+        .column("co", np.asarray(positions, dtype=np.float32).reshape(-1, 3), "position")
+
+    return dict({"type": "gpencil", "name": "Drawing", "strokes": table})
+
+
+def encode_frames(encoder: DeltaEncoder, frames: list) -> list:
+    return [encoder.encode(dict(contents, frame=frame)) for frame, contents in enumerate(frames)]
+
+
+def test_matched_by_id_stores_differences():
+    first, second = encode_frames(DeltaEncoder(10), [
+        strokes(["a", "b"], [[0, 0, 0], [1, 1, 1]]),
+        strokes(["b", "a"], [[1, 1, 2], [0, 0, 1]]),
+    ])
+
+    table = second["strokes"]
+    assert second["deltaFrom"] == 0
+    assert table.source.tolist() == [1, 0]
+    assert table.attributes["co"].mode == "delta"
+    assert table.attributes["co"].values.tolist() == [[0, 0, 1], [0, 0, 1]]
+
+
+def test_matched_by_index_stores_differences():
+    def frame(indices: list, positions: list) -> dict:
+        table = ColumnTable(len(indices)) \
+            .column("index", np.array(indices), "index") \
+            .column("co", np.array(positions, dtype=np.float32), "position")
+        return dict({"type": "mesh", "name": "Mesh", "vertices": table})
+
+    first, second = encode_frames(DeltaEncoder(10), [
+        frame([0, 1, 2], [[0, 0, 0], [1, 0, 0], [2, 0, 0]]),
+        frame([0, 2], [[0, 1, 0], [2, 1, 0]]),
+    ])
+
+    table = second["vertices"]
+    assert table.source.tolist() == [0, 2]
+    assert table.attributes["co"].values.tolist() == [[0, 1, 0], [0, 1, 0]]
+
+
+def test_unchanged_columns_are_left_out():
+    first, second = encode_frames(DeltaEncoder(10), [
+        strokes(["a"], [[1, 2, 3]]),
+        strokes(["a"], [[1, 2, 3]]),
+    ])
+
+    assert second["strokes"].attributes["id"].mode == "same"
+    assert second["strokes"].attributes["co"].mode == "same"
+
+
+def test_unmatched_rows_are_predicted_as_zero():
+    first, second = encode_frames(DeltaEncoder(10), [
+        strokes(["a"], [[1, 1, 1]]),
+        strokes(["a", "new"], [[1, 1, 1], [5, 6, 7]]),
+    ])
+
+    table = second["strokes"]
+    assert table.source.tolist() == [0, -1]
+    assert table.attributes["co"].values.tolist() == [[0, 0, 0], [5, 6, 7]]
+
+
+def test_empty_reference_writes_columns_in_full():
+    first, second = encode_frames(DeltaEncoder(10), [
+        strokes([], []),
+        strokes(["a", "b"], [[1, 1, 1], [2, 2, 2]]),
+    ])
+
+    table = second["strokes"]
+    assert table.source.tolist() == [-1, -1]
+    assert isinstance(table.attributes["co"], np.ndarray)
+    assert table.attributes["co"].tolist() == [[1, 1, 1], [2, 2, 2]]
+
+
+def test_keyframes_are_written_in_full():
+    frames = encode_frames(DeltaEncoder(2), [strokes(["a"], [[index, 0, 0]]) for index in range(3)])
+
+    assert [frame.get("deltaFrom") for frame in frames] == [None, 0, None]
+
+
+def test_round_trip_through_decoder():
+    generator = np.random.default_rng(7)
+    frames = [
+        strokes([], []),
+        strokes(["a", "b", "c"], generator.random((3, 3))),
+        strokes(["c", "a"], generator.random((2, 3))),
+        strokes(["c", "a"], generator.random((2, 3))),
+        strokes(["d", "c", "a"], generator.random((3, 3))),
+    ]
+
+    decoded = None
+    for contents, encoded in zip(frames, encode_frames(DeltaEncoder(4), frames)):
+        decoded = decode(encoded["strokes"], decoded if "deltaFrom" in encoded else None)
+
+        assert decoded.attributes["id"] == contents["strokes"].attributes["id"]
+        np.testing.assert_allclose(decoded.attributes["co"], contents["strokes"].attributes["co"], atol=1e-6)
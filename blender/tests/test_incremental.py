@@ -0,0 +1,189 @@
+import incremental
+
+FRAMES = range(1, 31)
+
+
+def fingerprint(channels=None, inputs="inputs", cumulative=False, scene=False, dependencies=(), frames=(1, 31)):
+    return dict({
+        "inputs": inputs,
+        "channels": channels or dict({}),
+        "always": False,
+        "cumulative": cumulative,
+        "scene": scene,
+        "dependencies": list(dependencies),
+        "frames": list(frames),
+    })
+
+
+def curve(*keys, static="static"):
+    return dict({"kind": "interpolated", "static": static, "keys": [list(key) for key in keys]})
+
+
+def drawings(*keys):
+    return dict({"kind": "held", "static": "", "keys": [list(key) for key in keys]})
+
+
+def span(start: int, end: int) -> set[int]:
+    return set(range(start, end + 1))
+
+
+def test_unchanged_object_is_clean():
+    previous = fingerprint(dict({"location": curve((1, "a"), (10, "b"), (20, "c"))}))
+
+    assert incremental.own_dirty_frames(previous, previous, FRAMES) == set()
+
+
+def test_changed_interpolated_key_dirties_the_keys_either_side():
+    previous = fingerprint(dict({"location": curve((1, "a"), (10, "b"), (20, "c"))}))
+    current = fingerprint(dict({"location": curve((1, "a"), (10, "changed"), (20, "c"))}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(1, 20)
+
+
+def test_inserted_interpolated_key_dirties_its_neighbours():
+    previous = fingerprint(dict({"location": curve((1, "a"), (10, "b"), (20, "c"))}))
+    current = fingerprint(dict({"location": curve((1, "a"), (10, "b"), (15, "new"), (20, "c"))}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(10, 20)
+
+
+def test_removed_interpolated_key_dirties_its_old_neighbours():
+    previous = fingerprint(dict({"location": curve((1, "a"), (10, "b"), (20, "c"))}))
+    current = fingerprint(dict({"location": curve((1, "a"), (20, "c"))}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(1, 20)
+
+
+def test_new_last_key_dirties_to_the_end():
+    previous = fingerprint(dict({"location": curve((1, "a"), (10, "b"))}))
+    current = fingerprint(dict({"location": curve((1, "a"), (10, "b"), (20, "c"))}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(10, 30)
+
+
+def test_changed_curve_settings_dirty_every_frame():
+    previous = fingerprint(dict({"location": curve((1, "a"), (10, "b"))}))
+    current = fingerprint(dict({"location": curve((1, "a"), (10, "b"), static="cycles")}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == set(FRAMES)
+
+
+def test_changed_held_drawing_dirties_until_the_next_drawing():
+    previous = fingerprint(dict({"layer": drawings((1, "a"), (10, "b"), (20, "c"))}))
+    current = fingerprint(dict({"layer": drawings((1, "a"), (10, "changed"), (20, "c"))}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(10, 19)
+
+
+def test_inserted_held_drawing_dirties_until_the_next_drawing():
+    previous = fingerprint(dict({"layer": drawings((1, "a"), (20, "c"))}))
+    current = fingerprint(dict({"layer": drawings((1, "a"), (12, "new"), (20, "c"))}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(12, 19)
+
+
+def test_removed_last_held_drawing_dirties_to_the_end():
+    previous = fingerprint(dict({"layer": drawings((1, "a"), (20, "c"))}))
+    current = fingerprint(dict({"layer": drawings((1, "a"))}))
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(20, 30)
+
+
+def test_cumulative_change_carries_on_to_the_end():
+    previous = fingerprint(dict({"location": curve((1, "a"), (5, "b"), (10, "c"))}), cumulative=True)
+    current = fingerprint(dict({"location": curve((1, "a"), (5, "changed"), (10, "c"))}), cumulative=True)
+
+    assert incremental.own_dirty_frames(previous, current, FRAMES) == span(1, 30)
+
+
+def test_changed_inputs_or_new_objects_dirty_every_frame():
+    previous = fingerprint()
+
+    assert incremental.own_dirty_frames(previous, fingerprint(inputs="changed"), FRAMES) == set(FRAMES)
+    assert incremental.own_dirty_frames(None, previous, FRAMES) == set(FRAMES)
+
+
+def test_frames_the_previous_export_missed_are_dirty():
+    previous = fingerprint(frames=(1, 11))
+
+    assert incremental.own_dirty_frames(previous, fingerprint(), FRAMES) == span(11, 30)
+
+
+def test_changes_propagate_to_the_objects_that_follow():
+    previous = dict({
+        "Parent": fingerprint(dict({"location": curve((1, "a"), (10, "b"))})),
+        "Child": fingerprint(dependencies=["Parent"]),
+        "Grandchild": fingerprint(dependencies=["Child"]),
+        "Other": fingerprint(),
+    })
+    current = dict(previous)
+    current["Parent"] = fingerprint(dict({"location": curve((1, "a"), (10, "changed"))}))
+
+    dirty = incremental.dirty_frames(previous, current, ["Child", "Grandchild", "Other"], [], [], FRAMES)
+
+    assert dirty == dict({"Child": span(1, 30), "Grandchild": span(1, 30), "Other": set()})
+
+
+def test_dependency_cycles_terminate():
+    previous = dict({"A": fingerprint(dependencies=["B"]), "B": fingerprint(dependencies=["A"])})
+    current = dict({"A": fingerprint(dependencies=["B"]), "B": fingerprint(inputs="changed", dependencies=["A"])})
+
+    assert incremental.dirty_frames(previous, current, ["A"], [], [], FRAMES) == dict({"A": set(FRAMES)})
+
+
+def scene_fingerprints(wall_keys=((1, "a"), (20, "b"))):
+    return dict({
+        "Light": fingerprint(scene=True),
+        "Drawing": fingerprint(),
+        "Camera": fingerprint(),
+        "Wall": fingerprint(dict({"location": curve(*wall_keys)})),
+    })
+
+
+def test_changed_occluder_dirties_scene_dependent_objects():
+    previous = scene_fingerprints()
+    current = scene_fingerprints(((1, "a"), (20, "moved")))
+
+    dirty = incremental.dirty_frames(previous, current, ["Light", "Drawing"], ["Camera", "Wall"], ["Camera", "Wall"],
+                                     FRAMES)
+
+    assert dirty == dict({"Light": span(1, 30), "Drawing": set()})
+
+
+def test_removed_occluder_dirties_scene_dependent_objects():
+    previous = scene_fingerprints()
+    current = scene_fingerprints()
+    del current["Wall"]
+
+    dirty = incremental.dirty_frames(previous, current, ["Light", "Drawing"], ["Camera"], ["Camera", "Wall"], FRAMES)
+
+    assert dirty == dict({"Light": set(FRAMES), "Drawing": set()})
+
+
+def test_added_occluder_dirties_scene_dependent_objects():
+    previous = scene_fingerprints()
+    del previous["Wall"]
+    current = scene_fingerprints()
+
+    dirty = incremental.dirty_frames(previous, current, ["Light", "Drawing"], ["Camera", "Wall"], ["Camera"], FRAMES)
+
+    assert dirty == dict({"Light": set(FRAMES), "Drawing": set()})
+
+
+def test_manifest_keeps_objects_until_the_settings_change(tmp_path):
+    output_path = str(tmp_path)
+
+    assert incremental.read_manifest(output_path) == dict({"settings": None, "objects": dict({}), "scene": []})
+
+    incremental.write_manifest(output_path, ["--format", "JSON"], dict({"A": fingerprint()}), ["Camera"])
+    incremental.write_manifest(output_path, ["--format", "JSON"], dict({"B": fingerprint()}), ["Camera", "Wall"])
+
+    manifest = incremental.read_manifest(output_path)
+    assert sorted(manifest["objects"].keys()) == ["A", "B"]
+    assert manifest["scene"] == ["Camera", "Wall"]
+
+    incremental.write_manifest(output_path, ["--format", "BINARY"], dict({"C": fingerprint()}), ["Camera"])
+    assert sorted(incremental.read_manifest(output_path)["objects"].keys()) == ["C"]
+
+    incremental.discard_manifest(output_path)
+    assert incremental.read_manifest(output_path)["objects"] == dict({})
@@ -0,0 +1,461 @@
+/**
+ * Decoder for the binary frame format written by the Blender add-on
+ *
+ * A file is the magic bytes 'TPVB', the format version and the header length
+ * as little-endian uint32s, then a JSON header, then the column buffers. The
+ * header holds the usual export payload, with every table of elements
+ * replaced by a description of its columns.
+ *
+ * Exports with a keyframe interval store most frames as changes from the
+ * object's previous frame, those have to be decoded in frame order with the
+ * same BinaryReferences.
+ */
+
+const MAGIC = 'TPVB'
+const PREFIX_LENGTH = 12
+
+type ColumnType = 'float32' | 'int32' | 'int16' | 'uint32' | 'uint8'
+
+type TypedArray =
+  | Float32Array
+  | Int32Array
+  | Int16Array
+  | Uint32Array
+  | Uint8Array
+
+/**
+ * Quantized positions are origin + value * step, quantized colors and deltas
+ * are value * scale
+ */
+interface QuantizedJSON {
+  origin?: number[]
+  step?: number
+  scale?: number
+}
+
+interface BufferColumnJSON {
+  buffer: number
+  type: ColumnType
+  components: number
+  kind?: string
+  quantized?: QuantizedJSON
+  delta?: boolean
+}
+
+interface SameColumnJSON {
+  same: true
+}
+
+interface FieldColumnJSON {
+  values: any[]
+}
+
+interface NestedColumnJSON {
+  offsets: BufferColumnJSON | SameColumnJSON
+  table: TableJSON
+}
+
+type ColumnJSON =
+  | BufferColumnJSON
+  | SameColumnJSON
+  | FieldColumnJSON
+  | NestedColumnJSON
+
+interface TableJSON {
+  $table: {
+    length: number
+    attributes: { [name: string]: ColumnJSON }
+    source?: BufferColumnJSON
+  }
+}
+
+interface HeaderJSON {
+  buffers: [number, number][]
+  payload: any
+  quantization?: {
+    step: number
+    bounds: 'FRAME' | 'EXPORT'
+    maxError: number
+    colorLevels: number
+  }
+}
+
+const TYPED_ARRAYS = {
+  float32: Float32Array,
+  int32: Int32Array,
+  int16: Int16Array,
+  uint32: Uint32Array,
+  uint8: Uint8Array,
+}
+
+/**
+ * A column of a decoded table, values[i * components + c] is component c of
+ * row i. Quantized and delta columns are converted back to floats, so they're
+ * copies rather than views over the file
+ */
+export interface Column {
+  values: TypedArray
+  components: number
+  kind?: string
+}
+
+export interface NestedColumn {
+  offsets: TypedArray
+  table: ColumnTable
+}
+
+/**
+ * A decoded table, row i of a nested column owns the child rows
+ * offsets[i] to offsets[i + 1]
+ */
+export class ColumnTable {
+  constructor(
+    public length: number,
+    public columns: { [name: string]: Column | any[] | NestedColumn },
+  ) {}
+}
+
+/**
+ * The last decoded frame of every object, keyed by type and name
+ */
+export type BinaryReferences = Map<string, any>
+
+export function isBinaryFrame(data: Uint8Array) {
+  return (
+    data.byteLength >= PREFIX_LENGTH &&
+    String.fromCharCode(data[0], data[1], data[2], data[3]) === MAGIC
+  )
+}
+
+function isTable(value: any): value is TableJSON {
+  return value !== null && typeof value === 'object' && '$table' in value
+}
+
+function dequantize(
+  values: TypedArray,
+  components: number,
+  quantized: QuantizedJSON,
+) {
+  const result = new Float32Array(values.length)
+  const scale = quantized.step ?? quantized.scale ?? 1
+  const origin = quantized.origin ?? []
+
+  for (let index = 0; index < values.length; index++) {
+    result[index] = (origin[index % components] ?? 0) + values[index] * scale
+  }
+
+  return result
+}
+
+/**
+ * Add a delta column to the reference's values, rows without a source row in
+ * the reference are predicted as zero
+ */
+function applyDelta(
+  delta: Column,
+  reference: Column,
+  source: TypedArray | null,
+  scale: number,
+): Column {
+  const { components } = delta
+  const result = new Float32Array(delta.values.length)
+
+  for (let row = 0; row < result.length / components; row++) {
+    const sourceRow = source ? source[row] : row
+
+    for (let c = 0; c < components; c++) {
+      const predicted =
+        sourceRow < 0 ? 0 : reference.values[sourceRow * components + c]
+
+      result[row * components + c] =
+        predicted + delta.values[row * components + c] * scale
+    }
+  }
+
+  return { values: result, components, kind: delta.kind }
+}
+
+/**
+ * Expand a decoded table into the list of element objects the JSON format
+ * holds
+ */
+function tableRows(table: ColumnTable): any[] {
+  const rows: any[] = []
+
+  for (let row = 0; row < table.length; row++) {
+    rows.push({})
+  }
+
+  for (const [name, column] of Object.entries(table.columns)) {
+    if (Array.isArray(column)) {
+      column.forEach((value, row) => (rows[row][name] = value))
+    } else if ('offsets' in column) {
+      const children = tableRows(column.table)
+
+      for (let row = 0; row < table.length; row++) {
+        rows[row][name] = children.slice(
+          column.offsets[row],
+          column.offsets[row + 1],
+        )
+      }
+    } else {
+      const { values, components, kind } = column
+
+      for (let row = 0; row < table.length; row++) {
+        rows[row][name] =
+          components === 1
+            ? kind === 'flag'
+              ? values[row] !== 0
+              : values[row]
+            : Array.from(
+                values.subarray(row * components, (row + 1) * components),
+              )
+      }
+    }
+  }
+
+  return rows
+}
+
+/**
+ * Replace every decoded table in a payload with its rows
+ */
+function toRows(value: any): any {
+  if (value instanceof ColumnTable) {
+    return tableRows(value)
+  }
+
+  if (Array.isArray(value)) {
+    return value.map(toRows)
+  }
+
+  if (value !== null && typeof value === 'object') {
+    const expanded: any = {}
+
+    for (const [key, child] of Object.entries(value)) {
+      expanded[key] = toRows(child)
+    }
+
+    return expanded
+  }
+
+  return value
+}
+
+class BinaryReader {
+  constructor(
+    private data: Uint8Array,
+    private header: HeaderJSON,
+    private frame?: number,
+  ) {}
+
+  rawColumn(description: BufferColumnJSON): Column {
+    const [offset, byteLength] = this.header.buffers[description.buffer]
+    const TypedArrayType = TYPED_ARRAYS[description.type]
+    const start = this.data.byteOffset + offset
+    const length = byteLength / TypedArrayType.BYTES_PER_ELEMENT
+
+    // Buffers are aligned in the file, so the column is a view unless the
+    // file itself was loaded at an unaligned offset
+    const values =
+      start % TypedArrayType.BYTES_PER_ELEMENT === 0
+        ? new TypedArrayType(this.data.buffer, start, length)
+        : new TypedArrayType(
+            this.data.slice(offset, offset + byteLength).buffer,
+            0,
+            length,
+          )
+
+    return {
+      values,
+      components: description.components,
+      kind: description.kind,
+    }
+  }
+
+  column(description: BufferColumnJSON): Column {
+    const column = this.rawColumn(description)
+
+    if (!description.quantized) {
+      return column
+    }
+
+    return {
+      ...column,
+      values: dequantize(
+        column.values,
+        column.components,
+        description.quantized,
+      ),
+    }
+  }
+
+  /**
+   * Decode a table's columns, filling in unchanged and delta columns from
+   * the reference
+   */
+  table(table: TableJSON, reference?: ColumnTable): ColumnTable {
+    const { length, attributes, source } = table.$table
+    const sourceRows = source ? this.rawColumn(source).values : null
+    const columns: ColumnTable['columns'] = {}
+
+    const referenceColumn = (name: string) => {
+      const column = reference?.columns[name]
+
+      if (column === undefined) {
+        throw new Error(`Column ${name} needs a reference frame`)
+      }
+
+      return column
+    }
+
+    for (const [name, description] of Object.entries(attributes)) {
+      if ('same' in description) {
+        columns[name] = referenceColumn(name)
+      } else if ('values' in description) {
+        columns[name] = description.values
+      } else if ('offsets' in description) {
+        const referenceNested = reference?.columns[name] as
+          | NestedColumn
+          | undefined
+
+        columns[name] = {
+          offsets:
+            'same' in description.offsets
+              ? (referenceColumn(name) as NestedColumn).offsets
+              : this.column(description.offsets).values,
+          table: this.table(description.table, referenceNested?.table),
+        }
+      } else if (description.delta) {
+        columns[name] = applyDelta(
+          this.rawColumn(description),
+          referenceColumn(name) as Column,
+          sourceRows,
+          description.quantized?.scale ?? 1,
+        )
+      } else {
+        columns[name] = this.column(description)
+      }
+    }
+
+    return new ColumnTable(length, columns)
+  }
+
+  /**
+   * Decode the tables in a payload, using the matching parts of the reference
+   */
+  value(value: any, reference: any): any {
+    if (isTable(value)) {
+      return this.table(
+        value,
+        reference instanceof ColumnTable ? reference : undefined,
+      )
+    }
+
+    if (Array.isArray(value)) {
+      return value.map((child, index) =>
+        this.value(
+          child,
+          Array.isArray(reference) ? reference[index] : undefined,
+        ),
+      )
+    }
+
+    if (value !== null && typeof value === 'object') {
+      const decoded: any = {}
+
+      for (const [key, child] of Object.entries(value)) {
+        decoded[key] = this.value(child, reference?.[key])
+      }
+
+      return decoded
+    }
+
+    return value
+  }
+
+  object(payload: any, references: BinaryReferences) {
+    // Deduplicated blobs leave the frame number to the manifest
+    if (this.frame !== undefined) {
+      payload = { ...payload, frame: this.frame }
+    }
+
+    const key = `${payload.type}:${payload.name}`
+    let reference: any = undefined
+
+    if (payload.deltaFrom !== undefined) {
+      reference = references.get(key)
+
+      if (!reference || reference.frame !== payload.deltaFrom) {
+        throw new Error(
+          `Frame ${payload.frame} of ${key} needs frame ${payload.deltaFrom} to be decoded first`,
+        )
+      }
+    }
+
+    const decoded = this.value(payload, reference)
+    references.set(key, decoded)
+
+    return decoded
+  }
+
+  payload(references: BinaryReferences) {
+    const payload = this.header.payload
+
+    // A bundle holds every object's export for its frame
+    if (payload.type === 'frame') {
+      return {
+        ...payload,
+        objects: payload.objects.map((object: any) =>
+          this.object(object, references),
+        ),
+      }
+    }
+
+    return this.object(payload, references)
+  }
+}
+
+function readHeader(data: Uint8Array): HeaderJSON {
+  if (!isBinaryFrame(data)) {
+    throw new Error('Not a binary frame')
+  }
+
+  const view = new DataView(data.buffer, data.byteOffset, data.byteLength)
+  const headerLength = view.getUint32(8, true)
+  const headerBytes = data.subarray(PREFIX_LENGTH, PREFIX_LENGTH + headerLength)
+
+  return JSON.parse(new TextDecoder().decode(headerBytes))
+}
+
+/**
+ * The frame number of a binary frame, without decoding its columns
+ */
+export function binaryFrameNumber(data: Uint8Array): number {
+  return readHeader(data).payload.frame
+}
+
+/**
+ * Decode a binary frame with every table left as columns, unquantized
+ * columns are views over the file's data rather than copies
+ *
+ * Blobs from a deduplicated export need the frame number from their manifest.
+ */
+export function decodeBinaryColumns(
+  data: Uint8Array,
+  references: BinaryReferences = new Map(),
+  frame?: number,
+) {
+  return new BinaryReader(data, readHeader(data), frame).payload(references)
+}
+
+/**
+ * Decode a binary frame into the same structure the JSON format holds
+ */
+export function decodeBinaryFrame(
+  data: Uint8Array,
+  references: BinaryReferences = new Map(),
+  frame?: number,
+) {
+  return toRows(decodeBinaryColumns(data, references, frame))
+}
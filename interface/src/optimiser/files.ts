@@ -1,17 +1,93 @@
 import fs from 'fs'
 import path from 'path'
+import zlib from 'zlib'
 import { importJson, Renderable } from './import'
 import { MovementJSON } from './import'
 import type { Toolpath } from './toolpath'
 import { Camera } from './camera'
 import { Settings } from './settings'
 import { Movement } from './movements'
+import {
+  binaryFrameNumber,
+  BinaryReferences,
+  decodeBinaryFrame,
+} from './binary'
+import { expandTimeline, TimelineJSON } from './timeline'
+
+// Exports are either plain JSON or the binary columnar format
+const EXPORT_EXTENSIONS = ['.json', '.tpvb']
+
+// Compressed exports add the codec's extension after the format's
+const COMPRESSION_EXTENSIONS = ['.gz', '.zz']
+
+/**
+ * The format extension of an export, ignoring any compression extension
+ */
+function exportExtension(p: string) {
+  const extension = path.extname(p)
+
+  if (COMPRESSION_EXTENSIONS.includes(extension)) {
+    return path.extname(path.basename(p, extension))
+  }
+
+  return extension
+}
+
+/**
+ * Read an export, decompressing it if needed
+ */
+async function readExport(p: string): Promise<Buffer> {
+  const contents = await fs.promises.readFile(p)
+
+  switch (path.extname(p)) {
+    case '.gz':
+      return zlib.gunzipSync(contents)
+    case '.zz':
+      return zlib.inflateSync(contents)
+    default:
+      return contents
+  }
+}
+
+/**
+ * With the 'File per Frame' layout, every object exported on a frame is
+ * bundled into a single file
+ */
+export interface FrameBundleJSON {
+  type: 'frame'
+  frame: number
+  objects: MovementJSON[]
+}
+
+/**
+ * With the 'Deduplicated' layout, each frame has a manifest listing the blobs
+ * its objects are stored in. The blobs are shared between frames, so they
+ * have no frame number of their own
+ */
+export interface ManifestJSON {
+  type: 'manifest'
+  frame: number
+  objects: string[]
+}
+
+// The folder the blobs of a deduplicated export are stored in
+const BLOB_FOLDER = 'blobs'
 
 async function* walkJSON(dir: string): AsyncGenerator<string> {
   for await (const d of await fs.promises.opendir(dir)) {
     const entry = path.join(dir, d.name)
-    if (d.isDirectory()) yield* walkJSON(entry)
-    else if (d.isFile() && path.extname(d.name) === '.json') yield entry
+    // Blobs are only read through the manifests that reference them, and
+    // hidden folders hold the exporter's own state, like unmerged shards
+    if (d.isDirectory()) {
+      if (d.name !== BLOB_FOLDER && !d.name.startsWith('.')) {
+        yield* walkJSON(entry)
+      }
+    } else if (
+      d.isFile() &&
+      EXPORT_EXTENSIONS.includes(exportExtension(d.name))
+    ) {
+      yield entry
+    }
   }
 }
 
@@ -29,17 +105,7 @@ export async function importFolder(folderPath: string) {
   let minFrame = Infinity
   let maxFrame = -Infinity
 
-  // Walk the folder to find json files
-  for await (const p of walkJSON(folderPath)) {
-    const contents = await fs.promises.readFile(p)
-    const parsed: MovementJSON = JSON.parse(contents.toString())
-
-    if (!parsed.type || !parsed.frame) {
-      // unknown file
-      console.warn('Unknown file format', p)
-      continue
-    }
-
+  const addMovementJSON = (parsed: MovementJSON) => {
     if (!renderablesByFrame[parsed.frame]) {
       renderablesByFrame[parsed.frame] = []
     }
@@ -65,6 +131,96 @@ export async function importFolder(folderPath: string) {
     maxFrame = Math.max(maxFrame, parsed.frame)
   }
 
+  const addParsed = (
+    parsed: MovementJSON | FrameBundleJSON | TimelineJSON,
+    p: string,
+  ) => {
+    // A timeline holds every frame of its object
+    if (parsed.type === 'timeline') {
+      for (const object of expandTimeline(parsed)) {
+        addMovementJSON(object)
+      }
+      return
+    }
+
+    if (!parsed.type || !parsed.frame) {
+      // unknown file
+      console.warn('Unknown file format', p)
+      return
+    }
+
+    // A bundle holds every object's export for its frame
+    if (parsed.type === 'frame') {
+      for (const object of parsed.objects) {
+        addMovementJSON(object)
+      }
+      return
+    }
+
+    addMovementJSON(parsed)
+  }
+
+  // Binary frames can be stored as changes from the frame before, so they're
+  // decoded in frame order once every file has been found
+  const ordered: { frame: number; load: () => Promise<void> }[] = []
+  const references: BinaryReferences = new Map()
+  const blobs = new Map<string, Buffer>()
+
+  const readBlob = async (folder: string, name: string, frame: number) => {
+    const blobPath = path.join(folder, BLOB_FOLDER, name)
+
+    if (!blobs.has(blobPath)) {
+      blobs.set(blobPath, await readExport(blobPath))
+    }
+
+    const contents = blobs.get(blobPath)!
+
+    if (exportExtension(name) === '.tpvb') {
+      return decodeBinaryFrame(contents, references, frame)
+    }
+
+    return { ...JSON.parse(contents.toString()), frame }
+  }
+
+  // Walk the folder to find json files
+  for await (const p of walkJSON(folderPath)) {
+    const contents = await readExport(p)
+
+    if (exportExtension(p) === '.tpvb') {
+      ordered.push({
+        frame: binaryFrameNumber(contents),
+        load: async () => addParsed(decodeBinaryFrame(contents, references), p),
+      })
+      continue
+    }
+
+    const parsed:
+      | MovementJSON
+      | FrameBundleJSON
+      | ManifestJSON
+      | TimelineJSON = JSON.parse(contents.toString())
+
+    if (parsed.type === 'manifest') {
+      ordered.push({
+        frame: parsed.frame,
+        load: async () => {
+          for (const name of parsed.objects) {
+            addMovementJSON(await readBlob(path.dirname(p), name, parsed.frame))
+          }
+        },
+      })
+      continue
+    }
+
+    addParsed(parsed, p)
+  }
+
+  ordered.sort((a, b) => a.frame - b.frame)
+
+  for (const { load } of ordered) {
+    await load()
+  }
+
   return {
     renderablesByFrame,
     movementJSONByFrame,
@@ -196,13 +196,24 @@ export interface GPencilJSON {
   type: 'gpencil'
   frame: number
   name: string
+  /**
+   * With 'index', strokes and points carry no ID, they're rebuilt from the
+   * layer's prefix and their position
+   */
+  idScheme?: 'index'
+  /**
+   * The distinct materials of the export, strokes refer to them by index
+   */
+  materials?: MaterialJSON[]
   layers: {
     info: string
     material: MaterialJSON
+    idPrefix?: string
     strokes: {
       useCyclic: boolean
+      material?: MaterialJSON | number
       points: {
-        id: string
+        id?: string
         co: [number, number, number]
         pressure: number
         strength: number
@@ -219,14 +230,20 @@ export function importGPencil(json: GPencilJSON) {
     let layer = new GPencilLayer(jLayer.info, jLayer.material)
     gPencil.addLayer(layer)
 
-    for (const jStroke of jLayer.strokes) {
+    jLayer.strokes.forEach((jStroke, strokeIndex) => {
       const stroke = new GPencilStroke(jStroke.useCyclic)
       layer.addStroke(stroke)
 
-      for (const jPoint of jStroke.points) {
-        stroke.addPoint(jPoint)
-      }
-    }
+      const strokeID = `${jLayer.idPrefix}-${strokeIndex + 1}`
+
+      jStroke.points.forEach((jPoint, pointIndex) => {
+        stroke.addPoint(
+          json.idScheme === 'index'
+            ? { ...jPoint, id: `${strokeID}-${pointIndex + 1}` }
+            : (jPoint as GPencilStrokePoint),
+        )
+      })
+    })
   }
 
   return gPencil
@@ -137,11 +137,18 @@ export interface ParticlesJSON {
   type: 'particles'
   frame: number
   name: string
+  /**
+   * With 'index', particles carry their index in the system instead of an ID,
+   * which is rebuilt from the system's prefix
+   */
+  idScheme?: 'index'
   systems: {
     name: string
     material: MaterialJSON
+    idPrefix?: string
     particles: {
-      id: string
+      id?: string
+      index?: number
       location: [number, number, number]
       quaternion: [number, number, number, number]
       velocity: [number, number, number]
@@ -157,7 +164,11 @@ export function importParticles(json: ParticlesJSON) {
     particles.addSystem(system)
 
     for (const jParticle of jSystem.particles) {
-      system.addParticle(jParticle)
+      system.addParticle(
+        json.idScheme === 'index'
+          ? { ...jParticle, id: `${jSystem.idPrefix}-${jParticle.index! + 1}` }
+          : (jParticle as Particle),
+      )
     }
   }
 
@@ -0,0 +1,59 @@
+/**
+ * Timelines hold every frame of an object that only exports a handful of
+ * values, such as a camera or a light, in a single file
+ *
+ * Each channel is named by its dotted path in the per frame export, and is
+ * either a single value that holds for every frame or a list with one value
+ * per frame. Values missing from a frame are null.
+ */
+
+type ChannelJSON = { value: any } | { values: any[] }
+
+export interface TimelineJSON {
+  type: 'timeline'
+  objectType: string
+  name: string
+  frames: number[]
+  channels: { [path: string]: ChannelJSON }
+}
+
+/**
+ * Set a value at a dotted path, creating the objects along the way
+ */
+function setPath(target: any, path: string, value: any) {
+  const keys = path.split('.')
+  let parent = target
+
+  for (const key of keys.slice(0, -1)) {
+    if (parent[key] === undefined) {
+      parent[key] = {}
+    }
+
+    parent = parent[key]
+  }
+
+  parent[keys[keys.length - 1]] = value
+}
+
+/**
+ * Rebuild the per frame exports a timeline was gathered from
+ */
+export function expandTimeline(timeline: TimelineJSON) {
+  return timeline.frames.map((frame, index) => {
+    const object: any = {
+      type: timeline.objectType,
+      name: timeline.name,
+      frame,
+    }
+
+    for (const [path, channel] of Object.entries(timeline.channels)) {
+      const value = 'values' in channel ? channel.values[index] : channel.value
+
+      if (value !== null) {
+        setPath(object, path, value)
+      }
+    }
+
+    return object
+  })
+}
@@ -0,0 +1,206 @@
+import {
+  decodeBinaryColumns,
+  decodeBinaryFrame,
+  isBinaryFrame,
+  BinaryReferences,
+} from '../src/optimiser/binary'
+
+// Lay out a binary frame the same way the Blender add-on does
+function encodeFrame(payload: any, buffers: ArrayBufferView[]) {
+  const pad = (length: number) => (8 - (length % 8)) % 8
+
+  let headerLength = 0
+  let header: Uint8Array
+
+  while (true) {
+    let offset = 12 + headerLength
+    const table: [number, number][] = []
+
+    for (const buffer of buffers) {
+      table.push([offset, buffer.byteLength])
+      offset += buffer.byteLength + pad(buffer.byteLength)
+    }
+
+    header = new TextEncoder().encode(
+      JSON.stringify({ buffers: table, payload }),
+    )
+
+    const needed = header.byteLength + pad(12 + header.byteLength)
+    if (needed <= headerLength) break
+    headerLength = needed
+  }
+
+  const total = buffers.reduce(
+    (sum, buffer) => sum + buffer.byteLength + pad(buffer.byteLength),
+    12 + headerLength,
+  )
+  const data = new Uint8Array(total).fill(32, 12, 12 + headerLength)
+  const view = new DataView(data.buffer)
+
+  data.set(new TextEncoder().encode('TPVB'), 0)
+  view.setUint32(4, 1, true)
+  view.setUint32(8, headerLength, true)
+  data.set(header!, 12)
+
+  let offset = 12 + headerLength
+  for (const buffer of buffers) {
+    data.set(
+      new Uint8Array(buffer.buffer, buffer.byteOffset, buffer.byteLength),
+      offset,
+    )
+    offset += buffer.byteLength + pad(buffer.byteLength)
+  }
+
+  return data
+}
+
+const payload = {
+  type: 'gpencil',
+  frame: 3,
+  name: 'Stroke',
+  layers: [
+    {
+      info: 'Lines',
+      strokes: {
+        $table: {
+          length: 2,
+          attributes: {
+            id: { values: ['stroke-lines-1', 'stroke-lines-2'] },
+            useCyclic: { buffer: 0, type: 'uint8', components: 1, kind: 'flag' },
+            points: {
+              offsets: { buffer: 1, type: 'uint32', components: 1 },
+              table: {
+                $table: {
+                  length: 3,
+                  attributes: {
+                    co: {
+                      buffer: 2,
+                      type: 'float32',
+                      components: 3,
+                      kind: 'position',
+                    },
+                    pressure: {
+                      buffer: 3,
+                      type: 'float32',
+                      components: 1,
+                      kind: 'float',
+                    },
+                  },
+                },
+              },
+            },
+          },
+        },
+      },
+    },
+  ],
+}
+
+const frame = encodeFrame(payload, [
+  new Uint8Array([1, 0]),
+  new Uint32Array([0, 1, 3]),
+  new Float32Array([0, 1, 2, 3, 4, 5, 6, 7, 8]),
+  new Float32Array([0.5, 1, 0.25]),
+])
+
+// The next frame, with every point moved by one along each axis
+const deltaFrame = encodeFrame(
+  {
+    ...payload,
+    frame: 4,
+    deltaFrom: 3,
+    layers: [
+      {
+        info: 'Lines',
+        strokes: {
+          $table: {
+            length: 2,
+            attributes: {
+              id: { same: true },
+              useCyclic: { same: true },
+              points: {
+                offsets: { same: true },
+                table: {
+                  $table: {
+                    length: 3,
+                    attributes: {
+                      co: {
+                        buffer: 0,
+                        type: 'float32',
+                        components: 3,
+                        kind: 'position',
+                        delta: true,
+                      },
+                      pressure: { same: true },
+                    },
+                  },
+                },
+              },
+            },
+          },
+        },
+      },
+    ],
+  },
+  [new Float32Array(9).fill(1)],
+)
+
+describe('Binary frames', () => {
+  it(`recognises a binary frame`, () => {
+    expect(isBinaryFrame(frame)).toBe(true)
+    expect(isBinaryFrame(new TextEncoder().encode('{"type": "gpencil"}'))).toBe(
+      false,
+    )
+  })
+
+  it(`decodes tables into the JSON structure`, () => {
+    const decoded = decodeBinaryFrame(frame)
+
+    expect(decoded.frame).toBe(3)
+    expect(decoded.layers[0].strokes).toEqual([
+      {
+        id: 'stroke-lines-1',
+        useCyclic: true,
+        points: [{ co: [0, 1, 2], pressure: 0.5 }],
+      },
+      {
+        id: 'stroke-lines-2',
+        useCyclic: false,
+        points: [
+          { co: [3, 4, 5], pressure: 1 },
+          { co: [6, 7, 8], pressure: 0.25 },
+        ],
+      },
+    ])
+  })
+
+  it(`decodes columns as views over the file`, () => {
+    const decoded = decodeBinaryColumns(frame)
+    const points = decoded.layers[0].strokes.columns.points.table
+
+    expect(points.length).toBe(3)
+    expect(points.columns.co.values).toBeInstanceOf(Float32Array)
+    expect(points.columns.co.values.buffer).toBe(frame.buffer)
+    expect(Array.from(points.columns.pressure.values)).toEqual([0.5, 1, 0.25])
+  })
+
+  it(`decodes deltas against the previous frame`, () => {
+    const references: BinaryReferences = new Map()
+
+    decodeBinaryFrame(frame, references)
+    const decoded = decodeBinaryFrame(deltaFrame, references)
+
+    expect(decoded.layers[0].strokes[1]).toEqual({
+      id: 'stroke-lines-2',
+      useCyclic: false,
+      points: [
+        { co: [4, 5, 6], pressure: 1 },
+        { co: [7, 8, 9], pressure: 0.25 },
+      ],
+    })
+  })
+
+  it(`refuses a delta without its reference frame`, () => {
+    expect(() => decodeBinaryFrame(deltaFrame)).toThrow()
+  })
+})
@@ -0,0 +1,38 @@
+import { expandTimeline, TimelineJSON } from '../src/optimiser/timeline'
+
+describe('Timelines', () => {
+  it(`expands into an export per frame`, () => {
+    const timeline: TimelineJSON = {
+      type: 'timeline',
+      objectType: 'light',
+      name: 'Light',
+      frames: [1, 2],
+      channels: {
+        position: { values: [[0, 0, 1], [0, 0, 2]] },
+        'material.type': { value: 'color' },
+        'material.color': { value: [1, 0, 0] },
+        occluded: { values: [false, true] },
+        'material.extra': { values: [null, 5] },
+      },
+    }
+
+    expect(expandTimeline(timeline)).toEqual([
+      {
+        type: 'light',
+        name: 'Light',
+        frame: 1,
+        position: [0, 0, 1],
+        material: { type: 'color', color: [1, 0, 0] },
+        occluded: false,
+      },
+      {
+        type: 'light',
+        name: 'Light',
+        frame: 2,
+        position: [0, 0, 2],
+        material: { type: 'color', color: [1, 0, 0], extra: 5 },
+        occluded: true,
+      },
+    ])
+  })
+})